@@ -7,325 +7,391 @@ Licensed under the GNU Affero General Public License, version 3 or later.
 LIBRERIA PARA GESTIONAR LA IMPRESORA FISCAL TFHKA
 Proyecto desarrollado por Iron Graterol
 https://github.com/eyngroup/api_printer_server
+
+Protocolo serial de las impresoras The Factory HKA sin el DLL TfhkaNet:
+- Comando: STX + comando + ETX + LRC; la impresora responde ACK o NAK.
+- Consulta (S1, S2, S3, SV...): la impresora responde con una trama STX + datos + ETX + LRC,
+  con los campos separados por LF.
+- Estado (ENQ): la impresora responde STX + STS1 + STS2 + ETX + LRC.
 """
+
+import logging
 import time
-from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
 import serial
 
+logger = logging.getLogger(__name__)
+
+STX = 0x02
+ETX = 0x03
+ENQ = 0x05
+ACK = 0x06
+NAK = 0x15
+FIELD_SEPARATOR = "\n"
+ENCODING = "iso-8859-1"
+
+ACK_TIMEOUT = 3.0  # Segundos para recibir ACK/NAK de un comando
+FRAME_TIMEOUT = 5.0  # Segundos para recibir la trama completa de una consulta
+REPORT_TIMEOUT = 60.0  # Los reportes X y Z responden al terminar de imprimir
+POLL_INTERVAL = 0.05  # Espera máxima de cada lectura del puerto dentro de un plazo
+
+# Estados (STS1, sin el bit de buffer lleno) y errores (STS2), con los códigos del DLL TfhkaNet
+STATUS_BUFFER_FULL = 0x04
+PRINTER_STATUS = {
+    0x40: (1, "En modo prueba y en espera"),
+    0x41: (2, "En modo prueba y en emisión de documentos fiscales"),
+    0x42: (3, "En modo prueba y en emisión de documentos no fiscales"),
+    0x60: (4, "En modo fiscal y en espera"),
+    0x61: (5, "En modo fiscal y en emisión de documentos fiscales"),
+    0x62: (6, "En modo fiscal y en emisión de documentos no fiscales"),
+    0x70: (7, "En modo fiscal, cercana carga completa de la memoria fiscal y en espera"),
+    0x71: (8, "En modo fiscal, cercana carga completa de la memoria fiscal y en emisión de documentos fiscales"),
+    0x72: (9, "En modo fiscal, cercana carga completa de la memoria fiscal y en emisión de documentos no fiscales"),
+    0x68: (10, "En modo fiscal, carga completa de la memoria fiscal y en espera"),
+    0x69: (11, "En modo fiscal, carga completa de la memoria fiscal y en emisión de documentos fiscales"),
+    0x6A: (12, "En modo fiscal, carga completa de la memoria fiscal y en emisión de documentos no fiscales"),
+}
+PRINTER_ERRORS = {
+    0x40: (0, "Sin error"),
+    0x41: (1, "Fin en la entrega de papel"),
+    0x42: (2, "Error de índole mecánico en la entrega de papel"),
+    0x43: (3, "Fin en la entrega de papel y error mecánico"),
+    0x50: (80, "Comando inválido/valor inválido"),
+    0x54: (84, "Tasa inválida"),
+    0x58: (88, "No hay asignadas directivas"),
+    0x5C: (92, "Comando inválido"),
+    0x60: (96, "Error fiscal"),
+    0x64: (100, "Error en memoria fiscal"),
+    0x6C: (108, "Memoria fiscal llena"),
+}
+ERROR_BUFFER_FULL = (112, "Buffer completo")
+ERROR_BUSY = (114, "Impresora no responde o ocupada")
+ERROR_NO_RESPONSE = (137, "No hay respuesta")
+ERROR_LRC = (144, "Error LRC")
+COMMUNICATION_ERRORS = {ERROR_BUSY[0], ERROR_NO_RESPONSE[0], ERROR_LRC[0]}
+
+PRINTER_MODELS = {  # Código de SV -> modelo (Tabla 27)
+    "Z7C": "HKA_80",
+    "Z7A": "HKA_112",
+    "Z1A": "SRP_270",
+    "Z1B": "SRP_350",
+    "Z1E": "SRP_280",
+    "Z1F": "SRP_812",
+    "ZPA": "HSP7000",
+    "Z6A": "TALLY_1125",
+    "Z6B": "DT_230",
+    "Z6C": "TD1140",
+    "ZYA": "P3100DL",
+    "ZZH": "PP9",
+    "ZZP": "PP9",
+}
+
+
+class ProtocolError(Exception):
+    """Error de comunicación con la impresora"""
+
+    def __init__(self, error: Tuple[int, str], detail: str = "") -> None:
+        self.code, self.description = error
+        super().__init__(f"{self.description}{': ' + detail if detail else ''}")
+
+
+def calculate_lrc(data: bytes) -> int:
+    """Calcula el LRC (XOR) de los datos de una trama, incluyendo el ETX"""
+    lrc = ETX
+    for byte in data:
+        lrc ^= byte
+    return lrc
+
+
+def build_frame(command: str) -> bytes:
+    """Arma la trama STX + comando + ETX + LRC"""
+    data = command.encode(ENCODING, errors="replace")
+    return bytes([STX]) + data + bytes([ETX, calculate_lrc(data)])
+
+
+def to_amount(value: str) -> float:
+    """Convierte un monto de la impresora (dos decimales implícitos, signo opcional) a float"""
+    value = value.strip()
+    digits = "".join(char for char in value if char.isdigit())
+    if not digits:
+        return 0.0
+    return -int(digits) / 100 if value.startswith("-") else int(digits) / 100
+
+
+def to_int(value: str) -> int:
+    """Convierte un contador de la impresora a entero"""
+    value = value.strip()
+    return int(value) if value.isdigit() else 0
+
+
+class FrameReader:
+    """
+    Lector con buffer del puerto serial. Lee lo disponible en bloques (no byte a byte) y
+    extrae las tramas del buffer, de modo que los bytes que llegan junto con una respuesta
+    no se pierden y cada espera está acotada por un plazo total.
+    """
+
+    def __init__(self, port: serial.Serial) -> None:
+        self.port = port
+        self.buffer = bytearray()
+
+    def clear(self) -> None:
+        """Descarta lo recibido antes de enviar un comando"""
+        self.buffer.clear()
+        self.port.reset_input_buffer()
+
+    def _fill(self, deadline: float) -> bool:
+        """
+        Agrega al buffer los bytes disponibles. Cada lectura espera como máximo POLL_INTERVAL
+        (el timeout del puerto, que no se reconfigura en cada lectura).
+        Returns:
+            bool: False si se cumplió el plazo.
+        """
+        if time.monotonic() >= deadline:
+            return False
+        chunk = self.port.read(max(1, self.port.in_waiting))
+        if chunk:
+            self.buffer.extend(chunk)
+        return True
+
+    def read_control(self, deadline: float) -> Optional[int]:
+        """
+        Lee el primer byte de control (ACK/NAK) recibido.
+        Returns:
+            Optional[int]: Byte recibido o None si se cumplió el plazo.
+        """
+        while True:
+            for index, byte in enumerate(self.buffer):
+                if byte in (ACK, NAK):
+                    del self.buffer[: index + 1]
+                    return byte
+            self.buffer.clear()  # Bytes que no son de control: ruido de la línea
+            if not self._fill(deadline):
+                return None
 
-class PrinterResponse(Enum):
-    """ class """
-    ACK = b"\x06"
-    NAK = b"\x15"
-    ENQ = b"\x05"
-    STX = b"\x02"
-    ETX = b"\x03"
+    def read_frame(self, deadline: float) -> bytes:
+        """
+        Lee una trama STX + datos + ETX + LRC, descartando lo recibido antes del STX.
+        Returns:
+            bytes: Datos de la trama.
+        Raises:
+            ProtocolError: Si se cumple el plazo o el LRC no coincide.
+        """
+        while True:
+            start = self.buffer.find(STX)
+            if start > 0:
+                del self.buffer[:start]
+            if start >= 0:
+                end = self.buffer.find(ETX, 1)
+                if end >= 0 and len(self.buffer) > end + 1:
+                    data = bytes(self.buffer[1:end])
+                    lrc = self.buffer[end + 1]
+                    del self.buffer[: end + 2]
+                    if calculate_lrc(data) != lrc:
+                        raise ProtocolError(ERROR_LRC, data.decode(ENCODING, errors="replace"))
+                    return data
+            elif self.buffer:
+                self.buffer.clear()
+            if not self._fill(deadline):
+                raise ProtocolError(ERROR_NO_RESPONSE)
 
 
 class FiscalPrinter:
-    """ class """
+    """Comunicación con una impresora fiscal TFHKA por puerto serial"""
 
-    def __init__(self, port="COM9"):
+    def __init__(self, port: str = "COM9", baudrate: int = 9600, timeout: float = ACK_TIMEOUT) -> None:
+        """
+        Args:
+            port: Puerto serial ('COM9', '/dev/ttyUSB0').
+            baudrate: Velocidad del puerto.
+            timeout: Segundos para recibir la confirmación de un comando.
+        """
         self.port = port
-        self.serial_printer = None
-        self.timeout = 2  # Aumentar timeout
-        self.wait_time = 1  # Tiempo de espera entre operaciones
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.serial_printer: Optional[serial.Serial] = None
+        self.reader: Optional[FrameReader] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Indica si el puerto está abierto"""
+        return self.serial_printer is not None and self.serial_printer.is_open
 
-    def open_port(self):
+    def open_port(self) -> bool:
         """Abre el puerto serial"""
         try:
             self.serial_printer = serial.Serial(
                 port=self.port,
-                baudrate=9600,
+                baudrate=self.baudrate,
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_EVEN,
                 stopbits=serial.STOPBITS_ONE,
-                timeout=self.timeout,
+                timeout=POLL_INTERVAL,
                 write_timeout=5,
-                rtscts=True,  # Habilitar control de flujo RTS/CTS
+                rtscts=True,  # Control de flujo RTS/CTS
             )
-            print(f"Puerto {self.port} abierto correctamente.")
+            self.reader = FrameReader(self.serial_printer)
+            logger.info("Puerto %s abierto", self.port)
             return True
-        except Exception as e:
-            print(f"Error al abrir el puerto: {e}")
+        except (serial.SerialException, ValueError) as e:
+            logger.error("Error al abrir el puerto %s: %s", self.port, str(e))
+            self.serial_printer = None
             return False
 
-    def close_port(self):
+    def close_port(self) -> None:
         """Cierra el puerto serial"""
-        if self.serial_printer and self.serial_printer.is_open:
+        if self.is_open:
             self.serial_printer.close()
-            print(f"Puerto {self.port} cerrado.")
+            logger.info("Puerto %s cerrado", self.port)
+        self.serial_printer = None
+        self.reader = None
 
-    def calculate_lrc(self, data):
-        """Calcula LRC para una trama dada"""
-        lrc = 0
-        for byte in data.encode("ascii"):
-            lrc ^= byte
-        lrc ^= 0x03  # XOR con ETX
-        return bytes([lrc])
+    def _write(self, data: bytes) -> None:
+        """Envía bytes a la impresora descartando lo recibido antes"""
+        if not self.is_open:
+            raise serial.SerialException(f"Puerto {self.port} cerrado")
+        self.reader.clear()
+        self.serial_printer.write(data)
 
-    def send_command(self, command, retries=0):
+    def send_command(self, command: str, timeout: Optional[float] = None) -> bool:
         """
-        Envía un comando al dispositivo fiscal y maneja la respuesta.
+        Envía un comando y espera la confirmación.
         Args:
-            command (str): Comando a enviar.
-            retries (int): Número de reintentos en caso de error.
+            command: Comando a enviar.
+            timeout: Segundos para recibir ACK/NAK; por defecto el del puerto.
         Returns:
-            bool: True si el comando fue enviado correctamente, False en caso contrario.
+            bool: True si la impresora respondió ACK.
         """
-        print(retries)
-        try:
-            self.serial_printer.flushInput()
-            self.serial_printer.flushOutput()
-
-            # Construir trama
-            trama = bytes([0x02]) + command.encode("ascii") + bytes([0x03])
-            lrc = self.calculate_lrc(command)
-            trama += lrc
-
-            print(f"[TX] {trama.hex().upper()}")
-
-            # Enviar comando
-            self.serial_printer.write(trama)
-
-            # Leer ACK/NAK
-            ack = self.serial_printer.read(1)
-
-            if ack == b"\x06":
-                print("[RX] ACK - Comando aceptado")
-
-                # Comandos que no generan respuesta extendida
-                if command[0] in ("i", "P", "!"):  # Configuraciones y items
-                    print("Comando simple: OK")
-                    return True
-
-                # Comandos fiscales con respuesta extendida
-                print("Leyendo respuesta fiscal...")
-                response = self._read_fiscal_response()
-                return response if response else False
-
-            if ack == b"\x15":
-                print("[RX] NAK - Error en el comando")
-                return False
-
-            print(f"[RX] Respuesta inválida: {ack.hex() if ack else 'Timeout'}")
-            return False
-
-        except Exception as e:
-            print(f"Error: {str(e)}")
-            return False
-
-    def _read_fiscal_response(self):
-        """Lee respuesta fiscal con timeout extendido"""
-        timeout = 5  # 5 segundos para impresoras lentas
-        start = time.time()
-        response = b""
-
-        while (time.time() - start) < timeout:
-            byte = self.serial_printer.read(1)
-            if byte:
-                response += byte
-                if byte == b"\x03":  # ETX
-                    lrc = self.serial_printer.read(1)
-                    if lrc:
-                        response += lrc
-                        if self._validate_lrc(response):
-                            print(f"[RX] Respuesta completa: {response.hex().upper()}")
-                            return self._parse_fiscal_response(response)
-                        print("[RX] Error LRC")
-                        return False
-        print("[RX] Timeout")
+        self._write(build_frame(command))
+        answer = self.reader.read_control(time.monotonic() + (timeout or self.timeout))
+        if answer == ACK:
+            return True
+        logger.debug("Comando %s: %s", command, "NAK" if answer == NAK else "sin respuesta")
         return False
 
-    def _validate_lrc(self, response):
-        lrc_calculado = self.calculate_lrc(response[1:-2].decode("ascii"))[0]
-        return response[-1] == lrc_calculado
-
-    def _parse_fiscal_response(self, response):
-        """Parsea respuestas de comandos fiscales según Tabla 29 del manual"""
-        try:
-            data = response[1:-2].decode("ascii")  # Remover STX, ETX, LRC
-            print(f"Datos fiscales: {data}")
-            return data
-        except UnicodeDecodeError:
-            return response.hex()
-
-    def _read_full_response(self):
-        """Lee toda la trama de respuesta incluyendo STX, DATA, ETX y LRC."""
-        response = b""
-        start_time = time.time()
-
-        while True:
-            if time.time() - start_time > self.timeout:
-                print("Timeout esperando respuesta.")
-                return None
-
-            byte = self.serial_printer.read(1)
-            if not byte:
-                continue
-
-            response += byte
-
-            # Detectar fin de trama (ETX + LRC)
-            if len(response) >= 4 and response[-2] == 0x03:
-                lrc_received = response[-1]
-                lrc_calculated = self.calculate_lrc(response[1:-2].decode("ascii"))[0]
-                if lrc_received == lrc_calculated:
-                    print("LRC válido.")
-                    return response
-                print(f"Error de LRC: Esperado {lrc_calculated}, Recibido {lrc_received}")
-                return None
-
-    def get_printer_status(self):
-        """Versión mejorada con manejo robusto de ENQ"""
+    def query(self, command: str, timeout: float = FRAME_TIMEOUT) -> List[str]:
+        """
+        Envía una consulta y lee la trama de respuesta.
+        Args:
+            command: Consulta ('S1', 'S2', 'S3', 'SV'...).
+            timeout: Segundos para recibir la trama completa.
+        Returns:
+            List[str]: Campos de la respuesta (separados por LF en la trama).
+        Raises:
+            ProtocolError: Si no hay respuesta o la trama es inválida.
+        """
+        self._write(build_frame(command))
+        data = self.reader.read_frame(time.monotonic() + timeout).decode(ENCODING, errors="replace")
+        fields = data.split(FIELD_SEPARATOR)
+        while fields and not fields[-1].strip():
+            fields.pop()
+        if not fields or not fields[0].startswith(command[:2]):
+            raise ProtocolError(ERROR_BUSY, f"respuesta inesperada a {command}: {data!r}")
+        return fields
+
+    def read_status(self) -> Dict[str, Any]:
+        """
+        Consulta el estado con ENQ.
+        Returns:
+            Dict[str, Any]: Códigos y descripciones de estado y error, como GetPrinterStatus del DLL.
+        """
         try:
-            self.serial_printer.flushInput()
-            self.serial_printer.flushOutput()
-
-            # Enviar ENQ
-            self.serial_printer.write(b"\x05")
-
-            # Esperar antes de leer
-            time.sleep(self.wait_time)
-
-            # Leer 4 bytes (STS1 + STS2 + ETX + LRC)
-            status_data = self.serial_printer.read(5)
-
-            if len(status_data) == 5:
-                sts1 = status_data[1]  # Segundo byte es STS1
-                sts2 = status_data[2]  # Tercer byte es STS2
-                return self._parse_status(sts1, sts2)
-
-            print(f"Respuesta incompleta: {status_data}")
-            return {"status": "Desconocido", "error": "Respuesta inválida"}
-
-        except Exception as e:
-            print(f"Error ENQ: {str(e)}")
-            return None
-
-    def _parse_status(self, sts1, sts2):
-        # Mapeo actualizado según Tabla 7 y 8 del manual
-        status_codes = {
-            0x40: "Modo Entrenamiento y en Espera",
-            0x60: "Modo Fiscal y en Espera",
-            0x61: "Documento fiscal abierto",
-            0x68: "Memoria Fiscal llena",
-        }
-
-        error_codes = {
-            0x40: "Sin errores",
-            0x41: "Papel agotado",
-            0x42: "Error mecánico",
-            0x43: "Papel agotado + error mecánico",
-            0x60: "Error fiscal",
-            0x64: "Error en la memoria fiscal",
-            0x6C: "Memoria fiscal llena",
+            self._write(bytes([ENQ]))
+            data = self.reader.read_frame(time.monotonic() + self.timeout)
+            if len(data) != 2:
+                raise ProtocolError(ERROR_BUSY, f"respuesta de estado inválida: {data!r}")
+            sts1, sts2 = data
+            status_code, status_description = PRINTER_STATUS.get(
+                sts1 & ~STATUS_BUFFER_FULL, (0, f"Estado desconocido (0x{sts1:02X})")
+            )
+            if sts1 & STATUS_BUFFER_FULL:
+                error_code, error_description = ERROR_BUFFER_FULL
+            else:
+                error_code, error_description = PRINTER_ERRORS.get(sts2, (sts2, f"Error desconocido (0x{sts2:02X})"))
+            validity = True
+        except (ProtocolError, serial.SerialException) as e:
+            status_code, status_description = 0, "Estado desconocido"
+            error_code, error_description = e.code if isinstance(e, ProtocolError) else ERROR_BUSY[0], str(e)
+            validity = False
+        return {
+            "error_validity": validity,
+            "error_code": error_code,
+            "error_description": error_description,
+            "status_code": status_code,
+            "status_description": status_description,
         }
 
+    def get_sv(self) -> Dict[str, str]:
+        """Modelo y país de la impresora (SV)"""
+        fields = self.query("SV")
+        code = fields[1].strip() if len(fields) > 1 else ""
         return {
-            "status": status_codes.get(sts1, f"Estado desconocido (0x{sts1:02X})"),
-            "error": error_codes.get(sts2, f"Error desconocido (0x{sts2:02X})"),
+            "model": PRINTER_MODELS.get(code, code),
+            "model_code": code,
+            "country": fields[2].strip() if len(fields) > 2 else "",
         }
 
-    def read_flags(self, flags_to_read=None):
+    def get_s1(self) -> Dict[str, Any]:
         """
-        Lee los flags de configuración según Tabla 72 del manual (página 79)
-        Args:
-            flags_to_read (list): Lista de flags a leer (ej: [21, 50])
-        Returns:
-            dict: {flag: valor} o None si hay error
+        Parámetros generales y contadores (S1). El primer campo trae el número de cajero junto
+        al 'S1'; los campos finales se leen desde el final porque algunos modelos agregan campos.
         """
-        if flags_to_read is None:
-            flags_to_read = [21, 50, 30, 43]
+        fields = self.query("S1")
+        if len(fields) < 16:
+            raise ProtocolError(ERROR_BUSY, f"trama S1 incompleta ({len(fields)} campos)")
+        date, hour = fields[-1].strip(), fields[-2].strip()
+        return {
+            "cashier_number": fields[0][2:].strip(),
+            "total_daily_sales": to_amount(fields[1]),
+            "last_invoice": to_int(fields[2]),
+            "invoices_today": to_int(fields[3]),
+            "last_debit_note": to_int(fields[4]),
+            "debit_notes_today": to_int(fields[5]),
+            "last_credit_note": to_int(fields[6]),
+            "credit_notes_today": to_int(fields[7]),
+            "last_non_fiscal_doc": to_int(fields[-8]),
+            "non_fiscal_docs_today": to_int(fields[-7]),
+            "audit_reports": to_int(fields[-6]),
+            "daily_closure": to_int(fields[-5]),
+            "rif": fields[-4].strip(),
+            "machine_number": fields[-3].strip(),
+            "current_time": f"{hour[0:2]}:{hour[2:4]}:{hour[4:6]}",
+            "current_date": f"20{date[4:6]}-{date[2:4]}-{date[0:2]}",  # DDMMAA -> AAAA-MM-DD
+        }
 
-        try:
-            self.serial_printer.flushInput()
-            self.serial_printer.write(b"\x02S3\x03")  # Comando S3
-            time.sleep(0.5)
-            response = self._read_full_response()
-
-            if response and len(response) >= 150:  # Longitud mínima S3
-                data = response[1:-2].decode("ascii")  # Remover STX, ETX, LRC
-                flags = {}
-
-                # Mapeo de posiciones según manual (página 79)
-                flag_positions = {
-                    21: (146, 2),  # Posición 146-147, 2 dígitos
-                    50: (26, 2),  # Posición 26-27
-                    30: (20, 2),  # Posición 20-21
-                    43: (88, 2),  # Posición 88-89
-                }
-
-                for flag in flags_to_read:
-                    if flag in flag_positions:
-                        start, length = flag_positions[flag]
-                        flags[flag] = data[start : start + length]
-
-                return flags
-            return None
-
-        except Exception as e:
-            print(f"Error leyendo flags: {str(e)}")
-            return None
-
-    def get_printer_model(self):
+    def get_s2(self) -> Dict[str, Any]:
+        """Montos del documento en curso (S2). El primer campo trae la base imponible junto al 'S2'."""
+        fields = self.query("S2")
+        if len(fields) < 7:
+            raise ProtocolError(ERROR_BUSY, f"trama S2 incompleta ({len(fields)} campos)")
+        return {
+            "subtotal_bases": to_amount(fields[0][2:]),
+            "subtotal_tax": to_amount(fields[1]),
+            "data_dummy": to_amount(fields[2]),
+            "articles": to_int(fields[3]),
+            "amount_payable": to_amount(fields[-3]),
+            "payments_made": to_int(fields[-2]),
+            "document_type": to_int(fields[-1]),
+        }
+
+    def get_s3(self) -> Dict[str, Any]:
         """
-        Lee el modelo de impresora usando comando SV (Status SV)
-        Returns:
-            str: Modelo detectado o None
+        Tasas de impuesto y flags (S3). Cada tasa es el tipo (un carácter) seguido del valor;
+        el primer campo trae la tasa 1 junto al 'S3' y el último los flags, dos dígitos cada uno.
         """
-        try:
-            response = self.send_command("SV")
-            print(response)
-            if response and len(response) >= 3:
-                model_code = str(response)[:3] if response else ""
-                model_map = {
-                    "Z7C": "HKA-80",
-                    "Z7A": "HKA-112",
-                    "Z1A": "SRP-270",
-                    "Z1B": "SRP-350",
-                    "Z1E": "SRP-280",
-                    "Z1F": "SRP-812",
-                    "ZPA": "HSP7000",
-                    "Z6A": "TALLY 1125",
-                    "Z6B": "DT-230",
-                    "Z6C": "TALLY 1140",
-                    "ZYA": "P3100DL",
-                    "ZZH": "PP9",
-                    "ZZP": "PP9-PLUS",
-                } # Tabla 27 (página 31)
-                return model_map.get(model_code, "Desconocido")
-            return None
-        except Exception as e:
-            print(f"Error detectando modelo: {str(e)}")
-            return None
-
-
-# Uso mejorado
-if __name__ == "__main__":
-    printer = FiscalPrinter(port="COM9")
-
-    if printer.open_port():
-        responde = printer.get_printer_model()
-        print(responde)
-
-        # responde = printer.read_flags([21, 50])
-        # print(responde)
-
-        # # 1. Configurar Flags esenciales
-        # printer.send_command("PJ5001")  # Flag 50=01
-        # print("1")
-        # # 2. Configurar encabezados
-        # printer.send_command("iR*J-123456789")  # RIF
-        # print("2")
-        # printer.send_command("iS*Tienda Demo")  # Razón Social
-        # print("3")
-        # # 3. Transacción demo
-        # printer.send_command("!0000000100000001000Producto 1")  # Item
-        # print("4")
-        # printer.send_command("101")  # Pago completo 100.00 Bs
-        # print("5")
-        # printer.send_command("199")  # Cierre
-        # print("6")
-
-        printer.close_port()
+        fields = self.query("S3")
+        if len(fields) < 4:
+            raise ProtocolError(ERROR_BUSY, f"trama S3 incompleta ({len(fields)} campos)")
+        rates = [fields[0][2:], fields[1], fields[2]]
+        taxes = [{"type": rate[:1], "value": to_amount(rate[1:])} for rate in rates]
+        igtf = {"type": "", "value": 0.0}
+        if len(fields) > 4:  # Modelos con IGTF
+            igtf = {"type": fields[3][:1], "value": to_amount(fields[3][1:])}
+        raw_flags = fields[-1].strip()
+        flags = [raw_flags[index : index + 2] for index in range(0, len(raw_flags) - 1, 2)]
+        return {"taxes": taxes, "igtf": igtf, "flags": flags}
+
+    def check_printer(self) -> bool:
+        """Indica si la impresora responde al ENQ"""
+        return self.read_status()["error_code"] not in COMMUNICATION_ERRORS
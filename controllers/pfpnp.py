@@ -10,6 +10,7 @@ https://github.com/eyngroup/api_printer_server
 """
 
 import time
+from decimal import ROUND_HALF_UP, Decimal
 from typing import Optional
 
 import serial
@@ -25,6 +26,7 @@ class FiscalPrinter:
     DEL = b"\x7f"  # Carácter de control para cierre
 
     # Constantes para comandos
+    CMD_REPORT = b"\x39"  # Reportes X y Z; responde con dos tramas, la segunda al terminar de imprimir
     CMD_STATUS = b"\x02 8\x1c"  # Comando de estado
     CMD_REPORT_X = b"\x02 9\x1cX\x1cT\x03"  # Reporte X
     CMD_REPORT_Z = b"\x02 9\x1cZ\x1cT\x03"  # Reporte Z
@@ -40,6 +42,7 @@ class FiscalPrinter:
     CMD_ADD_FISCAL_TEXT = b"\x41"  # Agregar texto fiscal
     CMD_ADD_FISCAL_ITEM = b"\x42"  # Agregar ítem fiscal
     CMD_GET_SUBTOTAL = b"\x43"  # Obtener subtotal
+    CMD_CANCEL_FISCAL = b"\x44"  # Cancelar documento fiscal
     CMD_CLOSE_FISCAL = b"\x45"  # Cerrar documento fiscal
 
     # Calificadores de documento fiscal
@@ -51,6 +54,7 @@ class FiscalPrinter:
     CLOSE_PARTIAL_IGTF = b"\x42"  # Cierre parcial con IGTF
     CLOSE_TOTAL = b"\x54"  # Cierre total
     CLOSE_TOTAL_IGTF = b"\x55"  # Cierre total con IGTF
+    CANCEL = b"\x43"  # Calificador de cancelación (C)
 
     # Calificadores de operación
     OP_ADD = b"\x4d"  # Suma (M)
@@ -60,14 +64,20 @@ class FiscalPrinter:
     SEQ_MIN = 0x20  # Valor mínimo de secuencia (32 decimal)
     SEQ_MAX = 0x7F  # Valor máximo de secuencia (127 decimal)
 
+    # Tiempos de espera (segundos)
+    RESPONSE_TIMEOUT = 10  # Plazo total para recibir la respuesta de un comando
+    REPORT_TIMEOUT = 60  # Plazo de los reportes X y Z, que responden al terminar de imprimir
+    POLL_INTERVAL = 0.05  # Bloqueo máximo de cada lectura del puerto
+    FISCAL_ERROR_MASK = 0x00FB  # Bits 0-1 y 3-7 del estado fiscal: el comando fue rechazado
+
     status_connection = False
     message_connection = ""
     message_command = ""
-    time_delay = 0.8
     is_debug = False
 
-    def __init__(self, port: str):
+    def __init__(self, port: str, baudrate: int = 9600):
         self.port = port
+        self.baudrate = baudrate
         self.serial_connection: Optional[serial.Serial] = None
         self._last_sequence = self.SEQ_MAX  # Iniciar al máximo para que el primer comando use SEQ_MIN
 
@@ -88,19 +98,20 @@ class FiscalPrinter:
         try:
             self.serial_connection = serial.Serial(
                 port=self.port,
-                baudrate=9600,
+                baudrate=self.baudrate,
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
-                timeout=2,
+                timeout=self.POLL_INTERVAL,
                 write_timeout=5,
                 xonxoff=False,
                 rtscts=False,
                 dsrdtr=False,
             )
 
-            # buffers de lectura/escritura
-            self.serial_connection.set_buffer_size(rx_size=4096, tx_size=4096)
+            # buffers de lectura/escritura (solo existe en Windows)
+            if hasattr(self.serial_connection, "set_buffer_size"):
+                self.serial_connection.set_buffer_size(rx_size=4096, tx_size=4096)
 
             if self.serial_connection.is_open:
                 self.status_connection = True
@@ -122,51 +133,83 @@ class FiscalPrinter:
                 print(f"Puerto {self.port} cerrado correctamente.")
             self.status_connection = False
 
-    def _read_response(self) -> bytes:
+    def _read_response(self, command: bytes) -> bytes:
         """
-        Lee la respuesta completa de la impresora fiscal.
-        La respuesta debe comenzar con STX y terminar con ETX + BCC.
+        Lee la respuesta de la impresora fiscal apenas llega completa.
+        Cada trama va de STX a ETX seguida del BCC (4 caracteres); el comando 9 (reportes)
+        responde con dos tramas y se espera la segunda, salvo que la primera traiga un error.
+        Args:
+            command: Comando que generó la respuesta
         Returns:
-            bytes: Respuesta completa de la impresora
+            bytes: Respuesta completa de la impresora (ambas tramas en el comando 9)
+        Raises:
+            TimeoutError: Si la respuesta no se completa dentro del plazo
         """
+        is_report = command[2:3] == self.CMD_REPORT
+        deadline = time.monotonic() + (self.REPORT_TIMEOUT if is_report else self.RESPONSE_TIMEOUT)
+        frames = 2 if is_report else 1
         buffer = bytearray()
-        timeout_counter = 0
-        max_timeout = 20  # 2 segundos máximo de espera
-
-        # Esperar a tener datos
-        while self.serial_connection.in_waiting == 0:
-            time.sleep(0.5)
-            timeout_counter += 1
-            if timeout_counter >= max_timeout:
-                raise TimeoutError("No se recibió respuesta de la impresora")
-
-        # Leer todos los bytes
-        time.sleep(0.5)
-        while self.serial_connection.in_waiting > 0:
-            buffer.extend(self.serial_connection.read(self.serial_connection.in_waiting))
-
-        if not buffer:
-            raise ValueError("No se recibieron datos")
-
-        if self.ETX not in buffer:  # Buscamos STX y ETX
-            raise ValueError(f"Respuesta no contiene ETX: {buffer}")
-
-        etx_pos = buffer.index(self.ETX)
-        if len(buffer) < etx_pos + 5:  # Aseguramos que tenemos 4 bytes después del ETX para el BCC
-            raise ValueError(f"Respuesta no contiene BCC completo: {buffer}")
-
-        return bytes(buffer)
+        start = end = 0
+
+        while frames:
+            end = self._frame_end(buffer, start)
+            if end < 0:
+                if time.monotonic() >= deadline:
+                    if buffer:
+                        raise TimeoutError(f"Respuesta incompleta de la impresora: {bytes(buffer)}")
+                    raise TimeoutError("No se recibió respuesta de la impresora")
+                # Bloquea hasta que llegue al menos un byte o pase POLL_INTERVAL
+                buffer.extend(self.serial_connection.read(max(1, self.serial_connection.in_waiting)))
+                continue
+
+            frames -= 1
+            if frames and self._is_rejected(buffer[start:end]):
+                break  # Un reporte rechazado no envía la segunda trama
+            start = end
+
+        return bytes(buffer[buffer.find(self.STX) : end])  # Sin bytes sueltos anteriores a la primera trama
+
+    def _frame_end(self, buffer: bytearray, start: int) -> int:
+        """
+        Busca el final de la trama que comienza en start (o en el primer STX posterior).
+        Las respuestas de 0x80 y de los documentos no fiscales traen los campos después de un
+        primer ETX; la trama termina en el ETX cuyo BCC coincide y que no va seguido de un campo.
+        Args:
+            buffer: Bytes recibidos
+            start: Posición desde la que se busca la trama
+        Returns:
+            int: Posición siguiente al BCC, o -1 si la trama aún no está completa
+        """
+        stx = buffer.find(self.STX, start)
+        if stx < 0:
+            return -1
+
+        etx = buffer.find(self.ETX, stx)
+        while 0 <= etx and etx + 5 <= len(buffer):
+            bcc = self._calculate_bcc(buffer[stx : etx + 1]).encode("iso-8859-1")
+            if buffer[etx + 1 : etx + 5] == bcc and buffer[etx + 5 : etx + 6] != self.SEP:
+                return etx + 5
+            etx = buffer.find(self.ETX, etx + 1)
+        return -1
+
+    def _is_rejected(self, frame: bytes) -> bool:
+        """Indica si el estado fiscal de la trama (segundo campo) señala un comando rechazado"""
+        fields = frame.split(self.SEP)
+        try:
+            return b"ERROR" in frame or bool(int(fields[2][:4], 16) & self.FISCAL_ERROR_MASK)
+        except (IndexError, ValueError):
+            return False
 
     @staticmethod
     def _printer_status(status: bytes) -> dict:
         """
-        Parsea el estado de la impresora (4 bytes en hexadecimal)
+        Parsea el estado de la impresora (4 dígitos hexadecimales, p. ej. b"0080")
         Args:
             status: Estado de la impresora en bytes
         Returns:
             dict: Diccionario con los estados parseados
         """
-        status_int = int.from_bytes(status, "big")
+        status_int = int(status, 16)
         return {
             "error_impresora": bool(status_int & (1 << 2)),
             "fuera_linea": bool(status_int & (1 << 3)),
@@ -177,13 +220,13 @@ class FiscalPrinter:
     @staticmethod
     def _fiscal_status(status: bytes) -> dict:
         """
-        Parsea el estado fiscal (4 bytes en hexadecimal)
+        Parsea el estado fiscal (4 dígitos hexadecimales, p. ej. b"0600")
         Args:
             status: Estado fiscal en bytes
         Returns:
             dict: Diccionario con los estados parseados
         """
-        status_int = int.from_bytes(status, "big")
+        status_int = int(status, 16)
         return {
             "error_memoria_fiscal": bool(status_int & (1 << 0)),
             "error_memoria_trabajo": bool(status_int & (1 << 1)),
@@ -208,7 +251,7 @@ class FiscalPrinter:
             list: Lista de campos extraídos
         """
         try:
-            if command[1:2] == b"9":
+            if command[2:3] == self.CMD_REPORT:  # La respuesta final es la segunda trama
                 stx_pos = response.rindex(self.STX)
                 response = response[stx_pos:]
 
@@ -260,9 +303,7 @@ class FiscalPrinter:
                     self.serial_connection.reset_output_buffer()
 
                 self.serial_connection.write(cmd_bcc)
-                time.sleep(self.time_delay)
-
-                response = self._read_response()
+                response = self._read_response(cmd)
                 if self.is_debug:
                     print(f"Respuesta completa: {response}")
 
@@ -289,6 +330,8 @@ class FiscalPrinter:
                     "fields": fields,
                 }
 
+            except TimeoutError as e:
+                return {"status": "error", "error": str(e), "timeout": True}
             except Exception as e:
                 return {"status": "error", "error": str(e)}
         else:
@@ -308,6 +351,17 @@ class FiscalPrinter:
         self._last_sequence = next_seq
         return bytes([next_seq])
 
+    def _sequenced(self, cmd: bytes) -> bytes:
+        """
+        Reemplaza el número de secuencia fijo de un comando predefinido (CMD_*) por el siguiente.
+        La impresora responde sin ejecutar un comando que repite la secuencia del anterior.
+        Args:
+            cmd: Comando completo con STX en la primera posición
+        Returns:
+            bytes: Comando con un número de secuencia nuevo
+        """
+        return cmd[:1] + self._next_sequence() + cmd[2:]
+
     def _build_command(self, cmd: bytes, *args: bytes) -> bytes:
         """
         Construye un comando para enviar a la impresora.
@@ -357,7 +411,7 @@ class FiscalPrinter:
         Returns:
             dict: Respuesta de la impresora fiscal
         """
-        cmd = self._build_command(self.CMD_REPORT_X)
+        cmd = self._sequenced(self.CMD_REPORT_X)
         response = self.send_command(cmd)
 
         if response["status"] == "ok":
@@ -371,7 +425,7 @@ class FiscalPrinter:
         Returns:
             dict: Respuesta de la impresora fiscal
         """
-        cmd = self._build_command(self.CMD_REPORT_Z)
+        cmd = self._sequenced(self.CMD_REPORT_Z)
         response = self.send_command(cmd)
 
         if response["status"] == "ok":
@@ -387,16 +441,33 @@ class FiscalPrinter:
         Returns:
             dict: Estado de la impresora fiscal
         """
-        cmd = self.CMD_STATUS + tipo.encode("iso-8859-1") + self.ETX
+        cmd = self._sequenced(self.CMD_STATUS) + tipo.encode("iso-8859-1") + self.ETX
         return self.send_command(cmd)
 
+    def command(self, text: str) -> dict:
+        """
+        Envía un comando escrito como en PFComando del DLL: el código y sus campos separados por '|'.
+        Args:
+            text: Comando, p. ej. '8|V' (estado) o 'E|B|1000' (cierre parcial con IGTF)
+        Returns:
+            dict: Respuesta de la impresora fiscal
+        """
+        code, *fields = text.split("|")
+        cmd = bytearray(self.STX + self._next_sequence() + code.encode("iso-8859-1"))
+        for field in fields:
+            cmd.extend(self.SEP)
+            cmd.extend(field.encode("iso-8859-1"))
+
+        cmd.extend(self.ETX)
+        return self.send_command(bytes(cmd))
+
     def serial_info(self) -> dict:
         """
         Obtiene la información de serial y registro del equipo.
         Returns:
             dict: Diccionario con la información del equipo
         """
-        cmd = self._build_command(self.CMD_SERIAL_INFO)
+        cmd = self._sequenced(self.CMD_SERIAL_INFO)
         response = self.send_command(cmd)
 
         if response["status"] == "ok" and response["fields"]:
@@ -543,9 +614,9 @@ class FiscalPrinter:
             dict: Respuesta de la impresora fiscal
         """
         description = description[:20]
-        qty = str(int(quantity * 1000))  # 3 decimales sin punto
-        prc = str(int(price * 100))  # 2 decimales sin punto
-        tax = str(int(tax_rate * 100))  # 2 decimales sin punto
+        qty = self._scaled(quantity, 1000)  # 3 decimales sin punto
+        prc = self._scaled(price, 100)  # 2 decimales sin punto
+        tax = self._scaled(tax_rate, 100)  # 2 decimales sin punto
         tax = tax.zfill(4)  # Rellenamos con ceros a la izquierda
 
         seq = self._next_sequence()
@@ -568,6 +639,11 @@ class FiscalPrinter:
         cmd.extend(self.ETX)
         return self.send_command(bytes(cmd))
 
+    @staticmethod
+    def _scaled(value: float, factor: int) -> str:
+        """Escala un monto a entero sin punto decimal, redondeando sin los errores del float (0.29 -> 29)"""
+        return str(int((Decimal(str(value)) * factor).quantize(Decimal("1"), rounding=ROUND_HALF_UP)))
+
     def get_subtotal(self) -> dict:
         """
         Obtiene el subtotal del documento fiscal actual.
@@ -582,16 +658,16 @@ class FiscalPrinter:
         """
         Cierra el documento fiscal actual.
         Args:
-            amount: Monto recibido (formato: nnnnnn.nn)
+            amount: Monto recibido (formato: nnnnnn.nn); con 0 y sin IGTF se envía solo el cierre total
             add_igtf: Si True, agrega el IGTF al cierre
         Returns:
             dict: Respuesta de la impresora fiscal
         """
-        amount_str = str(int(amount * 100))  # 2 decimales sin punto
+        amount_str = self._scaled(amount, 100)  # 2 decimales sin punto
         seq = self._next_sequence()
         close_type = self.CLOSE_TOTAL_IGTF if add_igtf else self.CLOSE_TOTAL
 
-        fields = [close_type, amount_str.encode("ascii")]
+        fields = [close_type, amount_str.encode("ascii")] if amount or add_igtf else [close_type]
         cmd = bytearray(self.STX + seq + self.CMD_CLOSE_FISCAL)
         for field in fields:
             cmd.extend(self.SEP)
@@ -599,3 +675,19 @@ class FiscalPrinter:
 
         cmd.extend(self.ETX)
         return self.send_command(bytes(cmd))
+
+    def fiscal_cancel(self) -> dict:
+        """
+        Cancela el documento fiscal abierto.
+        Returns:
+            dict: Respuesta de la impresora fiscal
+        """
+        seq = self._next_sequence()
+        fields = [b"", b"", self.CANCEL, self.DEL]
+        cmd = bytearray(self.STX + seq + self.CMD_CANCEL_FISCAL)
+        for field in fields:
+            cmd.extend(self.SEP)
+            cmd.extend(field)
+
+        cmd.extend(self.ETX)
+        return self.send_command(bytes(cmd))
@@ -6,21 +6,26 @@ Licensed under the GNU Affero General Public License, version 3 or later.
 Creado en memoria de mi amado hijo Ian
 """
 
+import atexit
 import glob
 import logging
 import os
+import signal
+import sys
 import webbrowser
 from datetime import datetime, timedelta
-from logging.config import dictConfig
 from logging.handlers import TimedRotatingFileHandler
 from utils.version import __version__
 
+from utils.log_queue import DEFAULT_QUEUE_SIZE, OVERFLOW_DROP, LogPipeline
 from utils.tools import get_base_path
 from server.config_loader import ConfigManager
-from server.server_api import create_app
+from server.server_api import create_app, shutdown_app
 
 print(f"Versión actual: {__version__}")
 
+SHUTDOWN_TIMEOUT = 30  # Segundos para terminar los trabajos en cola de cada impresora
+
 
 def main():
     """Función principal que inicializa el servidor API REST."""
@@ -37,16 +42,74 @@ def main():
 
     server_host = config.get("server", {}).get("server_host", "0.0.0.0")
     server_port = config.get("server", {}).get("server_port", 5000)
-    server_debug = config.get("server", {}).get("server_debug", False)
 
     if config.get("server", {}).get("auto_browser", False):  # Iniciar el navegador
         webbrowser.open(f"http://{server_host}:{server_port}")
 
+    for signal_name in ("SIGTERM", "SIGBREAK"):  # Detener el servidor también al cerrar el servicio
+        if hasattr(signal, signal_name):
+            signal.signal(getattr(signal, signal_name), lambda *_: sys.exit(0))
+
+    try:
+        run_server(app, config.get("server", {}))  # Iniciar el servidor
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        logger.info("Deteniendo Servidor API REST")
+        ConfigManager.stop_watcher()
+        shutdown_app(SHUTDOWN_TIMEOUT)
+        logger.info("Servidor API REST detenido")
+        LogPipeline.stop()
+
+
+def run_server(app, server_config: dict) -> None:
+    """
+    Ejecuta la aplicación con el servidor configurado en 'server_engine'.
+    - waitress: servidor WSGI de producción con hilos, límite de conexiones y backlog configurables.
+    - flask: servidor de desarrollo de Werkzeug.
+    Args:
+        app: Aplicación Flask.
+        server_config: Sección 'server' de la configuración.
+    """
+    logger = logging.getLogger(__name__)
+    server_host = server_config.get("server_host", "0.0.0.0")
+    server_port = server_config.get("server_port", 5000)
+    server_engine = server_config.get("server_engine", "flask").lower()
+
+    if server_engine == "waitress":
+        try:
+            from waitress import serve
+        except ImportError:
+            logger.warning("waitress no está instalado, se usa el servidor de desarrollo de Flask")
+        else:
+            threads = server_config.get("server_threads", 8)
+            connection_limit = server_config.get("server_connection_limit", 100)
+            backlog = server_config.get("server_backlog", 1024)
+            logger.info(
+                "Servidor waitress en %s:%s - Hilos: %s, Conexiones: %s, Backlog: %s",
+                server_host,
+                server_port,
+                threads,
+                connection_limit,
+                backlog,
+            )
+            serve(
+                app,
+                host=server_host,
+                port=server_port,
+                threads=threads,
+                connection_limit=connection_limit,
+                backlog=backlog,
+                ident="api_printer_spooler",
+            )
+            return
+
     app.run(
         host=server_host,
         port=server_port,
-        debug=server_debug,
-    )  # Iniciar el servidor
+        debug=server_config.get("server_debug", False),
+        use_reloader=False,  # El recargador crea un segundo proceso que duplicaría los hilos de impresora
+    )
 
 
 def cleanup_old_logs(log_dir: str, max_days: int) -> None:
@@ -99,9 +162,29 @@ class CustomTimedRotatingFileHandler(TimedRotatingFileHandler):
         cleanup_old_logs(self.log_dir, self.max_days)
 
 
+class ColorFormatter(logging.Formatter):
+    """Formatter con colores según el nivel del log, solo para la consola"""
+
+    COLORS = {
+        "DEBUG": "\033[34m",  # Azul
+        "INFO": "\033[32m",  # Verde
+        "WARNING": "\033[33m",  # Amarillo
+        "ERROR": "\033[31m",  # Rojo
+        "CRITICAL": "\033[41m",  # Fondo rojo
+    }
+    RESET = "\033[0m"
+
+    def format(self, record):
+        if record.levelname in self.COLORS:  # Copia: el mismo registro se escribe también en el archivo
+            record = logging.makeLogRecord(record.__dict__)
+            record.levelname = f"{self.COLORS[record.levelname]}{record.levelname}{self.RESET}"
+        return super().format(record)
+
+
 def configure_logging(log_config: dict) -> None:
     """
     Configura el sistema de logging con rotación de archivos y limpieza automática.
+    Los loggers solo encolan los registros; el archivo y la consola se escriben en un hilo de fondo.
     Args:
         log_config: Diccionario con la configuración de logging
     """
@@ -113,69 +196,32 @@ def configure_logging(log_config: dict) -> None:
     log_file = log_config.get("log_file", "printer_service")
     log_format = log_config.get("log_format", "%(asctime)s | %(levelname)s | %(message)s")
     log_level = getattr(logging, log_config.get("log_level", "INFO").upper(), logging.INFO)
+    queue_size = log_config.get("log_queue_size", DEFAULT_QUEUE_SIZE)
+    overflow = log_config.get("log_overflow", OVERFLOW_DROP)
 
     current_date = datetime.now().strftime("%Y%m%d")
     log_filename = f"{log_file}-{current_date}.log"
 
     cleanup_old_logs(log_dir, log_days)
 
-    class ColorFormatter(logging.Formatter):
-        """Formatter con colores según el nivel del log"""
-
-        COLORS = {
-            "DEBUG": "\033[34m",  # Azul
-            "INFO": "\033[32m",  # Verde
-            "WARNING": "\033[33m",  # Amarillo
-            "ERROR": "\033[31m",  # Rojo
-            "CRITICAL": "\033[41m",  # Fondo rojo
-        }
-        RESET = "\033[0m"
-
-        def format(self, record):
-            if record.levelname in self.COLORS:
-                record.levelname = f"{self.COLORS[record.levelname]}{record.levelname}{self.RESET}"
-
-            record.threadName = getattr(record, "threadName", "-")
-            record.filename = getattr(record, "filename", "-")
-            record.funcName = getattr(record, "funcName", "-")
-
-            return super().format(record)
-
-    handlers = ["file"]
-    if log_config.get("log_output", True):  # Validar si se muestran logs en consola
-        handlers.append("console")
-
-    dictConfig(
-        {
-            "version": 1,
-            "disable_existing_loggers": False,
-            "formatters": {
-                "detailed": {
-                    "()": ColorFormatter,
-                    "format": log_format,
-                    "datefmt": "%Y-%m-%d %H:%M:%S",
-                }
-            },
-            "handlers": {
-                "file": {
-                    "()": CustomTimedRotatingFileHandler,
-                    "filename": os.path.join(log_dir, log_filename),
-                    "when": "midnight",
-                    "interval": 1,
-                    "backupCount": log_days,
-                    "formatter": "detailed",
-                    "encoding": "utf-8",
-                },
-                "console": {
-                    "class": "logging.StreamHandler",
-                    "stream": "ext://sys.stdout",
-                    "formatter": "detailed",
-                },
-            },
-            "root": {"level": log_level, "handlers": handlers},
-            "loggers": {"werkzeug": {"level": "INFO", "handlers": handlers, "propagate": False}},
-        }
+    handlers = []
+    file_handler = CustomTimedRotatingFileHandler(
+        os.path.join(log_dir, log_filename), when="midnight", interval=1, backupCount=log_days, encoding="utf-8"
     )
+    file_handler.setFormatter(logging.Formatter(log_format, datefmt="%Y-%m-%d %H:%M:%S"))
+    handlers.append(file_handler)
+    if log_config.get("log_output", True):  # Validar si se muestran logs en consola
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ColorFormatter(log_format, datefmt="%Y-%m-%d %H:%M:%S"))
+        handlers.append(console_handler)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.setLevel(log_level)
+    root.addHandler(LogPipeline.start(handlers, queue_size, overflow))
+    logging.getLogger("werkzeug").setLevel(logging.INFO)  # Llega al archivo y la consola por el logger raíz
+    atexit.register(LogPipeline.stop)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Validación por columnas de las reglas de negocio, para documentos con muchos items y lotes.
+Los items de todos los documentos se cargan en arreglos (NumPy si está instalado, en otro
+caso el módulo array) y las reglas y los totales se evalúan sin construir un InvoiceItem por
+línea. Los mensajes de error son los mismos de Invoice.validate.
+"""
+
+import math
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Dependencia opcional: sin ella se recorren los arreglos del módulo array
+    np = None
+
+from .model_invoice import (
+    AMOUNT_ERROR,
+    ITEM_ERROR,
+    MAX_PERCENTAGE,
+    MIN_DISCOUNTED_PRICE,
+    PAYMENT_TOLERANCE,
+    PERCENTAGE_ERROR,
+    Invoice,
+)
+
+BULK_MIN_ITEMS = 100  # Items a partir de los cuales un documento se valida por columnas
+EPSILON = 1e-6  # Margen en céntimos dentro del cual el cálculo en float no es concluyente
+TOLERANCE = float(PAYMENT_TOLERANCE)
+
+# Tipos de descuento codificados en la columna 'kind'
+KIND_NONE = 0
+KIND_DISCOUNT_PERCENTAGE = 1
+KIND_SURCHARGE_PERCENTAGE = 2
+KIND_DISCOUNT_AMOUNT = 3
+KIND_SURCHARGE_AMOUNT = 4
+KINDS = {
+    "discount_percentage": KIND_DISCOUNT_PERCENTAGE,
+    "surcharge_percentage": KIND_SURCHARGE_PERCENTAGE,
+    "discount_amount": KIND_DISCOUNT_AMOUNT,
+    "surcharge_amount": KIND_SURCHARGE_AMOUNT,
+}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+
+
+def _round_cents(value: float) -> float:
+    """Redondea a céntimos (mitad hacia arriba) un monto no negativo"""
+    return math.floor(value * 100 + 0.5) / 100
+
+
+def _near_half_cent(value: float) -> bool:
+    """Indica si el redondeo a céntimos de un monto en float puede diferir del exacto"""
+    return abs((value * 100) % 1 - 0.5) < EPSILON
+
+
+class InvoiceColumns:
+    """
+    Items de uno o varios documentos almacenados por columnas.
+    La columna 'owner' indica el documento al que pertenece cada item.
+    """
+
+    __slots__ = ("owner", "quantity", "price", "tax", "discount", "kind", "starts", "paid")
+
+    def __init__(self, invoices: Sequence[Invoice]) -> None:
+        """
+        Carga las columnas.
+        Args:
+            invoices: Documentos con el esquema ya validado.
+        """
+        self.owner = array("q")
+        self.quantity = array("d")
+        self.price = array("d")
+        self.tax = array("d")
+        self.discount = array("d")
+        self.kind = array("b")
+        self.starts = array("q")  # Posición del primer item de cada documento
+        self.paid = array("d")  # Total de pagos de cada documento
+        for index, invoice in enumerate(invoices):
+            items = invoice.data.get("items", [])
+            self.starts.append(len(self.owner))
+            self.owner.extend([index] * len(items))
+            self.quantity.extend([item.get("item_quantity", 0) for item in items])
+            self.price.extend([item.get("item_price", 0) for item in items])
+            self.tax.extend([item.get("item_tax", 0) for item in items])
+            self.discount.extend([item.get("item_discount", 0) for item in items])
+            self.kind.extend([KINDS.get(item.get("item_discount_type", ""), KIND_NONE) for item in items])
+            self.paid.append(sum(payment.amount for payment in invoice.payments))
+
+    def scan(self) -> Tuple[List[Optional[str]], List[float], List[bool]]:
+        """
+        Evalúa las reglas de los items y calcula el total de cada documento.
+        Returns:
+            Tuple[List[Optional[str]], List[float], List[bool]]:
+                - Error del primer item inválido de cada documento (None si no hay)
+                - Total con impuestos de cada documento
+                - True si algún redondeo del documento cae en el límite del medio céntimo
+        """
+        if np is not None:
+            return self._scan_numpy()
+        return self._scan_python()
+
+    def _item_error(self, position: int, percentage: bool) -> str:
+        """Mensaje de error del item en la posición indicada"""
+        document = self.owner[position]
+        error = PERCENTAGE_ERROR.format(KIND_NAMES[self.kind[position]]) if percentage else AMOUNT_ERROR
+        return ITEM_ERROR.format(position - self.starts[document] + 1, error)
+
+    def _scan_numpy(self) -> Tuple[List[Optional[str]], List[float], List[bool]]:
+        """Implementación vectorizada con NumPy"""
+        count = len(self.paid)
+        owner = np.frombuffer(self.owner, dtype=np.int64)
+        quantity = np.frombuffer(self.quantity, dtype=np.float64)
+        price = np.frombuffer(self.price, dtype=np.float64)
+        tax = np.frombuffer(self.tax, dtype=np.float64)
+        discount = np.frombuffer(self.discount, dtype=np.float64)
+        kind = np.frombuffer(self.kind, dtype=np.int8)
+
+        active = discount > 0
+        is_percentage = active & ((kind == KIND_DISCOUNT_PERCENTAGE) | (kind == KIND_SURCHARGE_PERCENTAGE))
+        bad_percentage = is_percentage & (discount > MAX_PERCENTAGE)
+        bad_amount = active & (kind == KIND_DISCOUNT_AMOUNT) & (price - discount < MIN_DISCOUNTED_PRICE)
+
+        errors: List[Optional[str]] = [None] * count
+        invalid = np.flatnonzero(bad_percentage | bad_amount)
+        if invalid.size:
+            _, first = np.unique(owner[invalid], return_index=True)  # Primer item inválido de cada documento
+            for position in invalid[first].tolist():
+                errors[self.owner[position]] = self._item_error(position, bool(bad_percentage[position]))
+
+        gross = price * quantity
+        net = np.where(active & (kind == KIND_DISCOUNT_PERCENTAGE), gross * (1 - discount / 100), gross)
+        net = np.where(active & (kind == KIND_SURCHARGE_PERCENTAGE), gross * (1 + discount / 100), net)
+        net = np.where(active & (kind == KIND_DISCOUNT_AMOUNT), (price - discount) * quantity, net)
+        net = np.where(active & (kind == KIND_SURCHARGE_AMOUNT), (price + discount) * quantity, net)
+
+        rates, rate_index = np.unique(tax, return_inverse=True)
+        bases = np.bincount(owner * len(rates) + rate_index, weights=net, minlength=count * len(rates))
+        bases = bases.reshape(count, len(rates))
+        bases_cents = np.floor(bases * 100 + 0.5) / 100
+        taxes = bases_cents * rates / 100
+        taxes_cents = np.floor(taxes * 100 + 0.5) / 100
+        totals = bases_cents.sum(axis=1) + taxes_cents.sum(axis=1)
+        ambiguous = (
+            (np.abs((bases * 100) % 1 - 0.5) < EPSILON) | (np.abs((taxes * 100) % 1 - 0.5) < EPSILON)
+        ).any(axis=1)
+        return errors, totals.tolist(), ambiguous.tolist()
+
+    def _scan_python(self) -> Tuple[List[Optional[str]], List[float], List[bool]]:
+        """Implementación con un solo recorrido de las columnas, sin NumPy"""
+        count = len(self.paid)
+        errors: List[Optional[str]] = [None] * count
+        bases: List[Dict[float, float]] = [{} for _ in range(count)]
+        columns = zip(self.owner, self.quantity, self.price, self.tax, self.discount, self.kind)
+        for position, (document, quantity, price, tax, discount, kind) in enumerate(columns):
+            net = price * quantity
+            if discount > 0:
+                if kind in (KIND_DISCOUNT_PERCENTAGE, KIND_SURCHARGE_PERCENTAGE):
+                    if discount > MAX_PERCENTAGE and errors[document] is None:
+                        errors[document] = self._item_error(position, True)
+                    net *= (1 - discount / 100) if kind == KIND_DISCOUNT_PERCENTAGE else (1 + discount / 100)
+                elif kind == KIND_DISCOUNT_AMOUNT:
+                    if price - discount < MIN_DISCOUNTED_PRICE and errors[document] is None:
+                        errors[document] = self._item_error(position, False)
+                    net = (price - discount) * quantity
+                elif kind == KIND_SURCHARGE_AMOUNT:
+                    net = (price + discount) * quantity
+            document_bases = bases[document]
+            document_bases[tax] = document_bases.get(tax, 0.0) + net
+
+        totals: List[float] = []
+        ambiguous: List[bool] = []
+        for document_bases in bases:
+            total = 0.0
+            doubtful = False
+            for rate, base in document_bases.items():
+                base_cents = _round_cents(base)
+                tax = base_cents * rate / 100
+                total += base_cents + _round_cents(tax)
+                doubtful = doubtful or _near_half_cent(base) or _near_half_cent(tax)
+            totals.append(total)
+            ambiguous.append(doubtful)
+        return errors, totals, ambiguous
+
+
+def validate_invoices(invoices: Sequence[Invoice]) -> List[Optional[str]]:
+    """
+    Valida las reglas de negocio de varios documentos con una sola pasada por columnas.
+    Equivale a llamar Invoice.validate en cada documento: cuando el total en float no es
+    concluyente (o no coincide con los pagos) se recalcula en Decimal, de modo que el
+    resultado y el mensaje son exactamente los mismos.
+    Args:
+        invoices: Documentos con el esquema ya validado.
+    Returns:
+        List[Optional[str]]: Error de cada documento, None si es válido.
+    """
+    columns = InvoiceColumns(invoices)
+    item_errors, totals, ambiguous = columns.scan()
+    results: List[Optional[str]] = []
+    for index, invoice in enumerate(invoices):
+        error = invoice.validate_affected() or item_errors[index]
+        if error is None and (ambiguous[index] or abs(columns.paid[index] - totals[index]) > TOLERANCE - EPSILON):
+            error = invoice.validate_payments()
+        results.append(error)
+    return results
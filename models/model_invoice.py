@@ -5,15 +5,41 @@ Copyright © 2024, Iron Graterol
 Licensed under the GNU Affero General Public License, version 3 or later.
 
 Clases que manejar el modelo de facturas. Contiene reglas de negocio.
+El documento se construye una sola vez por solicitud y lo comparten la validación
+y todas las impresoras.
 """
 
 from datetime import datetime
-from typing import Dict, Optional
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+CENT = Decimal("0.01")  # Precisión de montos impresos
+HUNDRED = Decimal("100")
+PAYMENT_TOLERANCE = CENT  # Diferencia admitida entre pagos y total por redondeo
+DISCOUNT_TYPES = ("discount_percentage", "discount_amount")
+SURCHARGE_TYPES = ("surcharge_percentage", "surcharge_amount")
+MAX_PERCENTAGE = 99.99  # Descuento o recargo porcentual máximo
+MIN_DISCOUNTED_PRICE = 1  # Precio mínimo después de un descuento por monto
+PERCENTAGE_ERROR = "{} no puede ser mayor a 99.99%"
+AMOUNT_ERROR = "Descuento no puede ser mayor o igual al precio"
+ITEM_ERROR = "Error en item {}: {}"
+
+
+def to_decimal(value: Any) -> Decimal:
+    """Convierte un número del documento a Decimal a partir de su representación decimal"""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def to_cents(value: Decimal) -> Decimal:
+    """Redondea un monto a céntimos (mitad hacia arriba)"""
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
 
 
 class InvoiceItem:
     """Clase que representa un ítem de un documento."""
 
+    __slots__ = ("ref", "name", "quantity", "price", "tax", "discount", "discount_type", "comment")
+
     def __init__(self, data: Dict):
         self.ref = data.get("item_ref", "")
         self.name = data.get("item_name", "")
@@ -28,8 +54,8 @@ class InvoiceItem:
         """Validar reglas de negocio del item"""
         if self.discount > 0:  # Validar que el precio con descuento no sea negativo
             if self.discount_type in ["discount_percentage", "surcharge_percentage"]:
-                if self.discount > 99.99:
-                    return f"{self.discount_type} no puede ser mayor a 99.99%"
+                if self.discount > MAX_PERCENTAGE:
+                    return PERCENTAGE_ERROR.format(self.discount_type)
                 if self.discount_type == "discount_percentage":
                     precio_final = self.price * (1 - self.discount / 100)
                 else:  # surcharge_percentage
@@ -37,34 +63,45 @@ class InvoiceItem:
             else:  # discount_amount o surcharge_amount
                 if self.discount_type == "discount_amount":
                     precio_final = self.price - self.discount
-                    if precio_final < 1:
-                        return "Descuento no puede ser mayor o igual al precio"
+                    if precio_final < MIN_DISCOUNTED_PRICE:
+                        return AMOUNT_ERROR
                 else:  # surcharge_amount
                     precio_final = self.price + self.discount
         return None
 
-    @property
-    def subtotal(self) -> float:
-        """Calcula el subtotal del item con descuento o recargo"""
+    def amounts(self) -> Tuple[Decimal, Decimal]:
+        """
+        Calcula en Decimal el monto del item sin y con descuento o recargo.
+        Returns:
+            Tuple[Decimal, Decimal]: (monto bruto, subtotal con ajustes)
+        """
+        price = to_decimal(self.price)
+        quantity = to_decimal(self.quantity)
+        gross = price * quantity
         if self.discount > 0:
+            discount = to_decimal(self.discount)
             if self.discount_type == "discount_percentage":
-                return self.price * self.quantity * (1 - self.discount / 100)
+                return gross, gross * (1 - discount / HUNDRED)
             if self.discount_type == "surcharge_percentage":
-                return self.price * self.quantity * (1 + self.discount / 100)
+                return gross, gross * (1 + discount / HUNDRED)
             if self.discount_type == "discount_amount":
-                return (self.price - self.discount) * self.quantity
+                return gross, (price - discount) * quantity
             if self.discount_type == "surcharge_amount":
-                return (self.price + self.discount) * self.quantity
-        return self.price * self.quantity
+                return gross, (price + discount) * quantity
+        return gross, gross
 
 
 class Payment:  # pylint: disable=R0903
     """Modelo para representar un pago en un documento"""
 
+    __slots__ = ("method", "name", "amount")
+
     def __init__(self, data: Dict):
         self.method = data.get("payment_method", "")
         self.name = data.get("payment_name", "")
         self.amount = data.get("payment_amount", 0)
+        if str(self.method).isdigit():  # Código normalizado a dos dígitos para todas las impresoras
+            self.method = f"{int(self.method):02d}"
 
     def validate(self) -> Optional[str]:
         """Validar reglas de negocio del pago"""
@@ -72,19 +109,86 @@ class Payment:  # pylint: disable=R0903
             payment_code = int(self.method)
             if payment_code < 1 or payment_code > 24:
                 return "Código de pago debe estar entre 01 y 24"
-            self.method = f"{payment_code:02d}"  # Asegurar formato de dos dígitos
         except ValueError:
             return "Código de pago debe ser un número entre 01 y 24"
         return None
 
 
-class Invoice:
+class InvoiceTotals:  # pylint: disable=R0903
+    """
+    Totales de un documento calculados en Decimal en un solo recorrido de los items.
+    Las bases y el impuesto de cada tasa se redondean a céntimos, como los totaliza la impresora fiscal.
+    """
+
+    __slots__ = ("bases", "taxes", "gross", "subtotal", "tax", "total", "discount", "surcharge", "paid")
+
+    def __init__(self, items: Iterable[InvoiceItem], payments: Iterable[Payment]) -> None:
+        """
+        Calcula los totales.
+        Args:
+            items: Items del documento.
+            payments: Pagos del documento.
+        """
+        bases: Dict[Decimal, Decimal] = {}
+        gross_total = discount = surcharge = Decimal(0)
+        for item in items:
+            gross, net = item.amounts()
+            rate = to_decimal(item.tax)
+            bases[rate] = bases.get(rate, Decimal(0)) + net
+            gross_total += gross
+            if item.discount_type in DISCOUNT_TYPES:
+                discount += gross - net
+            elif item.discount_type in SURCHARGE_TYPES:
+                surcharge += net - gross
+
+        self.bases: Dict[Decimal, Decimal] = {rate: to_cents(base) for rate, base in bases.items()}  # Base por tasa
+        self.taxes: Dict[Decimal, Decimal] = {
+            rate: to_cents(base * rate / HUNDRED) for rate, base in self.bases.items()
+        }  # Impuesto por tasa
+        self.gross = to_cents(gross_total)  # Sin descuentos ni recargos
+        self.subtotal = sum(self.bases.values(), Decimal(0))
+        self.tax = sum(self.taxes.values(), Decimal(0))
+        self.total = self.subtotal + self.tax
+        self.discount = to_cents(discount)
+        self.surcharge = to_cents(surcharge)
+        self.paid = sum((to_decimal(payment.amount) for payment in payments), Decimal(0))
+
+
+class Invoice:  # pylint: disable=R0902
     """Modelo para representar una factura"""
 
+    __slots__ = (
+        "data",
+        "operation_type",
+        "affected_document",
+        "affected_number",
+        "affected_date",
+        "affected_serial",
+        "customer_vat",
+        "customer_name",
+        "customer_address",
+        "customer_phone",
+        "customer_email",
+        "document_number",
+        "document_date",
+        "document_name",
+        "document_cashier",
+        "_items",
+        "payments",
+        "delivery_comments",
+        "delivery_barcode",
+        "metadata",
+        "_totals",
+    )
+
     def __init__(self, data: Dict):
-        self.operation_type = data.get("operation_type", "")  # Datos de operación
+        self.data = data  # Documento original: se conserva para el diario de trabajos
+        self.operation_type = str(data.get("operation_type", "")).lower()  # Datos de operación
 
         self.affected_document = data.get("affected_document", {})  # Documento afectado
+        self.affected_number = self.affected_document.get("affected_number", "")
+        self.affected_date = self.affected_document.get("affected_date", "")
+        self.affected_serial = self.affected_document.get("affected_serial", "")
 
         customer_data = data.get("customer", {})  # Datos del cliente
         self.customer_vat = customer_data.get("customer_vat", "")
@@ -99,68 +203,102 @@ class Invoice:
         self.document_name = document_data.get("document_name", "")
         self.document_cashier = document_data.get("document_cashier", "")
 
-        self.items = [InvoiceItem(item) for item in data.get("items", [])]  # Listas
-        self.payments = [Payment(payment) for payment in data.get("payments", [])]  # Listas
+        self._items: Optional[List[InvoiceItem]] = None  # Se construyen al primer uso
+        self.payments: List[Payment] = [Payment(payment) for payment in data.get("payments", [])]  # Listas
 
         delivery_data = data.get("delivery", {})  # Datos de entrega
         self.delivery_comments = delivery_data.get("delivery_comments", [])
         self.delivery_barcode = delivery_data.get("delivery_barcode", "")
 
         self.metadata = data.get("operation_metadata", {})  # Datos de operación
+        self._totals: Optional[InvoiceTotals] = None
+
+    @classmethod
+    def parse(cls, document: Union["Invoice", Dict[str, Any]]) -> "Invoice":
+        """
+        Obtiene el modelo de un documento, construyéndolo solo si se recibe un diccionario
+        (p. ej. un trabajo recuperado del diario).
+        Args:
+            document: Modelo ya construido o documento original.
+        Returns:
+            Invoice: Modelo del documento.
+        """
+        if isinstance(document, cls):
+            return document
+        return cls(document)
+
+    @property
+    def items(self) -> List[InvoiceItem]:
+        """Items del documento; la validación por columnas no necesita construirlos"""
+        if self._items is None:
+            self._items = [InvoiceItem(item) for item in self.data.get("items", [])]
+        return self._items
 
     def validate(self) -> Optional[str]:
         """Valida reglas de negocio del documento"""
+        if error := self.validate_affected():
+            return error
+
+        for idx, item in enumerate(self.items, 1):
+            if error := item.validate():  # Validar items
+                return ITEM_ERROR.format(idx, error)
+
+        return self.validate_payments()
+
+    def validate_affected(self) -> Optional[str]:
+        """Valida el documento afectado de las notas de crédito/débito"""
         if self.operation_type in ["credit", "debit"]:  # Validar documento afectado
             if not self.affected_document:
                 return "Notas de crédito/débito requieren documento afectado"
 
             try:  # Validar que la fecha del documento afectado sea anterior
-                affected_date = datetime.strptime(self.affected_document["affected_date"], "%Y-%m-%d")
+                affected_date = datetime.strptime(self.affected_date, "%Y-%m-%d")
                 current_date = datetime.strptime(self.document_date, "%Y-%m-%d")
                 if affected_date > current_date:
                     return "Fecha del documento afectado no puede ser posterior a la fecha actual"
             except ValueError:
                 return "Error en formato de fechas"
+        return None
 
-        for idx, item in enumerate(self.items, 1):
-            if error := item.validate():  # Validar items
-                return f"Error en item {idx}: {error}"
-
-        total_pagos = sum(payment.amount for payment in self.payments)  # Validar total de pagos
-        if abs(total_pagos - self.total_with_tax) > 0.01:  # Permitir diferencia por redondeo
-            return f"Total de pagos ({total_pagos}) no coincide con el total del documento ({self.total_with_tax})"
+    def validate_payments(self) -> Optional[str]:
+        """Valida que el total de pagos coincida con el total del documento"""
+        totals = self.totals
+        if abs(totals.paid - totals.total) > PAYMENT_TOLERANCE:  # Permitir diferencia por redondeo
+            return f"Total de pagos ({totals.paid}) no coincide con el total del documento ({totals.total})"
 
         return None
 
+    @property
+    def totals(self) -> InvoiceTotals:
+        """Totales del documento, calculados la primera vez que se consultan"""
+        if self._totals is None:
+            self._totals = InvoiceTotals(self.items, self.payments)
+        return self._totals
+
     @property
     def total_amount(self) -> float:
-        """Calcula el subtotal del documento incluyendo descuentos"""
-        return sum(item.subtotal for item in self.items)
+        """Subtotal del documento incluyendo descuentos"""
+        return float(self.totals.subtotal)
 
     @property
     def total_tax(self) -> float:
-        """Calcula el impuesto total del documento"""
-        return sum(item.subtotal * (item.tax / 100) for item in self.items)
+        """Impuesto total del documento"""
+        return float(self.totals.tax)
 
     @property
     def total_with_tax(self) -> float:
-        """Calcula el monto total con impuestos"""
-        return self.total_amount + self.total_tax
+        """Monto total con impuestos"""
+        return float(self.totals.total)
 
     @property
     def total_discount(self) -> float:
-        """Calcula el descuento total aplicado"""
-        total_sin_ajustes = sum(item.price * item.quantity for item in self.items)
-        total_con_ajustes = sum(
-            item.subtotal for item in self.items if item.discount_type in ["discount_percentage", "discount_amount"]
-        )
-        return total_sin_ajustes - total_con_ajustes
+        """Descuento total aplicado"""
+        return float(self.totals.discount)
 
     @property
     def total_surcharge(self) -> float:
-        """Calcula el recargo total aplicado"""
-        total_sin_ajustes = sum(item.price * item.quantity for item in self.items)
-        total_con_ajustes = sum(
-            item.subtotal for item in self.items if item.discount_type in ["surcharge_percentage", "surcharge_amount"]
-        )
-        return total_con_ajustes - total_sin_ajustes
+        """Recargo total aplicado"""
+        return float(self.totals.surcharge)
+
+
+InvoiceData = Union[Invoice, Dict[str, Any]]  # Documento recibido por las impresoras
@@ -11,6 +11,8 @@ import logging
 from abc import ABC, abstractmethod
 from typing import Dict, Any
 
+from models.model_invoice import InvoiceData
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,11 +40,11 @@ class BasePrinter(ABC):
         """Método abstracto para cerrar la conexión con la impresora"""
 
     @abstractmethod
-    def print_document(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def print_document(self, data: InvoiceData) -> Dict[str, Any]:
         """
         Método abstracto para imprimir un documento
         Args:
-            data: Diccionario con los datos del documento a imprimir
+            data: Documento a imprimir (Invoice ya construido o diccionario, ver Invoice.parse)
         Returns:
             Dict[str, Any]: Resultado de la impresión
         """
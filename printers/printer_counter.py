@@ -4,132 +4,229 @@
 Copyright © 2024, Iron Graterol
 Licensed under the GNU Affero General Public License, version 3 or later.
 
-Clase para gestionar el contador fiscal usando un archivo JSON.
+Contadores de documentos de las impresoras de ticket y matriciales.
+Los contadores se guardan en una tabla SQLite (spool/counters.db); cada incremento es una
+transacción atómica, de modo que dos solicitudes nunca reciben el mismo número y una caída
+del proceso no deja el almacenamiento a medio escribir.
 """
 
 import datetime
 import json
 import logging
+import os
+import threading
 from typing import Dict
 
+from utils.events import EVENTS
+from utils.spool_db import open_spool_db
+from utils.tools import get_base_path
+
+from .printer_templates import TemplateCache
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_COUNTER_FILE = os.path.join("spool", "counters.db")
+
+COUNTER_COLUMNS = {  # Tipo de documento -> columna del contador
+    "invoice": "document_invoice",
+    "credit": "document_credit",
+    "debit": "document_debit",
+    "note": "document_note",
+}
+
+DEFAULT_COUNTER = {
+    "document_invoice": "00000000",
+    "document_credit": "00000000",
+    "document_debit": "00000000",
+    "document_note": "00000000",
+    "machine_report": "0001",
+    "machine_serial": "Z1B1234567",
+}
+
+
+class CounterStore:
+    """
+    Tabla de contadores compartida por todas las impresoras de un proceso.
+    Cada fila corresponde a un template (ticket o matriz) y contiene la fecha del último
+    documento, el número de reporte diario, el serial y un contador por tipo de documento.
+    """
+
+    _stores: Dict[str, "CounterStore"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, path: str) -> None:
+        """
+        Abre (o crea) la tabla de contadores.
+        Args:
+            path: Ruta del archivo de base de datos.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_spool_db(path)
+        self._conn.execute("PRAGMA synchronous=FULL")  # Un número entregado no se pierde ni ante un corte de energía
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS counters (
+                scope TEXT PRIMARY KEY,
+                document_date TEXT NOT NULL,
+                machine_report INTEGER NOT NULL,
+                machine_serial TEXT NOT NULL,
+                document_invoice INTEGER NOT NULL DEFAULT 0,
+                document_credit INTEGER NOT NULL DEFAULT 0,
+                document_debit INTEGER NOT NULL DEFAULT 0,
+                document_note INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        logger.info("Contadores abiertos: %s", path)
+
+    @classmethod
+    def open(cls, path: str) -> "CounterStore":
+        """
+        Obtiene la tabla de contadores de un archivo, abriéndola solo la primera vez.
+        Args:
+            path: Ruta del archivo de base de datos.
+        Returns:
+            CounterStore: Tabla de contadores.
+        """
+        with cls._stores_lock:
+            store = cls._stores.get(path)
+            if store is None:
+                store = cls(path)
+                cls._stores[path] = store
+            return store
+
+    def increment(self, scope: str, document_type: str, today: str, seed: Dict[str, str]) -> Dict[str, str]:
+        """
+        Incrementa el contador de un tipo de documento en una sola transacción.
+        Si cambió la fecha, se incrementa también el número de reporte diario.
+        Args:
+            scope: Template al que pertenecen los contadores.
+            document_type: Tipo de documento ('invoice', 'credit', 'debit', 'note').
+            today: Fecha actual (AAAA-MM-DD).
+            seed: Valores iniciales si el template aún no tiene fila (sección 'counter' del template).
+        Returns:
+            Dict[str, str]: Fecha, número de documento, serial y número de reporte.
+        """
+        column = COUNTER_COLUMNS.get(document_type, "document_invoice")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # Bloquea también a otros procesos que usen el archivo
+            try:
+                row = self._conn.execute(
+                    f"SELECT document_date, machine_report, machine_serial, {column} FROM counters WHERE scope = ?",
+                    (scope,),
+                ).fetchone()
+                if row is None:
+                    row = self._insert(scope, today, seed, column)
+
+                document_date, report, serial, number = row
+                if document_date != today:
+                    logger.info(
+                        "Nuevo día detectado. Fecha: %s -> %s. Reporte: %s -> %s",
+                        document_date,
+                        today,
+                        report,
+                        report + 1,
+                    )
+                    report += 1
+                number += 1
+                self._conn.execute(
+                    f"UPDATE counters SET {column} = ?, document_date = ?, machine_report = ? WHERE scope = ?",
+                    (number, today, report, scope),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return {
+            "document_date": today,
+            "document_number": str(number).zfill(8),
+            "machine_serial": serial,
+            "machine_report": str(report).zfill(4),
+        }
+
+    def _insert(self, scope: str, today: str, seed: Dict[str, str], column: str) -> tuple:
+        """Crea la fila de un template con los valores iniciales y la retorna como en increment"""
+        values = {**DEFAULT_COUNTER, "document_date": today, **seed}
+        self._conn.execute(
+            """
+            INSERT INTO counters (scope, document_date, machine_report, machine_serial,
+                                  document_invoice, document_credit, document_debit, document_note)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                scope,
+                values["document_date"],
+                int(values["machine_report"]),
+                values["machine_serial"],
+                int(values["document_invoice"]),
+                int(values["document_credit"]),
+                int(values["document_debit"]),
+                int(values["document_note"]),
+            ),
+        )
+        logger.info("Contadores de %s inicializados desde el template", scope)
+        return values["document_date"], int(values["machine_report"]), values["machine_serial"], int(values[column])
+
+    def close(self) -> None:
+        """Cierra la tabla haciendo un checkpoint final"""
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._conn.close()
+
 
 class FiscalCounter:  # pylint: disable=R0903
     """
-    Clase para gestionar el contador fiscal usando un archivo JSON.
+    Contador de documentos de una impresora de ticket o matricial.
     Métodos:
     - update_counter: Actualiza los contadores y devuelve los datos actualizados.
     """
 
-    def __init__(self, template_file: str) -> None:
+    def __init__(self, template_file: str, counter_file: str = DEFAULT_COUNTER_FILE) -> None:
         """
-        Inicializa la clase con el archivo de template que contiene los contadores.
+        Inicializa el contador del template indicado.
         Args:
-            template_file: Ruta al archivo de template JSON que contiene los contadores.
+            template_file: Ruta al template JSON; su sección 'counter' es el valor inicial.
+            counter_file: Archivo de la tabla de contadores (relativo a la carpeta del programa).
         """
         self.template_file = template_file
-        self.template = self._read_template()
+        self.scope = os.path.basename(template_file)
+        if not os.path.isabs(counter_file):
+            counter_file = os.path.join(get_base_path(), counter_file)
+        self.store = CounterStore.open(counter_file)
 
-    def _read_template(self) -> Dict:
+    def _read_seed(self) -> Dict[str, str]:
         """
-        Lee el template JSON que contiene los contadores.
-        Si no existe la sección counter, se crea con valores por defecto.
+        Lee la sección 'counter' del template, usada solo para crear la fila del template.
         Returns:
-            Dict: Template completo con los contadores
+            Dict[str, str]: Valores iniciales de los contadores.
         """
         try:
-            with open(self.template_file, "r", encoding="utf-8") as file:
-                template = json.load(file)
-
-            if "counter" not in template:
-                fecha_hoy = datetime.date.today().strftime("%Y-%m-%d")
-                template["counter"] = {
-                    "document_date": fecha_hoy,
-                    "document_invoice": "00000000",
-                    "document_credit": "00000000",
-                    "document_debit": "00000000",
-                    "document_note": "00000000",
-                    "machine_report": "0001",
-                    "machine_serial": "Z1B1234567",
-                }
-                self._write_template(template)
-            return template
+            return TemplateCache.get(self.template_file).get("counter", {})
         except FileNotFoundError:
             logger.error("El archivo %s no se encontró.", self.template_file)
             raise
         except json.JSONDecodeError:
             logger.error("El archivo %s no es un JSON válido.", self.template_file)
             raise
-        except Exception as e:
-            logger.error("Error leyendo template: %s", str(e))
-            raise
-
-    def _write_template(self, template: Dict) -> None:
-        """
-        Escribe el template actualizado en el archivo JSON.
-        Args:
-            template: Template completo con los contadores actualizados
-        """
-        try:
-            with open(self.template_file, "w", encoding="utf-8") as file:
-                json.dump(template, file, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error("Error escribiendo template: %s", str(e))
-            raise
 
     def update_counter(self, document_type: str = "invoice") -> Dict[str, str]:
         """
-        Actualiza los contadores y escribe los datos actualizados en el template.
+        Incrementa el contador del tipo de documento.
         Args:
             document_type: Tipo de documento ('invoice', 'credit', 'debit', 'note')
         Returns:
             Dict[str, str]: Datos actualizados del contador fiscal
         """
         try:
-            fecha_hoy = datetime.date.today().strftime("%Y-%m-%d")
-            counter = self.template["counter"]
-
-            counter_mapping = {
-                "invoice": "document_invoice",
-                "credit": "document_credit",
-                "debit": "document_debit",
-                "note": "document_note",
-            }
-
-            counter_key = counter_mapping.get(document_type, "document_invoice")
-
-            if counter["document_date"] != fecha_hoy:
-                old_date = counter["document_date"]
-                old_report = counter["machine_report"]
-                counter["document_date"] = fecha_hoy
-                counter["machine_report"] = str(int(counter["machine_report"]) + 1).zfill(4)
-                logger.info(
-                    "Nuevo día detectado. Fecha: %s -> %s\nReporte: %s -> %s",
-                    old_date,
-                    fecha_hoy,
-                    old_report,
-                    counter["machine_report"],
-                )
-            else:
-                counter["machine_report"] = counter["machine_report"].zfill(4)
-
-            old_number = counter[counter_key]  # Incrementar documento específico
-            counter[counter_key] = str(int(counter[counter_key]) + 1).zfill(8)
-
-            logger.info(
-                "Incrementando contador %s: %s -> %s",
-                counter_key,
-                old_number,
-                counter[counter_key],
-            )
-            self._write_template(self.template)
-            return {
-                "document_date": counter["document_date"],
-                "document_number": counter[counter_key],
-                "machine_serial": counter["machine_serial"],
-                "machine_report": counter["machine_report"],
-            }
+            today = datetime.date.today().strftime("%Y-%m-%d")
+            counter_data = self.store.increment(self.scope, document_type, today, self._read_seed())
+            logger.info("Contador %s de %s: %s", document_type, self.scope, counter_data["document_number"])
+            EVENTS.publish("counter", {"document_type": document_type, **counter_data})
+            return counter_data
 
         except Exception as e:
             logger.error("Error actualizando contador para %s: %s", document_type, str(e))
@@ -7,7 +7,6 @@ Licensed under the GNU Affero General Public License, version 3 or later.
 Implementación de la impresora dot-matrix.
 """
 
-import json
 import logging
 import os
 from typing import Dict, Any, List, Optional, Tuple
@@ -15,9 +14,12 @@ from typing import Dict, Any, List, Optional, Tuple
 import win32print
 from utils.tools import get_base_path, normalize_text, format_multiline
 
+from models.model_invoice import Invoice, InvoiceData
+
 from .printer_base import BasePrinter
 from .printer_commands import ESCPcmd
 from .printer_counter import FiscalCounter
+from .printer_templates import TemplateCache
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +44,8 @@ class MatrixPrinter(BasePrinter):
         self.columns = None
         self.column_widths = None
         self.column_format = None
+        self.separator = ""
+        self.page_width = 0
 
         use_escp = config.get("matrix_use_escp", True)  # Inicializar comandos ESC/POS
         self.escp_commands = ESCPcmd(use_escp)
@@ -51,9 +55,6 @@ class MatrixPrinter(BasePrinter):
         template_path = os.path.join(get_base_path(), "templates", self.template_name)  # Inicializar contador fiscal
         self.counter = FiscalCounter(template_path)
 
-        self.separator = self.template["format"]["separator"]
-        self.page_width = self.template["format"]["page_width"]
-
     def _get_printer_info(self) -> Tuple[bool, str, Optional[Dict]]:
         """
         Obtiene informacion detallada de la impresora
@@ -83,6 +84,8 @@ class MatrixPrinter(BasePrinter):
             bool: True si se conectó correctamente
         """
         try:
+            if self.printer_handle:  # Instancia reutilizada: no dejar abierta una conexión anterior
+                self.disconnect()
             if self.direct_print:
                 success, status_msg, printer_info = self._get_printer_info()
                 if not success:  # Verificar impresora y controlador
@@ -121,11 +124,11 @@ class MatrixPrinter(BasePrinter):
         except Exception as e:
             logger.error("Error desconectando impresora: %s", str(e))
 
-    def print_document(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def print_document(self, data: InvoiceData) -> Dict[str, Any]:
         """
         Imprime un documento
         Args:
-            data (dict): Datos del documento a imprimir
+            data (InvoiceData): Documento a imprimir
         Returns:
             dict: Resultado de la impresión
         """
@@ -144,8 +147,10 @@ class MatrixPrinter(BasePrinter):
                     "data": None,
                 }
 
-            document_content = self._format_document(data)  # Formatea el documento si usa ESC/P
-            fiscal_data = self.counter.update_counter(data.get("operation_type", "invoice"))  # Actualizar contador
+            invoice = Invoice.parse(data)
+            self._load_template()  # La instancia es de larga duración: el template pudo cambiar
+            document_content = self._format_document(invoice)  # Formatea el documento si usa ESC/P
+            fiscal_data = self.counter.update_counter(invoice.operation_type or "invoice")  # Actualizar contador
 
             if self.direct_print:
                 try:
@@ -218,11 +223,11 @@ class MatrixPrinter(BasePrinter):
 
         return status
 
-    def _format_document(self, data: Dict[str, Any]) -> bytes:
+    def _format_document(self, invoice: Invoice) -> bytes:
         """
         Formatea el documento para impresión
         Args:
-            data (dict): Datos del documento
+            invoice (Invoice): Documento
         Returns:
             bytes: Documento formateado
         """
@@ -241,11 +246,11 @@ class MatrixPrinter(BasePrinter):
         content.append(self.escp_commands.CMD_CPI_12)  # 12 CPI para el texto general
 
         # Formatear documento
-        content.extend(self._format_header(data))
-        content.extend(self._format_customer_info(data))
-        content.extend(self._format_items(data))
-        content.extend(self._format_totals(data))
-        content.extend(self._format_footer(data))
+        content.extend(self._format_header(invoice))
+        content.extend(self._format_customer_info(invoice))
+        content.extend(self._format_items(invoice))
+        content.extend(self._format_totals(invoice))
+        content.extend(self._format_footer(invoice))
 
         # Finalizar documento
         content.append(self.escp_commands.CMD_FORM_FEED)
@@ -254,11 +259,11 @@ class MatrixPrinter(BasePrinter):
         # Unir todo el contenido como bytes
         return b"".join(content)
 
-    def _format_header(self, data: Dict[str, Any]) -> List[bytes]:
+    def _format_header(self, invoice: Invoice) -> List[bytes]:
         """
         Formatea el encabezado del documento
         Args:
-            data: Datos del documento
+            invoice: Documento
         Returns:
             List[bytes]: Líneas del encabezado
         """
@@ -292,32 +297,31 @@ class MatrixPrinter(BasePrinter):
 
         header_type = header_info["type"]
         document_type = (
-            document_mapping.get(data["operation_type"], "NOTA DE DESPACHO") if header_type == "*" else header_type
+            document_mapping.get(invoice.operation_type, "NOTA DE DESPACHO") if header_type == "*" else header_type
         )
 
         header.append(self.escp_commands.CMD_ALIGN_RIGHT)
         doc_line = (
-            f"FECHA: {data['document']['document_date']} | {document_type}: {data['document']['document_number']}\n"
+            f"FECHA: {invoice.document_date} | {document_type}: {invoice.document_number}\n"
         )
         header.append(doc_line.encode("ascii", errors="replace"))
         header.append(self.escp_commands.CMD_ALIGN_LEFT)
         header.append((self.separator * self.page_width + "\n").encode("ascii", errors="replace"))
         return header
 
-    def _format_customer_info(self, data: Dict[str, Any]) -> List[bytes]:
+    def _format_customer_info(self, invoice: Invoice) -> List[bytes]:
         """
         Formatea la información del cliente
         Args:
-            data: Datos del documento
+            invoice: Documento
         Returns:
             List[bytes]: Líneas de información del cliente
         """
         customer_info = []
-        customer = data.get("customer", {})
-        customer_line = f"RIF/CI:{customer['customer_vat']} | CLIENTE:{customer['customer_name']}\n"
+        customer_line = f"RIF/CI:{invoice.customer_vat} | CLIENTE:{invoice.customer_name}\n"
         customer_info.append(customer_line.encode("ascii", errors="replace"))
-        address = normalize_text(customer.get("customer_address", ""))
-        phone = normalize_text(customer.get("customer_phone", ""))
+        address = normalize_text(invoice.customer_address)
+        phone = normalize_text(invoice.customer_phone)
         contact_line = f"DIR.: {address} | TEL.: {phone}\n"
 
         wrapped_lines = format_multiline(contact_line, self.page_width)
@@ -332,11 +336,11 @@ class MatrixPrinter(BasePrinter):
         customer_info.append((self.separator * self.page_width + "\n").encode("ascii", errors="replace"))
         return customer_info
 
-    def _format_items(self, data: Dict[str, Any]) -> List[bytes]:
+    def _format_items(self, invoice: Invoice) -> List[bytes]:
         """
         Formatea los items del documento
         Args:
-            data: Datos del documento
+            invoice: Documento
         Returns:
             List[bytes]: Líneas de items
         """
@@ -362,14 +366,14 @@ class MatrixPrinter(BasePrinter):
         items_lines.append((header_line + "\n").encode("ascii", errors="replace"))
         items_lines.append((self.separator * self.page_width + "\n").encode("ascii", errors="replace"))
         items_lines.append(self.escp_commands.CMD_BOLD_OFF)
-        for item in data["items"]:
+        for item in invoice.items:
             item_line = ""
             values = [
-                str(item["item_ref"]),
-                str(item["item_name"]),
-                item["item_quantity"],
-                item["item_price"],
-                item["item_quantity"] * item["item_price"],
+                str(item.ref),
+                str(item.name),
+                item.quantity,
+                item.price,
+                item.quantity * item.price,
             ]
 
             for val, width, fmt in zip(values, self.column_widths, self.column_format):
@@ -381,24 +385,25 @@ class MatrixPrinter(BasePrinter):
 
             items_lines.append((item_line + "\n").encode("ascii", errors="replace"))
 
-            if item.get("item_comment") and self.template["format"].get("show_items_comment", False):
-                comment_line = f"{'':8}Nota: {item['item_comment']}\n"
+            if item.comment and self.template["format"].get("show_items_comment", False):
+                comment_line = f"{'':8}Nota: {item.comment}\n"
                 items_lines.append(comment_line.encode("ascii", errors="replace"))
 
         return items_lines
 
-    def _format_totals(self, data: Dict[str, Any]) -> List[bytes]:
+    def _format_totals(self, invoice: Invoice) -> List[bytes]:
         """
         Formatea los totales del documento
         Args:
-            data: Datos del documento
+            invoice: Documento
         Returns:
             List[bytes]: Líneas de totales
         """
-        totals = []  # Calcular totales
-        subtotal = sum(item["item_quantity"] * item["item_price"] for item in data["items"])
-        tax = sum(item["item_quantity"] * item["item_price"] * (item["item_tax"] / 100) for item in data["items"])
-        total = subtotal + tax
+        totals = []
+        document_totals = invoice.totals  # Calculados una vez por documento
+        subtotal = document_totals.subtotal
+        tax = document_totals.tax
+        total = document_totals.total
         totals.append((self.separator * self.page_width + "\n").encode("ascii", errors="replace"))
         totals.append(self.escp_commands.CMD_ALIGN_RIGHT)
         totals.append(self.escp_commands.CMD_BOLD_ON)
@@ -409,24 +414,24 @@ class MatrixPrinter(BasePrinter):
         totals.append(self.escp_commands.CMD_BOLD_OFF)
 
         # Agregar pagos si están habilitados
-        if data.get("payments") and self.template["format"].get("show_payments", False):
+        if invoice.payments and self.template["format"].get("show_payments", False):
             totals.append(self.escp_commands.CMD_BOLD_ON)
             totals.append((self.separator * self.page_width + "\n").encode("ascii", errors="replace"))
             totals.append(self.escp_commands.CMD_BOLD_OFF)
 
-            for payment in data["payments"]:
-                payment_line = f"{payment['payment_name']}: {payment['payment_amount']:>10.2f}\n"
+            for payment in invoice.payments:
+                payment_line = f"{payment.name}: {payment.amount:>10.2f}\n"
                 totals.append(payment_line.encode("ascii", errors="replace"))
 
         totals.append(self.escp_commands.CMD_ALIGN_LEFT)  # Volver a alineación izquierda
 
         return totals
 
-    def _format_footer(self, data: Dict[str, Any]) -> List[bytes]:
+    def _format_footer(self, invoice: Invoice) -> List[bytes]:
         """
         Formatea el pie del documento
         Args:
-            data: Datos del documento
+            invoice: Documento
         Returns:
             List[bytes]: Líneas del pie
         """
@@ -436,7 +441,7 @@ class MatrixPrinter(BasePrinter):
         footer.append((self.separator * self.page_width + "\n").encode("ascii", errors="replace"))  # Separador
         footer.append(self.escp_commands.CMD_CPI_17)
 
-        if data.get("delivery", {}).get("delivery_comments") and self.template["format"].get(
+        if invoice.delivery_comments and self.template["format"].get(
             "show_delivery_comment", False
         ):
             footer.append(self.escp_commands.CMD_BOLD_ON)
@@ -444,7 +449,7 @@ class MatrixPrinter(BasePrinter):
             footer.append(self.escp_commands.CMD_BOLD_OFF)
             footer.append(b"\n")
 
-            for comment in data["delivery"]["delivery_comments"]:
+            for comment in invoice.delivery_comments:
                 footer.append((comment + "\n").encode("ascii", errors="replace"))
 
         footer.append(b"\n")
@@ -463,12 +468,11 @@ class MatrixPrinter(BasePrinter):
         ]
 
     def _load_template(self) -> None:
-        """Carga el template de impresión"""
+        """Carga el template de impresión (desde la caché si el archivo no cambió)"""
         try:
-            template_path = os.path.join(get_base_path(), "templates", self.template_name)
-            with open(template_path, "r", encoding="utf-8") as f:
-                self.template = json.load(f)
-            logger.debug("Template cargado: %s", self.template)
+            self.template = TemplateCache.get(os.path.join(get_base_path(), "templates", self.template_name))
+            self.separator = self.template["format"]["separator"]
+            self.page_width = self.template["format"]["page_width"]
         except Exception as e:
             logger.error("Error cargando template: %s", str(e))
             raise
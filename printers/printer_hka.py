@@ -14,12 +14,10 @@ import time
 from decimal import Decimal, ROUND_HALF_UP, getcontext
 from typing import Dict, Any
 
-
-import clr
-from System.Reflection import Assembly
-
+from models.model_invoice import Invoice, InvoiceData
 from printers.printer_base import BasePrinter
 from printers.printer_commands import HKAcmd
+from utils.metrics import COMMAND_SECONDS
 from utils.tools import get_base_path, normalize_text, normalize_date, normalize_number
 
 # Configuración del logging
@@ -37,6 +35,8 @@ TAX_VALUES = {
 class TfhkaPrinter(BasePrinter):
     """Clase para manejar la impresión en impresoras fiscales the factory hka"""
 
+    DRIVER = "tfhka"  # Etiqueta de las métricas de comandos
+
     # Constantes de error
     ERROR_CONNECTION = "Error al conectar con la impresora: {}"
     ERROR_STATUS = "Error: {} || Estado: {}"
@@ -84,6 +84,9 @@ class TfhkaPrinter(BasePrinter):
         try:
             if not os.path.exists(self.dll_path):  # Cargar DLL desde la ruta del sistema
                 raise FileNotFoundError(f"El archivo DLL no existe en la ruta: {self.dll_path}")
+            import clr  # pythonnet: solo se requiere con el driver del DLL
+            from System.Reflection import Assembly
+
             Assembly.LoadFrom(self.dll_path)
             clr.AddReference("TfhkaNet")  # pylint: disable=E1101
             from TfhkaNet.IF.VE import Tfhka
@@ -104,14 +107,14 @@ class TfhkaPrinter(BasePrinter):
             bool: True si la conexión fue exitosa
         """
         try:
-            if self._printer.OpenFpCtrl(self.port) and self.check_status():
+            if self._open_port() and self.check_status():
                 status = self.get_printer_status()
                 if status["error_code"] != 0 or status["status_code"] != 4:
                     logger.error(
                         "%s",
                         self.ERROR_STATUS.format(status["error_description"], status["status_description"]),
                     )
-                    self._printer.CloseFpCtrl()
+                    self._close_port()
                     return False
 
                 logger.info("Conexión establecida con la impresora")
@@ -147,10 +150,28 @@ class TfhkaPrinter(BasePrinter):
             return False
         except Exception as e:
             logger.error("%s", self.ERROR_CONNECTION.format(str(e)))
-            if hasattr(self._printer, "CloseFpCtrl"):
-                self._printer.CloseFpCtrl()
+            try:
+                self._close_port()
+            except Exception:
+                pass
             return False
 
+    def _open_port(self) -> bool:
+        """Abre el puerto de la impresora"""
+        return self._printer.OpenFpCtrl(self.port)
+
+    def _close_port(self) -> None:
+        """Cierra el puerto de la impresora"""
+        self._printer.CloseFpCtrl()
+
+    def _send(self, command: str) -> bool:
+        """Envía un comando sin registro ni manejo de errores"""
+        return self._printer.SendCmd(command)
+
+    def _check_printer(self) -> bool:
+        """Indica si la impresora responde"""
+        return self._printer.CheckFPrinter()
+
     def format_number(self, value: float, field_type: str) -> str:
         """
         Formatea un número según el tipo y el flag 21
@@ -194,7 +215,7 @@ class TfhkaPrinter(BasePrinter):
     def disconnect(self) -> None:
         """Desconecta la impresora fiscal"""
         try:
-            self._printer.CloseFpCtrl()
+            self._close_port()
             logger.info("Desconexión exitosa")
         except Exception as e:
             logger.error("Error al desconectar: %s", str(e))
@@ -209,7 +230,8 @@ class TfhkaPrinter(BasePrinter):
             bool: True si el comando se ejecutó correctamente
         """
         try:
-            result = self._printer.SendCmd(command)
+            with COMMAND_SECONDS.time(driver=self.DRIVER):
+                result = self._send(command)
             if result:
                 logger.info(command)
                 if wait_time > 0:
@@ -222,7 +244,7 @@ class TfhkaPrinter(BasePrinter):
                     status["status_description"],
                     status["error_description"],
                 )
-                self._printer.SendCmd(HKAcmd.CANCEL)
+                self._send(HKAcmd.CANCEL)
 
             return result
         except Exception as e:
@@ -236,7 +258,7 @@ class TfhkaPrinter(BasePrinter):
             bool: True si la impresora esta operativa
         """
         try:
-            if not self.enabled or not self._printer.CheckFPrinter():
+            if not self.enabled or not self._check_printer():
                 return False
             return True
         except Exception as e:
@@ -385,11 +407,11 @@ class TfhkaPrinter(BasePrinter):
             logger.error("Error al generar reporte Z: %s", str(e))
             return False
 
-    def print_document(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def print_document(self, data: InvoiceData) -> Dict[str, Any]:
         """
         Imprime un documento fiscal
         Args:
-            data (Dict[str, Any]): Documento a imprimir
+            data (InvoiceData): Documento a imprimir
         Returns:
             Dict[str, Any]: Resultado de la impresión
         """
@@ -402,7 +424,8 @@ class TfhkaPrinter(BasePrinter):
             }
 
         try:
-            operation_type = data.get("operation_type", "").lower()
+            invoice = Invoice.parse(data)
+            operation_type = invoice.operation_type
             status = self.get_printer_status()
             message = f"Estado: {status['error_description']} | {status['status_description']}"
 
@@ -417,7 +440,7 @@ class TfhkaPrinter(BasePrinter):
                 message_return = "Impresora fiscal en estado inoperativo"
 
                 if status["status_code"] == 5:
-                    self._printer.SendCmd(HKAcmd.CANCEL)
+                    self._send(HKAcmd.CANCEL)
                     message_return = "Documento fiscal anulado"
 
                 logger.error(message)
@@ -428,39 +451,36 @@ class TfhkaPrinter(BasePrinter):
                 return {"status": False, "message": message_return, "data": data}
             logger.info(message)
 
-            self._process_customer_data(data, operation_type)  # Procesar datos del cliente
-            self._process_items(data, operation_type)  # Procesar ítems
-            self._process_footer(data, operation_type)  # Procesar pie de página
-            self._process_payments(data, operation_type)  # Procesar pagos
+            self._process_customer_data(invoice, operation_type)  # Procesar datos del cliente
+            self._process_items(invoice, operation_type)  # Procesar ítems
+            self._process_footer(invoice, operation_type)  # Procesar pie de página
+            self._process_payments(invoice, operation_type)  # Procesar pagos
             return self._process_send_data(operation_type)  # Procesar envio de datos
         except Exception as e:
             message = f"Error durante la impresión del documento fiscal: {str(e)}"
             logger.error(message)
             return {"status": False, "message": message, "data": None}
 
-    def _process_customer_data(self, data: Dict[str, Any], operation_type: str) -> None:
+    def _process_customer_data(self, invoice: Invoice, operation_type: str) -> None:
         """Procesa y envía los datos del cliente a la impresora."""
         logger.debug("Procesando documento")
 
-        customer = data.get("customer", {})
-        customer_vat = self.format_text(customer.get("customer_vat", ""), "vat")
-        customer_name = self.format_text(customer.get("customer_name", ""), "partner")
-        customer_address = self.format_text(customer.get("customer_address", ""), "comment")
-        customer_phone = self.format_text(customer.get("customer_phone", ""), "comment")
-        customer_email = self.format_text(customer.get("customer_email", ""), "comment")
+        customer_vat = self.format_text(invoice.customer_vat, "vat")
+        customer_name = self.format_text(invoice.customer_name, "partner")
+        customer_address = self.format_text(invoice.customer_address, "comment")
+        customer_phone = self.format_text(invoice.customer_phone, "comment")
+        customer_email = self.format_text(invoice.customer_email, "comment")
 
-        document = data.get("document", {})
-        document_number = normalize_number(document.get("document_number", ""))
-        document_date = normalize_date(document.get("document_date", ""))
-        document_name = self.format_text(document.get("document_name", ""), "comment")
-        document_cashier = self.format_text(document.get("document_cashier", ""), "comment")
+        document_number = normalize_number(invoice.document_number)
+        document_date = normalize_date(invoice.document_date)
+        document_name = self.format_text(invoice.document_name, "comment")
+        document_cashier = self.format_text(invoice.document_cashier, "comment")
 
         commands = []
         if operation_type == "credit":
-            affected_document = data.get("affected_document", {})
-            affected_number = normalize_number(affected_document.get("affected_number", ""))
-            affected_date = normalize_date(affected_document.get("affected_date", ""))
-            affected_serial = self.format_text(affected_document.get("affected_serial", ""), "comment")
+            affected_number = normalize_number(invoice.affected_number)
+            affected_date = normalize_date(invoice.affected_date)
+            affected_serial = self.format_text(invoice.affected_serial, "comment")
 
             commands.append(HKAcmd.AFFECTED_NUMBER.format(affected_number))
             commands.append(HKAcmd.AFFECTED_DATE.format(affected_date))
@@ -506,23 +526,21 @@ class TfhkaPrinter(BasePrinter):
             if not self.send_command(cmd):
                 raise RuntimeError(f"Error al procesar los datos del documento: {cmd}")
 
-    def _process_items(self, data: Dict[str, Any], operation_type: str) -> None:
+    def _process_items(self, invoice: Invoice, operation_type: str) -> None:
         """Procesa y envía los ítems del documento a la impresora."""
         logger.debug("Procesando items")
 
-        for item in data.get("items", []):
-            item_comment = self.format_text(item.get("item_comment", ""), "comment")
+        for item in invoice.items:
+            item_comment = self.format_text(item.comment, "comment")
             if self.template_config.get("format", {}).get("include_item_reference", False):
-                item_code = item.get("item_ref", "")
-                item_product = item.get("item_name", "")
-                item_name = self.format_text(f"[{item_code}] {item_product}", "product")
+                item_name = self.format_text(f"[{item.ref}] {item.name}", "product")
             else:
-                item_name = self.format_text(item.get("item_name", ""), "product")
+                item_name = self.format_text(item.name, "product")
 
             if operation_type == "note":
-                item_tax = item.get("item_tax", 0)
-                item_price = item.get("item_price", 0)
-                item_quantity = item.get("item_quantity", 0)
+                item_tax = item.tax
+                item_price = item.price
+                item_quantity = item.quantity
                 item_line = f"-{item_name} x{item_quantity} x{item_price} Iva:{item_tax}"
 
                 if not self.send_command(HKAcmd.DNF_CENTERED.format(item_line)):
@@ -532,18 +550,18 @@ class TfhkaPrinter(BasePrinter):
                     if not self.send_command(HKAcmd.DNF_BOLD_CENTERED.format(item_comment)):
                         raise RuntimeError(f"Error al procesar comentario DNF: {item_comment}")
             else:
-                item_tax = TAX_VALUES[operation_type].get(item.get("item_tax", 0), "")
-                item_price = self.format_number(item.get("item_price", 0), "price")
-                item_quantity = self.format_number(item.get("item_quantity", 0), "quantity")
+                item_tax = TAX_VALUES[operation_type].get(item.tax, "")
+                item_price = self.format_number(item.price, "price")
+                item_quantity = self.format_number(item.quantity, "quantity")
                 item_line = HKAcmd.ITEM_LINE.format(item_tax, item_price, item_quantity, item_name)
 
                 if not self.send_command(item_line):
                     raise RuntimeError(f"Error al procesar ítem: {item_line}")
 
-                if item.get("item_discount", 0) > 0:
+                if item.discount > 0:
                     discount = self.format_number(
-                        item.get("item_discount", 0),
-                        "percentage" if "percentage" in item.get("item_discount_type", "") else "discount",
+                        item.discount,
+                        "percentage" if "percentage" in item.discount_type else "discount",
                     )
                     discount_cmds = {
                         "discount_percentage": HKAcmd.ITEM_DISCOUNT_PERCENTAGE,
@@ -551,7 +569,7 @@ class TfhkaPrinter(BasePrinter):
                         "discount_amount": HKAcmd.ITEM_DISCOUNT_AMOUNT,
                         "surcharge_amount": HKAcmd.ITEM_SURCHARGE_AMOUNT,
                     }
-                    cmd_discount = discount_cmds.get(item.get("item_discount_type", ""))
+                    cmd_discount = discount_cmds.get(item.discount_type)
                     if cmd_discount:
                         cmd = cmd_discount.format(discount)
                         if not self.send_command(cmd):
@@ -561,13 +579,13 @@ class TfhkaPrinter(BasePrinter):
                     if not self.send_command(HKAcmd.ITEM_COMMENT.format(item_comment)):
                         raise RuntimeError(f"Error al procesar comentario: {item_comment}")
 
-    def _process_payments(self, data: Dict[str, Any], operation_type: str) -> None:
+    def _process_payments(self, invoice: Invoice, operation_type: str) -> None:
         """Procesa los métodos de pago del documento."""
         logger.debug("Procesando pagos")
 
-        payments = data.get("payments", [])
+        payments = invoice.payments
         if operation_type == "note":
-            total_amount = sum(payment["payment_amount"] for payment in payments)
+            total_amount = sum(payment.amount for payment in payments)
             if not self.send_command(HKAcmd.DNF_CLOSE.format(f"Monto Total: {total_amount}")):
                 raise RuntimeError("Error en cierre DNF")
         else:
@@ -579,18 +597,18 @@ class TfhkaPrinter(BasePrinter):
                 if not self.send_command(HKAcmd.PAY_UNIQUE):
                     raise RuntimeError("Error en pago único")
             elif len(payments) == 1:
-                code = payments[0]["payment_method"]
+                code = payments[0].method
                 if not self.send_command(HKAcmd.PAY_FULL.format(code)):
                     raise RuntimeError("Error en pago total")
             else:
-                sorted_payments = sorted(payments, key=lambda x: x["payment_method"], reverse=True)
+                sorted_payments = sorted(payments, key=lambda x: x.method, reverse=True)
                 for payment in sorted_payments[:-1]:
-                    code = payment["payment_method"]
-                    amount = self.format_number(payment["payment_amount"], "payment")
+                    code = payment.method
+                    amount = self.format_number(payment.amount, "payment")
                     if not self.send_command(HKAcmd.PAY_PARTIAL.format(code, amount)):
                         raise RuntimeError("Error en pago parcial")
 
-                code = sorted_payments[-1]["payment_method"]  # Último pago
+                code = sorted_payments[-1].method  # Último pago
                 if not self.send_command(HKAcmd.PAY_FULL.format(code)):
                     raise RuntimeError("Error en pago final")
 
@@ -598,13 +616,12 @@ class TfhkaPrinter(BasePrinter):
                 if not self.send_command(HKAcmd.IGTF_CLOSE):
                     raise RuntimeError("Error al ejecutar codigo de cierre con IGTF")
 
-    def _process_footer(self, data: Dict[str, Any], operation_type: str) -> None:
+    def _process_footer(self, invoice: Invoice, operation_type: str) -> None:
         """Procesa el pie de página."""
         logger.debug("Procesando pie de página")  # revisarlo y compararlo con el de printer_pnp.py
 
-        delivery = data.get("delivery", {})
-        delivery_comments = delivery.get("delivery_comments", [])
-        delivery_barcode = delivery.get("delivery_barcode", "")
+        delivery_comments = invoice.delivery_comments
+        delivery_barcode = invoice.delivery_barcode
 
         logger.debug("flag_30: %s", self._flag_30)
         logger.debug("flag_43: %s", self._flag_43)
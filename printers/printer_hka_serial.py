@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Clase para el manejo de la impresora fiscal HKA por puerto serial, sin el DLL TfhkaNet.
+Funciona en Linux y Windows; los documentos se arman igual que en TfhkaPrinter y solo
+cambia el transporte (controllers/pfhka.py).
+"""
+
+import logging
+from typing import Any, Dict
+
+from controllers.pfhka import REPORT_TIMEOUT, FiscalPrinter, ProtocolError
+from printers.printer_commands import HKAcmd
+from printers.printer_hka import TfhkaPrinter
+
+logger = logging.getLogger(__name__)
+
+REPORT_COMMANDS = {HKAcmd.DAILY_REPORT, HKAcmd.DAILY_CLOSE}  # Responden al terminar de imprimir
+FLAGS_TO_VIEW = (21, 30, 43, 50, 63)
+
+
+class TfhkaSerialPrinter(TfhkaPrinter):
+    """Impresora fiscal The Factory HKA por puerto serial (fiscal_driver: 'serial')"""
+
+    DRIVER = "tfhka_serial"
+
+    def _initialize_printer(self) -> None:
+        """Crea el controlador del puerto serial"""
+        self._printer = FiscalPrinter(self.port, self.baudrate, self.timeout)
+        logger.info("Impresora inicializada: driver serial en %s", self.port)
+
+    def _open_port(self) -> bool:
+        """Abre el puerto serial"""
+        return self._printer.is_open or self._printer.open_port()
+
+    def _close_port(self) -> None:
+        """Cierra el puerto serial"""
+        self._printer.close_port()
+
+    def _send(self, command: str) -> bool:
+        """Envía un comando y espera el ACK; los reportes X y Z tienen un plazo mayor"""
+        return self._printer.send_command(command, REPORT_TIMEOUT if command in REPORT_COMMANDS else None)
+
+    def _check_printer(self) -> bool:
+        """Indica si la impresora responde al ENQ"""
+        return self._printer.check_printer()
+
+    def get_printer_status(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado detallado de la impresora
+        Returns:
+            Dict[str, Any]: Diccionario con la información del estado
+        """
+        return self._printer.read_status()
+
+    def get_printer_data(self, models: str = "SV") -> Dict[str, Any]:
+        """
+        Obtiene datos de la impresora según el modelo solicitado, con el mismo formato de TfhkaPrinter
+        Args:
+            models: Tipo de datos a obtener ('SV', 'S1', 'S2', 'S3')
+        Returns:
+            Dict[str, Any]: Diccionario con la información solicitada
+        """
+        try:
+            result = {"status": True, "type": models, "data": {}}
+
+            if models == "SV":
+                data = self._printer.get_sv()
+                result["data"] = {"country": data["country"], "model": data["model"]}
+
+            elif models == "S1":
+                data = self._printer.get_s1()
+                result["data"] = {
+                    "general": {
+                        "rif": data["rif"],
+                        "machine_number": data["machine_number"],
+                        "cashier_number": data["cashier_number"],
+                        "current_datetime": data["current_date"],
+                    },
+                    "counters": {
+                        "audit_reports": data["audit_reports"],
+                        "daily_closure": data["daily_closure"],
+                        "last_invoice": data["last_invoice"],
+                        "last_credit_note": data["last_credit_note"],
+                        "last_debit_note": data["last_debit_note"],
+                        "last_non_fiscal_doc": data["last_non_fiscal_doc"],
+                    },
+                    "daily_totals": {
+                        "sales": data["total_daily_sales"],
+                        "invoices": data["invoices_today"],
+                        "credit_notes": data["credit_notes_today"],
+                        "debit_notes": data["debit_notes_today"],
+                        "non_fiscal_docs": data["non_fiscal_docs_today"],
+                    },
+                }
+                logger.debug("Datos fiscales obtenidos: %s", result["data"])
+
+            elif models == "S2":
+                data = self._printer.get_s2()
+                result["data"] = {
+                    "document": {"type": data["document_type"], "condition": 0},
+                    "totals": {
+                        "amount_payable": data["amount_payable"],
+                        "subtotal_bases": data["subtotal_bases"],
+                        "subtotal_tax": data["subtotal_tax"],
+                    },
+                    "counts": {"articles": data["articles"], "payments_made": data["payments_made"]},
+                    "metadata": {"data_dummy": data["data_dummy"]},
+                }
+                logger.debug("Datos del documento en curso: %s", result["data"])
+
+            elif models == "S3":
+                data = self._printer.get_s3()
+                taxes = data["taxes"]
+                result["data"] = {
+                    "taxes": {
+                        "tax1": {"value": taxes[0]["value"], "type": taxes[0]["type"]},
+                        "tax2": {"value": taxes[1]["value"], "type": taxes[1]["type"]},
+                        "tax3": {"value": taxes[2]["value"], "type": taxes[2]["type"]},
+                        "igtf": {"value": data["igtf"]["value"], "type": data["igtf"]["type"]},
+                    },
+                    "flags": {
+                        f"flag_{index:02}": flag.zfill(2)
+                        for index, flag in enumerate(data["flags"])
+                        if index in FLAGS_TO_VIEW
+                    },
+                }
+                logger.debug("Configuración de impuestos y flags: %s", result["data"])
+            else:
+                raise ValueError(f"Modelo de datos no válido: {models}")
+            return result
+
+        except (ProtocolError, ValueError, OSError) as e:
+            logger.error("Error al obtener los datos de la impresora: %s", str(e))
+            return {
+                "status": False,
+                "message": f"Error al obtener los datos de la impresora: {str(e)}",
+            }
@@ -14,10 +14,12 @@ import json
 import logging
 import os
 from decimal import Decimal, ROUND_HALF_UP, getcontext
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Union
 
+from models.model_invoice import Invoice, InvoiceData
 from printers.printer_base import BasePrinter
 from printers.printer_commands import PNPcmd
+from utils.metrics import COMMAND_SECONDS
 from utils.tools import get_base_path, normalize_text, normalize_date, normalize_number, format_date, format_time
 
 # Configuración del logging
@@ -30,6 +32,7 @@ class PnpPrinter(BasePrinter):
     # Constantes de error
     ERROR_CONNECTION = "Error: {}"
     ERROR_STATUS = "Código Impresora: {} || Código Fiscal: {}"
+    DRIVER = "pnp"  # Etiqueta de las métricas de comandos
 
     def __init__(self, config: Dict[str, Any]):
         """
@@ -122,25 +125,22 @@ class PnpPrinter(BasePrinter):
             bool: True si la conexión fue exitosa
         """
         try:
-            port_number = self.port.replace("COM", "") if self.port.startswith("COM") else self.port
-            open_port = self._printer.PFabrepuerto(str(port_number).encode())
-
-            if open_port.decode("utf-8") == "OK":
+            if self._open_port() == "OK":
                 logger.debug("Conexion con el puerto OK")
 
                 # Tipo o Modelo de Impresora
                 if self._model == "PF-300":
-                    if self._printer.PFTipoImp(b"300").decode("utf-8") != "OK":
+                    if self._set_model("300") != "OK":
                         raise RuntimeError("Error al establecer tipo de impresora Matriz")
                 else:
-                    if self._printer.PFTipoImp(b"220").decode("utf-8") != "OK":
+                    if self._set_model("220") != "OK":
                         raise RuntimeError("Error al establecer tipo de impresora Ticket")
 
                 # Serial de la impresora
-                if self._printer.PFSerial().decode("utf-8") != "OK":
+                if self._read_serial() != "OK":
                     raise RuntimeError("Error al obtener serial de la impresora")
 
-                printer_data = self._printer.PFultimo().decode("utf-8").split(",")
+                printer_data = self._last_response()
                 self._serial = printer_data[2]
 
                 logger.info("Conexión establecida con la impresora Modelo: %s, Serial: %s", self._model, self._serial)
@@ -153,6 +153,82 @@ class PnpPrinter(BasePrinter):
             logger.error("Error al conectar: %s", str(e))
             return False
 
+    # Operaciones con la impresora. Cada una retorna el resultado del DLL: 'OK', 'ER' (error de la
+    # impresora), 'TO' (sin respuesta) o 'NP' (puerto no abierto); PnpSerialPrinter las reemplaza.
+
+    def _dll(self, function: str, *args: str) -> str:
+        """Llama una función del DLL con argumentos de texto y retorna su resultado"""
+        return getattr(self._printer, function)(*(arg.encode() for arg in args)).decode("utf-8")
+
+    def _open_port(self) -> str:
+        """Abre el puerto de la impresora"""
+        port_number = self.port.replace("COM", "") if self.port.startswith("COM") else self.port
+        return self._dll("PFabrepuerto", str(port_number))
+
+    def _close_port(self) -> None:
+        """Cierra el puerto de la impresora"""
+        self._printer.PFcierrapuerto()
+
+    def _set_model(self, model: str) -> str:
+        """Establece el modelo de impresora ('220' ticket, '300' matriz)"""
+        return self._dll("PFTipoImp", model)
+
+    def _read_serial(self) -> str:
+        """Consulta el serial de la impresora; los datos quedan en _last_response"""
+        return self._dll("PFSerial")
+
+    def _last_response(self) -> List[str]:
+        """Campos de la última respuesta de la impresora"""
+        return self._dll("PFultimo").split(",")
+
+    def _command(self, command: str) -> str:
+        """Envía un comando con sus campos separados por '|' (p. ej. '8|V')"""
+        return self._dll("PFComando", command)
+
+    def _read_status(self, kind: str) -> str:
+        """Consulta el estado de la impresora; los datos quedan en _last_response"""
+        return self._dll("PFestatus", kind)
+
+    def _cancel(self) -> str:
+        """Cancela el documento fiscal abierto"""
+        return self._dll("PFCancelaDoc", "D", "0")
+
+    def _open_invoice(self, name: str, vat: str) -> str:
+        """Abre una factura (o nota de débito)"""
+        return self._dll("PFabrefiscal", name, vat)
+
+    def _open_credit(self, name: str, vat: str, number: str, serial: str, date: str, hour: str) -> str:
+        """Abre una nota de crédito con los datos de la factura afectada"""
+        return self._dll("PFDevolucion", name, vat, number, serial, date, hour)
+
+    def _fiscal_text(self, text: str) -> str:
+        """Imprime una línea de texto en el documento fiscal"""
+        return self._dll("PFTfiscal", text)
+
+    def _add_item(self, name: str, quantity: str, price: str, tax: str) -> str:
+        """Agrega un ítem; cantidad y precio con punto decimal, tasa sin punto (1600 = 16%)"""
+        return self._dll("PFrenglon", name, quantity, price, tax)
+
+    def _close_fiscal(self) -> str:
+        """Cierra el documento fiscal con pago total"""
+        return self._dll("PFtotal")
+
+    def _open_nonfiscal(self) -> str:
+        """Abre un documento no fiscal"""
+        return self._dll("PFAbreNF")
+
+    def _nonfiscal_text(self, text: str) -> str:
+        """Imprime una línea en el documento no fiscal"""
+        return self._dll("PFLineaNF", text)
+
+    def _close_nonfiscal(self) -> str:
+        """Cierra el documento no fiscal"""
+        return self._dll("PFCierraNF")
+
+    def _report(self, kind: str) -> str:
+        """Imprime el reporte 'X' o 'Z'"""
+        return self._dll("PFrepx" if kind == "X" else "PFrepz")
+
     def format_number(self, value: Union[float, int, str], field_type: str) -> str:
         """
         Formatea un número como string según el tipo de campo para la impresora PNP.
@@ -212,7 +288,7 @@ class PnpPrinter(BasePrinter):
     def cancel_doc(self, operation_type: str) -> str:
         """Metodo para cancelar, anular o cerrar documento"""
         msg = ""
-        result = self._printer.PFCancelaDoc(b"D", b"0").decode("utf-8")
+        result = self._cancel()
         if result == "OK":
             msg = "Documento Cancelado"
         if result == "TO":
@@ -221,15 +297,15 @@ class PnpPrinter(BasePrinter):
             msg = "Puerto NO Abierto"
         if result == "ER":
             if operation_type == "note":
-                self._printer.PFCierraNF()
+                self._close_nonfiscal()
                 msg = "Impresión Interrumpida"
             else:
-                self._printer.PFComando(b"C")
-                result = self._printer.PFultimo().decode("utf-8").split(",")
+                self._command("C")
+                result = self._last_response()
                 if int(result[15]) > 0:
                     msg = "Impresora con documento fiscal abierto. Cancelar la operación reiniciando la impresora"
                 else:
-                    self._printer.PFComando(b"E|T")
+                    self._command("E|T")
                     msg = "Impresora con documento fiscal en cero. Se procede a cancelar la operación"
         return msg
 
@@ -237,7 +313,7 @@ class PnpPrinter(BasePrinter):
         """Desconecta la impresora fiscal y libera el DLL"""
         try:
             if self._printer:
-                self._printer.PFcierrapuerto()
+                self._close_port()
                 # Get DLL handle using safer method
                 handle = ctypes.c_void_p.from_address(id(self._printer)).value
                 self._printer = None
@@ -259,9 +335,10 @@ class PnpPrinter(BasePrinter):
             bool: True si el comando se ejecutó correctamente
         """
         try:
-            result = self._printer.PFComando(command.encode())
+            with COMMAND_SECONDS.time(driver=self.DRIVER):
+                result = self._command(command)
             # print(f"send_command: {command} | {result}")
-            if result.decode("utf-8") == "OK":
+            if result == "OK":
                 logger.info(command)
                 if wait_time > 0:
                     time.sleep(wait_time)
@@ -310,7 +387,7 @@ class PnpPrinter(BasePrinter):
             Dict[str, Any]: Diccionario con la información del estado
         """
         try:
-            check_status = self._printer.PFestatus(b"V").decode("utf-8")
+            check_status = self._read_status("V")
             if check_status != "OK":
                 logger.error("Error al obtener estado de la impresora")
                 return {
@@ -320,8 +397,8 @@ class PnpPrinter(BasePrinter):
                     "status_description": "Error al obtener estado",
                 }
 
-            logger.debug("Estado de la impresora: %s", self._printer.PFultimo().decode("utf-8"))
-            status = self._printer.PFultimo().decode("utf-8").split(",")
+            status = self._last_response()
+            logger.debug("Estado de la impresora: %s", ",".join(status))
             error_code = status[0]  # Estado de la impresora
             status_code = status[1]  # Estado fiscal
             return PNPcmd.parse_status(error_code, status_code)
@@ -349,13 +426,12 @@ class PnpPrinter(BasePrinter):
         """
         try:
             printer_states = PNPcmd.PRINTER_STATES
-            cmd = f"8|{model}".encode()
-            if self._printer.PFComando(cmd).decode("utf-8") != "OK":
+            cmd = f"8|{model}"
+            if self._command(cmd) != "OK":
                 logger.error("Error al obtener datos de la impresora con modelo %s", model)
                 return {"status": False, "error": "Error al obtener datos de la impresora", "data": None}
 
-            response = self._printer.PFultimo().decode("utf-8")
-            response_data = response.split(",")
+            response_data = self._last_response()
 
             if len(response_data) < 2:
                 return {"status": False, "error": "Respuesta incompleta de la impresora", "data": None}
@@ -438,9 +514,9 @@ class PnpPrinter(BasePrinter):
     def report_x(self) -> bool:
         """Imprime reporte X (reporte diario sin cierre)"""
         try:
-            response = self._printer.PFrepx()
-            if response.decode("utf-8") != "OK":
-                logger.error("Error en PFrepx: %s", response.decode("utf-8"))
+            response = self._report("X")
+            if response != "OK":
+                logger.error("Error en reporte X: %s", response)
                 return False
             return True
         except Exception as e:
@@ -450,22 +526,27 @@ class PnpPrinter(BasePrinter):
     def report_z(self) -> bool:
         """Imprime reporte Z (cierre diario)"""
         try:
-            return self._printer.PFrepz()
+            response = self._report("Z")
+            if response != "OK":
+                logger.error("Error en reporte Z: %s", response)
+                return False
+            return True
         except Exception as e:
             logger.error("Error al generar reporte Z: %s", str(e))
             return False
 
-    def print_document(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def print_document(self, data: InvoiceData) -> Dict[str, Any]:
         """
         Imprime un documento fiscal
         Args:
-            data (Dict[str, Any]): Documento a imprimir
+            data (InvoiceData): Documento a imprimir
         Returns:
             Dict[str, Any]: Resultado de la impresión
         """
         logger.debug("Procesando documento")
+        invoice = Invoice.parse(data)
+        operation_type = invoice.operation_type
         try:
-            operation_type = data.get("operation_type", "").lower()
             status = self.get_printer_status()
             message = f"Estado: {status['error_description']} | {status['status_description']}"
 
@@ -477,13 +558,13 @@ class PnpPrinter(BasePrinter):
                 }
             logger.info(message)
             # Procesar datos del cliente
-            self._process_customer_data(data, operation_type)
+            self._process_customer_data(invoice, operation_type)
             # Procesar ítems
-            self._process_items(data, operation_type)
+            self._process_items(invoice, operation_type)
             # Procesar pie de página
-            self._process_footer(data, operation_type)
+            self._process_footer(invoice, operation_type)
             # Procesar pagos
-            self._process_payments(data, operation_type)
+            self._process_payments(invoice, operation_type)
             # Procesar envio de datos
             return self._process_send_data(operation_type)
 
@@ -492,29 +573,26 @@ class PnpPrinter(BasePrinter):
             logger.error(message)
             return {"status": False, "message": message, "data": None}
 
-    def _process_customer_data(self, data: Dict[str, Any], operation_type: str) -> None:
+    def _process_customer_data(self, invoice: Invoice, operation_type: str) -> None:
         """Procesa y envía los datos del cliente a la impresora."""
         logger.debug("Procesando datos del documento")
 
-        customer = data.get("customer", {})
-        customer_vat = self.format_text(customer.get("customer_vat", ""), "vat")
-        customer_name = self.format_text(customer.get("customer_name", ""), "partner")
-        customer_address = self.format_text(customer.get("customer_address", ""), "comment")
-        customer_phone = self.format_text(customer.get("customer_phone", ""), "comment")
-        customer_email = self.format_text(customer.get("customer_email", ""), "comment")
+        customer_vat = self.format_text(invoice.customer_vat, "vat")
+        customer_name = self.format_text(invoice.customer_name, "partner")
+        customer_address = self.format_text(invoice.customer_address, "comment")
+        customer_phone = self.format_text(invoice.customer_phone, "comment")
+        customer_email = self.format_text(invoice.customer_email, "comment")
 
-        document = data.get("document", {})
-        document_number = normalize_number(document.get("document_number", ""))
-        document_date = normalize_date(document.get("document_date", ""))
-        document_name = self.format_text(document.get("document_name", ""), "comment")
-        document_cashier = self.format_text(document.get("document_cashier", ""), "comment")
+        document_number = normalize_number(invoice.document_number)
+        document_date = normalize_date(invoice.document_date)
+        document_name = self.format_text(invoice.document_name, "comment")
+        document_cashier = self.format_text(invoice.document_cashier, "comment")
 
         commands = []
         if operation_type == "credit":
-            affected_document = data.get("affected_document", {})
-            affected_number = normalize_number(affected_document.get("affected_number", ""), 10)
-            affected_date = normalize_date(affected_document.get("affected_date", ""))
-            affected_serial = self.format_text(affected_document.get("affected_serial", ""), "comment")
+            affected_number = normalize_number(invoice.affected_number, 10)
+            affected_date = normalize_date(invoice.affected_date)
+            affected_serial = self.format_text(invoice.affected_serial, "comment")
             current_time = format_time(datetime.datetime.now().strftime("%H%M"))
 
             logger.info(
@@ -526,34 +604,29 @@ class PnpPrinter(BasePrinter):
                 affected_date,
                 current_time,
             )
-            result = self._printer.PFDevolucion(
-                customer_name.encode(),
-                customer_vat.encode(),
-                affected_number.encode(),
-                affected_serial.encode(),
-                affected_date.encode(),
-                current_time.encode(),
+            result = self._open_credit(
+                customer_name, customer_vat, affected_number, affected_serial, affected_date, current_time
             )
-            if result.decode("utf-8") != "OK":
+            if result != "OK":
                 response = self.cancel_doc(operation_type)
                 raise RuntimeError(f"Error al abrir la nota de credito || PFCancelaDoc: {response}")
 
         if operation_type in ("debit", "invoice"):
             logger.info("PFabrefiscal(%s,%s)", customer_name, customer_vat)
-            result = self._printer.PFabrefiscal(customer_name.encode(), customer_vat.encode())
-            if result.decode("utf-8") != "OK":
+            result = self._open_invoice(customer_name, customer_vat)
+            if result != "OK":
                 response = self.cancel_doc(operation_type)
                 raise RuntimeError(f"Error al abrir la factura || PFCancelaDoc: {response}")
 
         if operation_type in ("credit", "debit", "invoice"):
             include_line = {
-                "include_partner_address": PNPcmd.PARTNER_ADDRESS.format(customer_address).encode(),
-                "include_partner_phone": PNPcmd.PARTNER_PHONE.format(customer_phone).encode(),
-                "include_partner_email": PNPcmd.PARTNER_EMAIL.format(customer_email).encode(),
-                "include_document_number": PNPcmd.DOCUMENT_NUMBER.format(document_number).encode(),
-                "include_document_date": PNPcmd.DOCUMENT_DATE.format(document_date).encode(),
-                "include_document_name": PNPcmd.DOCUMENT_NAME.format(document_name).encode(),
-                "include_document_cashier": PNPcmd.DOCUMENT_CASHIER.format(document_cashier).encode(),
+                "include_partner_address": PNPcmd.PARTNER_ADDRESS.format(customer_address),
+                "include_partner_phone": PNPcmd.PARTNER_PHONE.format(customer_phone),
+                "include_partner_email": PNPcmd.PARTNER_EMAIL.format(customer_email),
+                "include_document_number": PNPcmd.DOCUMENT_NUMBER.format(document_number),
+                "include_document_date": PNPcmd.DOCUMENT_DATE.format(document_date),
+                "include_document_name": PNPcmd.DOCUMENT_NAME.format(document_name),
+                "include_document_cashier": PNPcmd.DOCUMENT_CASHIER.format(document_cashier),
             }
 
             format_config = self.template_config.get("format", {})
@@ -562,141 +635,137 @@ class PnpPrinter(BasePrinter):
             if lines_add:
                 for command in lines_add[:3]:
                     logger.info("PFTfiscal(%s)", command)
-                    self._printer.PFTfiscal(command)
+                    self._fiscal_text(command)
                 logger.info("PFTfiscal(%s)", PNPcmd.INTER_LINE)
-                self._printer.PFTfiscal(PNPcmd.INTER_LINE.encode())
+                self._fiscal_text(PNPcmd.INTER_LINE)
 
         if operation_type == "note":
-            name_note = self.template_config.get("fiscal", {}).get("name_note", "Nota").encode()
+            name_note = self.template_config.get("fiscal", {}).get("name_note", "Nota")
 
-            result = self._printer.PFAbreNF()
+            result = self._open_nonfiscal()
             logger.info("PFAbreNF()")
-            if result.decode("utf-8") != "OK":
+            if result != "OK":
                 raise RuntimeError("Error al abrir documento NO fiscal")
 
             commands = [
                 name_note,
-                PNPcmd.INTER_LINE.encode(),
-                PNPcmd.PARTNER_VAT.format(customer_vat).encode(),
-                PNPcmd.PARTNER_NAME.format(customer_name).encode(),
-                PNPcmd.PARTNER_ADDRESS.format(customer_address).encode(),
-                PNPcmd.PARTNER_PHONE.format(customer_phone).encode(),
-                PNPcmd.PARTNER_EMAIL.format(customer_email).encode(),
-                PNPcmd.DOCUMENT_NUMBER.format(document_number).encode(),
-                PNPcmd.DOCUMENT_DATE.format(document_date).encode(),
-                PNPcmd.DOCUMENT_NAME.format(document_name).encode(),
-                PNPcmd.DOCUMENT_CASHIER.format(document_cashier).encode(),
-                PNPcmd.INTER_LINE.encode(),
+                PNPcmd.INTER_LINE,
+                PNPcmd.PARTNER_VAT.format(customer_vat),
+                PNPcmd.PARTNER_NAME.format(customer_name),
+                PNPcmd.PARTNER_ADDRESS.format(customer_address),
+                PNPcmd.PARTNER_PHONE.format(customer_phone),
+                PNPcmd.PARTNER_EMAIL.format(customer_email),
+                PNPcmd.DOCUMENT_NUMBER.format(document_number),
+                PNPcmd.DOCUMENT_DATE.format(document_date),
+                PNPcmd.DOCUMENT_NAME.format(document_name),
+                PNPcmd.DOCUMENT_CASHIER.format(document_cashier),
+                PNPcmd.INTER_LINE,
             ]
 
             for command in commands:
-                self._printer.PFLineaNF(command)
-                logger.info("PFLineaNF(%s)", command.decode("utf-8"))
+                self._nonfiscal_text(command)
+                logger.info("PFLineaNF(%s)", command)
 
-    def _process_items(self, data: Dict[str, Any], operation_type: str) -> None:
+    def _process_items(self, invoice: Invoice, operation_type: str) -> None:
         """Procesa y envía los ítems del documento a la impresora."""
         logger.debug("Procesando items")
 
-        for item in data.get("items", []):
-            item_comment = self.format_text(item.get("item_comment", ""), "comment")
+        for item in invoice.items:
+            item_comment = self.format_text(item.comment, "comment")
             if self.template_config.get("format", {}).get("include_item_reference", False):
-                item_code = item.get("item_ref", "")
-                item_product = item.get("item_name", "")
-                item_name = self.format_text(f"[{item_code}] {item_product}", "product")
+                item_name = self.format_text(f"[{item.ref}] {item.name}", "product")
             else:
-                item_name = self.format_text(item.get("item_name", ""), "product")
+                item_name = self.format_text(item.name, "product")
 
-            item_quantity = self.format_number(item.get("item_quantity", 0), "quantity")
-            item_price = self.format_number(item.get("item_price", 0), "price")
-            item_tax = item.get("item_tax", "0")
+            item_quantity = self.format_number(item.quantity, "quantity")
+            item_price = self.format_number(item.price, "price")
+            item_tax = item.tax
 
             if operation_type == "note":
                 item_line = f"{item_name} x{item_quantity} x{item_price} Iva:{item_tax}"
 
-                result = self._printer.PFLineaNF(item_line.encode())
+                result = self._nonfiscal_text(item_line)
                 logger.info("PFLineaNF(%s)", item_line)
-                if result.decode("utf-8") != "OK":
+                if result != "OK":
                     response = self.cancel_doc(operation_type)
                     raise RuntimeError(f"Error al procesar ítem || PFCancelaDoc: {response}")
 
                 if self.template_config.get("format", {}).get("include_item_comment", False) and item_comment:
-                    self._printer.PFLineaNF(item_comment.encode())
+                    self._nonfiscal_text(item_comment)
                     logger.info("PFLineaNF(%s)", item_comment)
             else:
                 tax_value = str(int(float(item_tax) * 100)).zfill(4)
 
                 logger.info("PFrenglon(%s,%s,%s,%s)", item_name, item_quantity, item_price, tax_value)
-                result = self._printer.PFrenglon(
-                    item_name.encode(), item_quantity.encode(), item_price.encode(), tax_value.encode()
-                )
-                if result.decode("utf-8") != "OK":
+                result = self._add_item(item_name, item_quantity, item_price, tax_value)
+                if result != "OK":
                     response = self.cancel_doc(operation_type)
                     raise RuntimeError(f"Error al procesar ítem || PFCancelaDoc: {response}")
 
                 if self.template_config.get("format", {}).get("include_item_comment", False) and item_comment:
                     logger.info("PFTfiscal(%s)", item_comment)
-                    result = self._printer.PFTfiscal(item_comment.encode())
-                    if result.decode("utf-8") != "OK":
+                    result = self._fiscal_text(item_comment)
+                    if result != "OK":
                         raise RuntimeError(f"Error al procesar comentario: {item_comment}")
 
-    def _process_footer(self, data: Dict[str, Any], operation_type: str) -> None:
+    def _process_footer(self, invoice: Invoice, operation_type: str) -> None:
         """Procesa el pie de página."""
         logger.debug("Procesando pie de página")
 
-        delivery_comments = data.get("delivery", {}).get("delivery_comments", [])
-        delivery_barcode = data.get("delivery", {}).get("delivery_barcode", "")
+        delivery_comments = invoice.delivery_comments
+        delivery_barcode = invoice.delivery_barcode
 
         if delivery_comments and self.template_config.get("format", {}).get("include_delivery_comments", False):
             if operation_type == "note":
                 logger.info("PFLineaNF(%s)", PNPcmd.INTER_LINE)
-                self._printer.PFLineaNF(PNPcmd.INTER_LINE.encode())
+                self._nonfiscal_text(PNPcmd.INTER_LINE)
             else:
                 logger.info("PFTfiscal(%s)", PNPcmd.INTER_LINE)
-                self._printer.PFTfiscal(PNPcmd.INTER_LINE.encode())
+                self._fiscal_text(PNPcmd.INTER_LINE)
 
             for comment in delivery_comments:
                 line_comment = self.format_text(comment, "comment")
                 if operation_type == "note":
-                    self._printer.PFLineaNF(line_comment.encode())
+                    self._nonfiscal_text(line_comment)
                     logger.info("PFLineaNF(%s)", line_comment)
                 else:
                     logger.info("PFTfiscal(%s)", line_comment)
-                    result = self._printer.PFTfiscal(line_comment.encode())
-                    if result.decode("utf-8") != "OK":
+                    result = self._fiscal_text(line_comment)
+                    if result != "OK":
                         raise RuntimeError(f"Error al procesar delivery comments: {line_comment}")
 
         if delivery_barcode and self.template_config.get("format", {}).get("include_delivery_barcode", False):
             if operation_type == "note":
-                self._printer.PFLineaNF(delivery_barcode.encode())
+                self._nonfiscal_text(delivery_barcode)
                 logger.info("PFLineaNF(%s)", delivery_barcode)
             else:
                 logger.info("PFBarra(%s)", delivery_barcode)  # Se usa PFTfiscal por error en el simulador
-                result = self._printer.PFTfiscal(delivery_barcode.encode())  # Pendiente por probar funcion PFBarra
-                if result.decode("utf-8") != "OK":
+                result = self._fiscal_text(delivery_barcode)  # Pendiente por probar funcion PFBarra
+                if result != "OK":
                     raise RuntimeError(f"Error al procesar código de barras: {delivery_barcode}")
 
-    def _process_payments(self, data: Dict[str, Any], operation_type: str) -> None:
+    def _process_payments(self, invoice: Invoice, operation_type: str) -> None:
         """Procesa los métodos de pago del documento."""
         logger.debug("Procesando pagos")
 
-        payments = data.get("payments", [])
-        total_amount = sum(float(payment.get("payment_amount", 0)) for payment in payments)
+        payments = invoice.payments
+        total_amount = sum(float(payment.amount) for payment in payments)
 
         if operation_type == "note":
-            self._printer.PFLineaNF(f"Monto Total: {total_amount}".encode())
-            result = self._printer.PFCierraNF()
+            self._nonfiscal_text(f"Monto Total: {total_amount}")
+            result = self._close_nonfiscal()
             logger.info("PFCierraNF(Monto Total %s)", total_amount)
-            if result.decode("utf-8") != "OK":
+            if result != "OK":
                 raise RuntimeError("Error al cerrar documento NO fiscal")
         else:
             if payments:
                 mount_base = 0
                 mount_igtf = 0
-                sorted_payments = sorted(payments, key=lambda x: x["payment_method"], reverse=True)
+                sorted_payments = sorted(payments, key=lambda x: x.method, reverse=True)
                 for payment in sorted_payments:
-                    code = payment["payment_method"]
-                    mount_base += payment["payment_amount"] if 1 <= int(code) <= 19 else 0
-                    mount_igtf += payment["payment_amount"] if 20 <= int(code) <= 24 else 0
+                    code = payment.method
+                    mount_base += payment.amount if 1 <= int(code) <= 19 else 0
+                    mount_igtf += payment.amount if 20 <= int(code) <= 24 else 0
 
                 if mount_igtf > 0:
                     formatted_igtf = self.format_number(mount_igtf, "payment").replace(".", "")
@@ -704,12 +773,12 @@ class PnpPrinter(BasePrinter):
                         raise RuntimeError("Error en pago con IGTF")
 
             time.sleep(1)
-            result = self._printer.PFtotal()
+            result = self._close_fiscal()
             logger.info("PFtotal(%s)", total_amount)
-            if result.decode("utf-8") != "OK":
+            if result != "OK":
                 raise RuntimeError("Error al cerrar documento fiscal")
 
-        response = self._printer.PFultimo().decode("utf-8").split(",")
+        response = self._last_response()
         if operation_type == "note":
             self._last_document = response[2]
         if operation_type in ("debit", "invoice"):
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Clase para el manejo de la impresora fiscal PNP por puerto serial, sin pnpdll.dll.
+Funciona en Linux y Windows; los documentos se arman igual que en PnpPrinter y solo
+cambia el transporte (controllers/pfpnp.py).
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from controllers.pfpnp import FiscalPrinter
+from printers.printer_pnp import PnpPrinter
+
+logger = logging.getLogger(__name__)
+
+PRINTER_ERRORS = ("error_impresora", "fuera_linea", "sin_papel")  # Bits de la palabra de estado de impresora
+FISCAL_ERRORS = (  # Bits de la palabra de estado fiscal que indican que el comando no se ejecutó
+    "error_memoria_fiscal",
+    "error_memoria_trabajo",
+    "comando_desconocido",
+    "datos_invalidos",
+    "comando_invalido",
+    "desborde_totales",
+    "memoria_fiscal_llena",
+)
+
+
+class PnpSerialPrinter(PnpPrinter):
+    """Impresora fiscal PNP por puerto serial (fiscal_driver: 'serial')"""
+
+    DRIVER = "pnp_serial"
+
+    def _initialize_printer(self) -> None:
+        """Crea el controlador del puerto serial"""
+        self._printer = FiscalPrinter(self.port, self.baudrate)
+        self._last_fields: List[str] = []
+        logger.info("Impresora inicializada: driver serial en %s", self.port)
+
+    def _result(self, response: Dict[str, Any]) -> str:
+        """
+        Convierte la respuesta del controlador al resultado del DLL y guarda sus campos.
+        Args:
+            response: Respuesta de controllers.pfpnp.FiscalPrinter
+        Returns:
+            str: 'OK', 'ER', 'TO' (sin respuesta) o 'NP' (puerto no abierto)
+        """
+        if not self._printer.status_connection:
+            return "NP"
+        if response.get("timeout"):
+            logger.error("Sin respuesta de la impresora: %s", response["error"])
+            return "TO"
+        if response["status"] != "ok":
+            logger.error("Respuesta de la impresora: %s", response["error"])
+            return "ER"
+
+        self._last_fields = response["fields"]
+        printer_status = response.get("printer_status", {})
+        fiscal_status = response.get("fiscal_status", {})
+        failed = [bit for bit in PRINTER_ERRORS if printer_status.get(bit)]
+        failed += [bit for bit in FISCAL_ERRORS if fiscal_status.get(bit)]
+        if failed:
+            logger.error("Estado de la impresora %s: %s", ",".join(self._last_fields[:2]), ", ".join(failed))
+            return "ER"
+        return "OK"
+
+    def _open_port(self) -> str:
+        """Abre el puerto serial"""
+        return "OK" if self._printer.status_connection or self._printer.open_port() else "NP"
+
+    def _close_port(self) -> None:
+        """Cierra el puerto serial"""
+        self._printer.close_port()
+
+    def _set_model(self, model: str) -> str:
+        """El modelo solo define los anchos de texto (format_text); no se envía a la impresora"""
+        return "OK"
+
+    def _read_serial(self) -> str:
+        """Consulta el serial de la impresora"""
+        return self._result(self._printer.serial_info())
+
+    def _last_response(self) -> List[str]:
+        """Campos de la última respuesta de la impresora"""
+        return list(self._last_fields)
+
+    def _command(self, command: str) -> str:
+        """Envía un comando con sus campos separados por '|' (p. ej. '8|V')"""
+        return self._result(self._printer.command(command))
+
+    def _read_status(self, kind: str) -> str:
+        """Consulta el estado de la impresora"""
+        return self._result(self._printer.status_if(kind))
+
+    def _cancel(self) -> str:
+        """Cancela el documento fiscal abierto"""
+        return self._result(self._printer.fiscal_cancel())
+
+    def _open_invoice(self, name: str, vat: str) -> str:
+        """Abre una factura (o nota de débito)"""
+        return self._result(self._printer.fiscal_open(name, vat, FiscalPrinter.DOC_TYPE_INVOICE))
+
+    def _open_credit(self, name: str, vat: str, number: str, serial: str, date: str, hour: str) -> str:
+        """Abre una nota de crédito con los datos de la factura afectada"""
+        return self._result(
+            self._printer.fiscal_open(name, vat, FiscalPrinter.DOC_TYPE_CREDIT_NOTE, number, serial, date, hour)
+        )
+
+    def _fiscal_text(self, text: str) -> str:
+        """Imprime una línea de texto en el documento fiscal"""
+        return self._result(self._printer.fiscal_text(text))
+
+    def _add_item(self, name: str, quantity: str, price: str, tax: str) -> str:
+        """Agrega un ítem; el controlador espera la tasa en porcentaje (16.00)"""
+        return self._result(self._printer.fiscal_item(name, Decimal(quantity), Decimal(price), Decimal(tax) / 100))
+
+    def _close_fiscal(self) -> str:
+        """Cierra el documento fiscal con pago total"""
+        return self._result(self._printer.fiscal_close())
+
+    def _open_nonfiscal(self) -> str:
+        """Abre un documento no fiscal"""
+        return self._result(self._printer.dnf_open())
+
+    def _nonfiscal_text(self, text: str) -> str:
+        """Imprime una línea en el documento no fiscal"""
+        return self._result(self._printer.dnf_text(text))
+
+    def _close_nonfiscal(self) -> str:
+        """Cierra el documento no fiscal"""
+        return self._result(self._printer.dnf_close())
+
+    def _report(self, kind: str) -> str:
+        """Imprime el reporte 'X' o 'Z'"""
+        return self._result(self._printer.report_x() if kind == "X" else self._printer.report_z())
+
+    def disconnect(self) -> None:
+        """Cierra el puerto serial"""
+        try:
+            self._close_port()
+            logger.info("Desconexión exitosa")
+        except Exception as e:
+            logger.error("Error al desconectar: %s", str(e))
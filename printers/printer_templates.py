@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Caché en memoria de los templates JSON de las impresoras de ticket y matriciales.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateCache:
+    """
+    Caché de templates por ruta. Un template se vuelve a leer solo si cambia la fecha de
+    modificación del archivo; la impresora y su contador fiscal comparten el mismo diccionario.
+    """
+
+    _templates: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, path: str) -> Dict[str, Any]:
+        """
+        Obtiene un template, leyéndolo del disco solo si cambió.
+        Args:
+            path: Ruta del archivo JSON.
+        Returns:
+            Dict[str, Any]: Template.
+        Raises:
+            FileNotFoundError: Si el archivo no existe.
+            json.JSONDecodeError: Si el archivo no es un JSON válido.
+        """
+        mtime = os.stat(path).st_mtime
+        with cls._lock:
+            cached = cls._templates.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        with open(path, "r", encoding="utf-8") as f:
+            template = json.load(f)
+        with cls._lock:
+            cls._templates[path] = (mtime, template)
+        logger.info("Template cargado: %s", os.path.basename(path))
+        return template
+
+    @classmethod
+    def invalidate(cls, path: Optional[str] = None) -> None:
+        """
+        Descarta templates de la caché.
+        Args:
+            path: Ruta del template; None descarta todos.
+        """
+        with cls._lock:
+            if path is None:
+                cls._templates.clear()
+            else:
+                cls._templates.pop(path, None)
@@ -7,22 +7,25 @@ Licensed under the GNU Affero General Public License, version 3 or later.
 Clase para una impresora de tickets.
 """
 
-import json
 import logging
 import os
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from PIL import Image
 
 import win32print
+from models.model_invoice import Invoice, InvoiceData
 from utils.tools import get_base_path, normalize_text, format_multiline
 
 from .printer_base import BasePrinter
 from .printer_commands import ESCPOScmd
 from .printer_counter import FiscalCounter
+from .printer_templates import TemplateCache
 
 logger = logging.getLogger(__name__)
 
+LOGO_FILE = "resources/logo.bmp"
+
 
 class TicketPrinter(BasePrinter):
     """Clase para manejar la impresión de tickets"""
@@ -41,6 +44,7 @@ class TicketPrinter(BasePrinter):
         self.output_file = config.get("ticket_file", default_output)
         self.printer_handle = None
         self.connected = False
+        self._logo: Optional[Tuple[float, bytes]] = None  # (fecha de modificación, bytes del logo procesado)
 
         use_escpos = config.get("ticket_use_escpos", True)  # Inicializar comandos ESC/POS
         self.escpos_commands = ESCPOScmd(use_escpos)
@@ -52,6 +56,8 @@ class TicketPrinter(BasePrinter):
     def connect(self) -> bool:
         """Conecta con la impresora"""
         try:
+            if self.printer_handle:  # Instancia reutilizada: no dejar abierta una conexión anterior
+                self.disconnect()
             self.printer_handle = win32print.OpenPrinter(self.printer_name)
 
             printer_info = win32print.GetPrinter(self.printer_handle, 2)
@@ -81,11 +87,11 @@ class TicketPrinter(BasePrinter):
         except Exception as e:
             logger.error("Error desconectando impresora: %s", str(e))
 
-    def print_document(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def print_document(self, data: InvoiceData) -> Dict[str, Any]:
         """
         Imprime un documento
         Args:
-            document: Datos del documento a imprimir
+            data: Documento a imprimir (Invoice o diccionario)
         Returns:
             dict: Resultado de la impresión
         """
@@ -104,12 +110,14 @@ class TicketPrinter(BasePrinter):
                     "data": None,
                 }
 
-            fiscal_data = self.counter.update_counter(data.get("operation_type", "invoice"))
+            invoice = Invoice.parse(data)
+            self._load_template()  # La instancia es de larga duración: el template pudo cambiar
+            fiscal_data = self.counter.update_counter(invoice.operation_type or "invoice")
 
             if self.config.get("logo_enabled", False) and self.escpos_commands.use_escpos:
                 self._print_logo_direct()
 
-            document_content = self._generate_document_content(data)
+            document_content = self._generate_document_content(invoice, fiscal_data)
 
             if self.direct_print:
                 try:
@@ -175,10 +183,20 @@ class TicketPrinter(BasePrinter):
             logger.error("Error verificando estado de impresora: %s", str(e))
             return {"online": False, "paper": False, "error": str(e)}
 
+    def _logo_bytes(self) -> bytes:
+        """Bytes del logo, procesados de nuevo solo si cambia el archivo"""
+        try:
+            mtime = os.stat(LOGO_FILE).st_mtime
+        except OSError:
+            return self._process_logo()
+        if self._logo is None or self._logo[0] != mtime:
+            self._logo = (mtime, self._process_logo())
+        return self._logo[1]
+
     def _process_logo(self) -> bytes:
         """Procesa el logo y retorna los bytes listos para imprimir"""
         try:
-            logo = Image.open("resources/logo.bmp")
+            logo = Image.open(LOGO_FILE)
             if not logo:
                 logger.error("Imagen de logo no encontrada")
                 return b""  # Si la imagen no existe, retornar bytes vacíos
@@ -247,7 +265,7 @@ class TicketPrinter(BasePrinter):
     def _print_logo_direct(self) -> None:
         """Imprime el logo directamente"""
         try:
-            logo_bytes = self._process_logo()
+            logo_bytes = self._logo_bytes()
             doc_info = ("Logo", None, "RAW")
             win32print.StartDocPrinter(self.printer_handle, 1, doc_info)
             win32print.StartPagePrinter(self.printer_handle)
@@ -287,11 +305,12 @@ class TicketPrinter(BasePrinter):
 
         return header
 
-    def _format_sub_header(self, data: Dict[str, Any]) -> List[str]:
+    def _format_sub_header(self, invoice: Invoice, fiscal_data: Dict[str, str]) -> List[str]:
         """
         Formatea el sub-encabezado del ticket (tipo documento, número, fecha)
         Args:
-            data: Datos del documento
+            invoice: Documento a imprimir
+            fiscal_data: Datos del contador asignados al documento
         Returns:
             List[str]: Líneas del sub-encabezado
         """
@@ -306,7 +325,7 @@ class TicketPrinter(BasePrinter):
 
         header_type = self.template["header"]["type"]  # Formatear tipo de documento
         document_type = (
-            document_mapping.get(data["operation_type"], "NOTA DE DESPACHO") if header_type == "*" else header_type
+            document_mapping.get(invoice.operation_type, "NOTA DE DESPACHO") if header_type == "*" else header_type
         )
 
         sub_header.extend(
@@ -319,20 +338,10 @@ class TicketPrinter(BasePrinter):
         )  # Tipo de documento centrado
 
         if self.template["format"]["show_document_number"]:
-            doc_number = data["document"]["document_number"].replace("-", "")
+            doc_number = invoice.document_number.replace("-", "")
             doc_number = doc_number[-8:] if len(doc_number) > 8 else doc_number
-        else:  # Tipos de documento a contadores
-            counter_mapping = {
-                "invoice": "document_invoice",
-                "credit": "document_credit",
-                "debit": "document_debit",
-                "note": "document_note",
-            }
-
-            counter_key = counter_mapping.get(data.get("operation_type", "invoice"), "document_invoice")
-            document_number = int(self.template["counter"][counter_key])
-            document_number += 1
-            doc_number = str(document_number).zfill(8)
+        else:  # Número asignado por el contador
+            doc_number = fiscal_data["document_number"]
 
         sub_header.extend(
             [
@@ -341,7 +350,7 @@ class TicketPrinter(BasePrinter):
             ]
         )  # Alinear documento y fecha/hora
 
-        date_parts = data["document"]["document_date"].split("-")  # Formatear fecha DD-MM-AAAA
+        date_parts = invoice.document_date.split("-")  # Formatear fecha DD-MM-AAAA
         formatted_date = f"FECHA: {date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
         current_time = f"HORA: {datetime.now().strftime('%H:%M')}"
 
@@ -359,40 +368,38 @@ class TicketPrinter(BasePrinter):
             )
         return sub_header
 
-    def _format_customer_info(self, data: Dict[str, Any]) -> List[str]:
+    def _format_customer_info(self, invoice: Invoice) -> List[str]:
         """
         Formatea la información del cliente
         Args:
-            data: Datos del documento
+            invoice: Documento a imprimir
         Returns:
             List[str]: Líneas de información del cliente
         """
         customer = []
         width = self.template["format"]["width"]
         customer.append(self.escpos_commands.CMD_ALIGN_LEFT)
-        customer_vat = data["customer"]["customer_vat"]
-        customer_name = data["customer"]["customer_name"]
-        customer.extend([f"RIF/CI: {customer_vat}\n", f"Cliente: {customer_name}\n"])
+        customer.extend([f"RIF/CI: {invoice.customer_vat}\n", f"Cliente: {invoice.customer_name}\n"])
 
-        if data["customer"].get("customer_address") and self.template["format"]["show_customer_address"]:
-            address_format = normalize_text(f"DIR: {data['customer']['customer_address']}")
+        if invoice.customer_address and self.template["format"]["show_customer_address"]:
+            address_format = normalize_text(f"DIR: {invoice.customer_address}")
             address_lines = format_multiline(address_format, width)
             for line in address_lines:
                 customer.append(f"{line}\n")
 
-        if data["customer"].get("customer_phone") and self.template["format"]["show_customer_phone"]:
-            customer.append(f"TEL: {data['customer']['customer_phone']}\n")
+        if invoice.customer_phone and self.template["format"]["show_customer_phone"]:
+            customer.append(f"TEL: {invoice.customer_phone}\n")
 
-        if data["document"].get("document_name") and self.template["format"]["show_document_name"]:
-            customer.append(f"DOC: {data['document']['document_name']}\n")
+        if invoice.document_name and self.template["format"]["show_document_name"]:
+            customer.append(f"DOC: {invoice.document_name}\n")
 
         return customer
 
-    def _format_items(self, data: Dict[str, Any]) -> List[str]:
+    def _format_items(self, invoice: Invoice) -> List[str]:
         """
         Formatea los items del ticket
         Args:
-            data: Datos del documento
+            invoice: Documento a imprimir
         Returns:
             List[str]: Líneas de items
         """
@@ -401,23 +408,23 @@ class TicketPrinter(BasePrinter):
         subtotal = 0.0
 
         # Para desarrollo en otra moneda
-        # symbol = data['operation_metadata'].get("currency_symbol", "")
+        # symbol = invoice.metadata.get("currency_symbol", "")
         symbol = "Bs"
 
-        for item in data["items"]:  # Procesar cada item
-            quantity = item.get("item_quantity", 1)
-            price = item.get("item_price", 0.0)
+        for item in invoice.items:  # Procesar cada item
+            quantity = item.quantity
+            price = item.price
             total = quantity * price  # Calcular valores
-            tax_rate = item.get("item_tax", 0)
+            tax_rate = item.tax
 
             subtotal += total  # Acumular subtotal
 
             if quantity > 1:  # Si es más de 1 item, mostrar cantidad y precio unitario
                 items.append(f"{quantity}x{symbol} {price:.2f}\n")
 
-            item_name = normalize_text(item.get("item_name", ""))
-            if self.template["format"].get("combine_item_ref", False) and item.get("item_ref"):
-                item_name = f"{item['item_ref']} {item_name}"
+            item_name = normalize_text(item.name)
+            if self.template["format"].get("combine_item_ref", False) and item.ref:
+                item_name = f"{item.ref} {item_name}"
 
             tax_indicator = self._get_tax_indicator(tax_rate)  # Agregar indicador de impuesto
             if tax_indicator:
@@ -446,41 +453,31 @@ class TicketPrinter(BasePrinter):
         tax_indicators = {0: "(E)", 8: "(R)", 16: "(G)", 31: "(A)"}
         return tax_indicators.get(tax_rate, "")
 
-    def _format_totals(self, data: Dict[str, Any]) -> List[str]:
+    def _format_totals(self, invoice: Invoice) -> List[str]:
         """
         Formatea los totales del ticket
         Args:
-            data: Datos del documento
+            invoice: Documento a imprimir
         Returns:
             List[str]: Líneas de totales
         """
         totals = []
         width = self.template["format"]["width"]
 
-        # symbol = data['operation_metadata'].get("currency_symbol", "")
+        # symbol = invoice.metadata.get("currency_symbol", "")
         symbol = "Bs"
 
-        # Inicializar diccionarios para agrupar bases e impuestos
-        tax_bases = {0: 0, 16: 0, 8: 0, 31: 0}
-        tax_amounts = {0: 0, 16: 0, 8: 0, 31: 0}
-
-        for item in data["items"]:  # Calcular bases e impuestos por tasa
-            price = item.get("item_price", 0.0)
-            quantity = item.get("item_quantity", 1)
-            tax_rate = item.get("item_tax", 0)
+        document_totals = invoice.totals  # Bases e impuestos por tasa, calculados una vez por documento
+        tax_bases = document_totals.bases
+        tax_amounts = document_totals.taxes
 
-            amount = price * quantity
-            tax_bases[tax_rate] += amount
-            if tax_rate > 0:
-                tax_amounts[tax_rate] += amount * (tax_rate / 100)
-
-        if tax_bases[0] > 0:  # Mostrar exentos si hay
+        if tax_bases.get(0, 0) > 0:  # Mostrar exentos si hay
             totals.append(self._format_line_justified("EXENTO", f"{symbol} {tax_bases[0]:.2f}", width) + "\n")
 
         tax_labels = {16: ("G", "16,00"), 8: ("R", "8,00"), 31: ("A", "31,00")}
 
         for rate, (letter, rate_str) in tax_labels.items():
-            if tax_bases[rate] > 0:
+            if tax_bases.get(rate, 0) > 0:
                 totals.append(
                     self._format_line_justified(f"BI {letter} ({rate_str}%)", f"{symbol} {tax_bases[rate]:.2f}", width)
                     + "\n"
@@ -496,15 +493,15 @@ class TicketPrinter(BasePrinter):
                 )  # IVA
 
         totals.append(f"{self.template['format']['separator'] * width}\n")
-        total = sum(tax_bases.values()) + sum(tax_amounts.values())
+        total = document_totals.total
         totals.append(self._format_line_justified("TOTAL:", f"{symbol} {total:.2f}", width) + "\n\n")
 
-        if data.get("payments"):  # Formas de pago
-            for payment in data["payments"]:
+        if invoice.payments:  # Formas de pago
+            for payment in invoice.payments:
                 totals.append(
                     self._format_line_justified(
-                        payment["payment_name"],
-                        f"{symbol} {payment['payment_amount']:.2f}",
+                        payment.name,
+                        f"{symbol} {payment.amount:.2f}",
                         width,
                     )
                     + "\n"
@@ -513,33 +510,34 @@ class TicketPrinter(BasePrinter):
 
         return totals
 
-    def _format_footer(self, data: Dict[str, Any]) -> List[str]:
+    def _format_footer(self, invoice: Invoice) -> List[str]:
         """
         Formatea el pie de página del ticket
         Args:
-            data: Datos del documento
+            invoice: Documento a imprimir
         Returns:
             List[str]: Líneas del pie de página
         """
         footer = []
-        if data.get("delivery", {}).get("delivery_comments"):
-            for comment in data["delivery"]["delivery_comments"]:
+        barcode = invoice.delivery_barcode
+        if invoice.delivery_comments:
+            for comment in invoice.delivery_comments:
                 comment_format = normalize_text(comment)
                 footer.append(f"{comment_format}\n")
 
-        if data.get("delivery", {}).get("delivery_barcode") and self.config.get("barcode_enabled", False):
+        if barcode and self.config.get("barcode_enabled", False):
             footer.extend(["\n", self.escpos_commands.CMD_ALIGN_CENTER])
 
             if self.config.get("barcode_type") == "qr":
-                footer.extend(self._get_qr_commands(data["delivery"]["delivery_barcode"]))
+                footer.extend(self._get_qr_commands(barcode))
             else:
                 footer.extend(
                     [
                         self.escpos_commands.CMD_BARCODE_HEIGHT,
                         self.escpos_commands.CMD_BARCODE_WIDTH,
                         self.escpos_commands.CMD_BARCODE_CODE128,
-                        chr(len(data["delivery"]["delivery_barcode"])),  # Length
-                        data["delivery"]["delivery_barcode"],  # Data
+                        chr(len(barcode)),  # Length
+                        barcode,  # Data
                     ]
                 )
 
@@ -588,11 +586,12 @@ class TicketPrinter(BasePrinter):
             "\x1d\x28\x6b\x03\x00\x31\x51\x30",  # Imprimir QR
         ]
 
-    def _generate_document_content(self, data: Dict[str, Any]) -> str:
+    def _generate_document_content(self, invoice: Invoice, fiscal_data: Dict[str, str]) -> str:
         """
         Genera el contenido del documento según el template
         Args:
-            data: Datos del documento
+            invoice: Documento a imprimir
+            fiscal_data: Datos del contador asignados al documento
         Returns:
             str: Contenido formateado con comandos ESC/POS
         """
@@ -606,11 +605,11 @@ class TicketPrinter(BasePrinter):
         )
 
         content.extend(self._format_header())  # Encabezado
-        content.extend(self._format_customer_info(data))  # Datos del cliente
-        content.extend(self._format_sub_header(data))  # Sub-encabezado
-        content.extend(self._format_items(data))  # Items
-        content.extend(self._format_totals(data))  # Totales
-        content.extend(self._format_footer(data))  # Pie de página
+        content.extend(self._format_customer_info(invoice))  # Datos del cliente
+        content.extend(self._format_sub_header(invoice, fiscal_data))  # Sub-encabezado
+        content.extend(self._format_items(invoice))  # Items
+        content.extend(self._format_totals(invoice))  # Totales
+        content.extend(self._format_footer(invoice))  # Pie de página
 
         content.extend(
             [
@@ -622,12 +621,9 @@ class TicketPrinter(BasePrinter):
         return "".join(content)
 
     def _load_template(self) -> None:
-        """Carga la plantilla de impresión"""
+        """Carga la plantilla de impresión (desde la caché si el archivo no cambió)"""
         try:
-            template_path = os.path.join(get_base_path(), "templates", self.template_name)
-            with open(template_path, "r", encoding="utf-8") as f:
-                self.template = json.load(f)
-            logger.info("Template cargado: %s", self.template_name)
+            self.template = TemplateCache.get(os.path.join(get_base_path(), "templates", self.template_name))
         except Exception as e:
             logger.error("Error cargando template: %s", str(e))
             raise
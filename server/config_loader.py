@@ -11,17 +11,20 @@ import json
 import logging
 import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Callable, Dict, List
 
 from jsonschema import validate
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
 from utils.tools import get_base_path
+from printers.printer_templates import TemplateCache
+from server.handlers.printer_routes import PrinterRoutes
 
 # Constantes
 VALID_SERVER_MODES = {"SPOOLER", "PROXY"}
 VALID_FISCAL_PRINTERS = {"TFHKA", "PNP", "RIGAZSA", "BEMATECH"}
+VALID_FISCAL_DRIVERS = {"dll", "serial"}
 VALID_MATRIX_PAPER_TYPES = {"CARTA", "MEDIA_CARTA"}
 VALID_BARCODE_TYPES = {"QR", "BARCODE", "CODE128"}
 
@@ -36,6 +39,21 @@ CONFIG_SCHEMA = {
                 "server_port": {"type": "integer", "minimum": 1, "maximum": 65535},
                 "server_debug": {"type": "boolean"},
                 "auto_browser": {"type": "boolean"},
+                "server_async": {"type": "boolean"},
+                "server_queue_size": {"type": "integer", "minimum": 1},
+                "server_wait_timeout": {"type": "integer", "minimum": 1},
+                "server_spool_enabled": {"type": "boolean"},
+                "server_spool_file": {"type": "string"},
+                "server_job_retention": {"type": "integer", "minimum": 0},
+                "server_job_max_attempts": {"type": "integer", "minimum": 1},
+                "server_retry_interrupted": {"type": "boolean"},
+                "server_idempotency_ttl": {"type": "integer", "minimum": 0},
+                "server_idempotency_size": {"type": "integer", "minimum": 1},
+                "server_engine": {"type": "string", "enum": ["flask", "waitress"]},
+                "server_threads": {"type": "integer", "minimum": 1},
+                "server_connection_limit": {"type": "integer", "minimum": 1},
+                "server_backlog": {"type": "integer", "minimum": 1},
+                "server_event_clients": {"type": "integer", "minimum": 0},
             },
             "required": ["server_mode", "server_host", "server_port", "server_debug"],
         },
@@ -44,6 +62,40 @@ CONFIG_SCHEMA = {
             "properties": {
                 "proxy_enabled": {"type": "boolean"},
                 "proxy_target": {"type": "string", "format": "uri"},
+                "proxy_pool_size": {"type": "integer", "minimum": 1},
+                "proxy_keep_alive": {"type": "boolean"},
+                "proxy_connect_timeout": {"type": "number", "exclusiveMinimum": 0},
+                "proxy_read_timeout": {"type": "number", "exclusiveMinimum": 0},
+                "proxy_targets": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "url": {"type": "string", "format": "uri"},
+                            "weight": {"type": "integer", "minimum": 1},
+                        },
+                        "required": ["url"],
+                    },
+                },
+                "proxy_balance": {"type": "string", "enum": ["round_robin", "least_outstanding"]},
+                "proxy_health_interval": {"type": "number", "exclusiveMinimum": 0},
+                "proxy_cooldown": {"type": "number", "minimum": 0},
+                "proxy_breaker_failures": {"type": "integer", "minimum": 1},
+                "proxy_breaker_reset": {"type": "number", "minimum": 0},
+                "proxy_breaker_trials": {"type": "integer", "minimum": 1},
+                "proxy_routes": {
+                    "type": "object",
+                    "properties": {
+                        "terminals": {"type": "object", "additionalProperties": {"type": "string", "format": "uri"}},
+                        "branches": {"type": "object", "additionalProperties": {"type": "string", "format": "uri"}},
+                    },
+                },
+                "proxy_sticky": {"type": "boolean"},
+                "proxy_buffer_enabled": {"type": "boolean"},
+                "proxy_buffer_file": {"type": "string"},
+                "proxy_buffer_max": {"type": "integer", "minimum": 1},
+                "proxy_buffer_concurrency": {"type": "integer", "minimum": 1},
+                "proxy_buffer_max_attempts": {"type": "integer", "minimum": 1},
             },
             "required": ["proxy_enabled", "proxy_target"],
         },
@@ -58,6 +110,7 @@ CONFIG_SCHEMA = {
                         "fiscal_port": {"type": "string"},
                         "fiscal_baudrate": {"type": "integer"},
                         "fiscal_timeout": {"type": "integer"},
+                        "fiscal_driver": {"type": "string", "enum": list(VALID_FISCAL_DRIVERS)},
                     },
                     "required": ["fiscal_enabled", "fiscal_name", "fiscal_port"],
                 },
@@ -108,6 +161,8 @@ CONFIG_SCHEMA = {
                 },
                 "log_format": {"type": "string"},
                 "log_days": {"type": "integer", "minimum": 1},
+                "log_queue_size": {"type": "integer", "minimum": 1},
+                "log_overflow": {"type": "string", "enum": ["drop", "block"]},
             },
             "required": ["log_output", "log_file", "log_level", "log_format", "log_days"],
         },
@@ -141,6 +196,8 @@ class ConfigManager:
 
     _instance = None
     _config = None
+    _version = 0  # Se incrementa con cada carga válida de la configuración
+    _listeners: List[Callable[[Dict[str, Any]], None]] = []  # Se notifican con cada recarga válida
     _config_path = Path(os.path.join(get_base_path(), "config", "config.json"))
     _observer = Observer()
 
@@ -165,13 +222,32 @@ class ConfigManager:
 
             validate(new_config, CONFIG_SCHEMA)
             cls._config = new_config
-            logger.info("Configuración recargada exitosamente")
+            cls._version += 1
+            PrinterRoutes.compile(new_config["printers"], cls._version)  # Enrutamiento listo antes de usarse
+            TemplateCache.invalidate()  # Los templates se vuelven a leer con la nueva configuración
+            for listener in cls._listeners:
+                listener(new_config)
+            logger.info("Configuración recargada exitosamente (versión %s)", cls._version)
 
         except Exception as e:
             logger.error("Error recargando configuración: %s", str(e))
             if cls._config is None:
                 raise RuntimeError("No hay configuración válida cargada") from e
 
+    @classmethod
+    def add_listener(cls, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Registra una función que recibe la nueva configuración en cada recarga válida.
+        Args:
+            callback: Función a notificar (p. ej. app.config.update).
+        """
+        cls._listeners.append(callback)
+
+    @classmethod
+    def get_version(cls) -> int:
+        """Versión de la configuración cargada (0 si aún no se ha cargado)"""
+        return cls._version
+
     @classmethod
     def start_watcher(cls) -> None:
         """Inicia el observador de cambios en el archivo"""
@@ -7,9 +7,20 @@ Licensed under the GNU Affero General Public License, version 3 or later.
 Define el esquema JSON para la validación de documentos.
 """
 
-from typing import Dict, Any
+import functools
+import logging
+from typing import Callable, Dict, Any, Optional
 
-from jsonschema import validate, ValidationError
+from jsonschema import FormatChecker, ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+try:
+    import fastjsonschema
+except ImportError:  # Dependencia opcional: sin ella se usa solo jsonschema
+    fastjsonschema = None
+
+logger = logging.getLogger(__name__)
 
 # Constantes para valores permitidos
 VALID_OPERATION_TYPES = {"invoice", "credit", "debit", "note"}
@@ -102,6 +113,36 @@ DOCUMENT_SCHEMA = {
 }
 
 
+# Formatos declarados en el esquema que se verifican
+FORMAT_CHECKER = FormatChecker(("date", "email"))
+
+# Validador compilado una sola vez y compartido por todas las solicitudes
+_VALIDATOR_CLASS = validator_for(DOCUMENT_SCHEMA)
+_VALIDATOR_CLASS.check_schema(DOCUMENT_SCHEMA)
+DOCUMENT_VALIDATOR = _VALIDATOR_CLASS(DOCUMENT_SCHEMA, format_checker=FORMAT_CHECKER)
+
+
+def compile_fast_validator() -> Optional[Callable[[Any], Any]]:
+    """
+    Genera con fastjsonschema una función de validación para DOCUMENT_SCHEMA.
+    Los formatos se verifican con las mismas funciones que FORMAT_CHECKER, así ambos
+    validadores aceptan exactamente los mismos documentos.
+    Returns:
+        Optional[Callable[[Any], Any]]: Función de validación o None si fastjsonschema no está disponible.
+    """
+    if fastjsonschema is None:
+        return None
+    formats = {name: functools.partial(FORMAT_CHECKER.conforms, format=name) for name in FORMAT_CHECKER.checkers}
+    try:
+        return fastjsonschema.compile(DOCUMENT_SCHEMA, formats=formats)
+    except Exception as e:
+        logger.warning("No se pudo generar el validador rápido de documentos: %s", str(e))
+        return None
+
+
+FAST_VALIDATOR = compile_fast_validator()
+
+
 def validate_document(document: Dict[str, Any]) -> None:
     """
     Valida un documento contra el esquema definido.
@@ -111,8 +152,16 @@ def validate_document(document: Dict[str, Any]) -> None:
         ValidationError: Si el documento no cumple con el esquema
     Returns: None
     """
-    try:
-        validate(document, DOCUMENT_SCHEMA)
-    except ValidationError as e:
-        path = " -> ".join(str(p) for p in e.path)
-        raise ValidationError(f"En {path}: {e.message}. {e.schema.get('errorMessage', 'Error de validación.')}") from e
+    if FAST_VALIDATOR is not None:
+        try:
+            FAST_VALIDATOR(document)
+            return
+        except fastjsonschema.JsonSchemaException:
+            pass  # El mensaje de error se obtiene de jsonschema para que sea el mismo en ambos casos
+
+    error = best_match(DOCUMENT_VALIDATOR.iter_errors(document))
+    if error is not None:
+        path = " -> ".join(str(p) for p in error.path)
+        raise ValidationError(
+            f"En {path}: {error.message}. {error.schema.get('errorMessage', 'Error de validación.')}"
+        ) from error
@@ -8,49 +8,38 @@ Document Handler Module, responsable de la gestión de las operaciones relaciona
 """
 
 import logging
-from typing import Dict, Any, Optional, Tuple
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Tuple
 
-from flask import jsonify, request, current_app, Response
+from flask import jsonify, request, current_app, Response, url_for
 from jsonschema import ValidationError
 
-from models.model_invoice import Invoice
+from models.model_columns import BULK_MIN_ITEMS, validate_invoices
+from models.model_invoice import Invoice, InvoiceData
+from utils.metrics import ACQUIRE_SECONDS, VALIDATION_SECONDS
+from .job_manager import JobManager, PrintJob, JOB_QUEUED, JOB_PROCESSING
 from .printer_manager import PrinterManager
-from ..document_schema import validate_document
+from .printer_routes import PrinterRoutes, PRINTER_TYPE_FISCAL
+from .printer_worker import QueueFullError
+from ..document_schema import validate_document, VALID_OPERATION_TYPES
 
+HTTP_OK = 200
+HTTP_ACCEPTED = 202
 HTTP_BAD_REQUEST = 400
+HTTP_NOT_FOUND = 404
 HTTP_INTERNAL_ERROR = 500
-PRINTER_TYPE_FISCAL = "fiscal"
-PRINTER_TYPE_MATRIX = "matrix"
-PRINTER_TYPE_TICKET = "ticket"
-
-PRINTER_FISCAL_TYPES = {
-    "tfhka": "printers.printer_hka.TfhkaPrinter",
-    "pnp": "printers.printer_pnp.PnpPrinter",
-}
+HTTP_SERVICE_UNAVAILABLE = 503
+HTTP_GATEWAY_TIMEOUT = 504
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_BATCH_SIZE = 500  # Documentos permitidos por solicitud de lote
+DEFAULT_WAIT_TIMEOUT = 60  # Segundos que una solicitud síncrona espera la impresión antes de responder 202
+REPORT_WAIT_TIMEOUT = 90  # Espera mínima de un reporte: responde al terminar de imprimir (plazo del driver: 60)
 
 logger = logging.getLogger(__name__)
 
 
-def find_value(dictionary: Dict[str, Any], key: str) -> Optional[Any]:
-    """
-    Busca recursivamente un valor en un diccionario anidado.
-    Args:
-        dictionary: Diccionario en el que buscar.
-        key: Clave a buscar.
-    Returns:
-        Optional[Any]: Valor encontrado o None si no existe.
-    """
-    if key in dictionary:
-        return dictionary[key]
-
-    for value in dictionary.values():
-        if isinstance(value, dict):
-            result = find_value(value, key)
-            if result is not None:
-                return result
-    return None
-
-
 def error_response(message: str, status_code: int = HTTP_BAD_REQUEST, data: Any = None) -> Tuple[Response, int]:
     """
     Crea una respuesta de error estandarizada.
@@ -80,45 +69,239 @@ def printer_instance(
             - Instancia de la impresora o None si no hay impresora disponible
             - Diccionario con información del error si ocurrió uno, None si no hay error
     """
+    return PrinterRoutes.for_config(printer_config).instance()
+
+
+def resolve_device(printer_config: Dict[str, Any]) -> Optional[str]:
+    """
+    Determina el dispositivo que atenderá los documentos, con la misma prioridad
+    que printer_instance: fiscal, matricial y ticket.
+    Args:
+        printer_config: Configuración de impresoras.
+    Returns:
+        Optional[str]: Tipo de dispositivo o None si no hay impresoras habilitadas.
+    """
+    return PrinterRoutes.for_config(printer_config).device
+
+
+def validate_schema(data: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """
+    Valida el formato de un documento contra el esquema.
+    Args:
+        data: Documento recibido en la solicitud.
+    Returns:
+        Tuple[str, Optional[str]]:
+            - Tipo de operación usado como etiqueta en las métricas
+            - Mensaje de error, None si no hay error
+    """
+    if not data:
+        return "unknown", "No se recibieron datos en la solicitud"
+
+    operation_type = data.get("operation_type") if isinstance(data, dict) else None
+    if operation_type not in VALID_OPERATION_TYPES:
+        operation_type = "unknown"  # Evitar etiquetas arbitrarias en las métricas
+
     try:
-        printer_fiscal_enabled = find_value(printer_config, "fiscal_enabled")
-        printer_matrix_enabled = find_value(printer_config, "matrix_enabled")
-        printer_ticket_enabled = find_value(printer_config, "ticket_enabled")
+        with VALIDATION_SECONDS.time(stage="schema", operation_type=operation_type):
+            validate_document(data)
+    except ValidationError as e:
+        return operation_type, f"Error de validación en el formato del documento: {str(e)}"
+    return operation_type, None
 
-        if printer_fiscal_enabled:
-            printer_fiscal_name = find_value(printer_config, "fiscal_name").strip().lower()
-            try:
-                printer = PrinterManager.get_printer(
-                    printer_fiscal_name, find_value(printer_config, PRINTER_TYPE_FISCAL)
-                )
-                return printer, None
-            except ValueError as e:
-                error_msg = str(e)
-                if "Estado:" in error_msg and "Error:" in error_msg:
-                    state = error_msg.split("Estado:")[1].split(",")[0].strip()
-                    error = error_msg.split("Error:")[1].strip()
-                    return None, {
-                        "printer_type": printer_fiscal_name,
-                        "state": state,
-                        "error": error,
-                        "message": error_msg,
-                    }
-                return None, {"printer_type": printer_fiscal_name, "message": error_msg}
 
-        if printer_matrix_enabled:
-            from printers.printer_dotmatrix import MatrixPrinter
+def validate_request(data: Dict[str, Any]) -> Tuple[Optional[Invoice], Optional[str]]:
+    """
+    Valida el formato y las reglas de negocio de un documento.
+    Args:
+        data: Documento recibido en la solicitud.
+    Returns:
+        Tuple[Optional[Invoice], Optional[str]]:
+            - Factura validada o None si el documento no es válido
+            - Mensaje de error, None si no hay error
+    """
+    operation_type, schema_error = validate_schema(data)
+    if schema_error:
+        return None, schema_error
 
-            return MatrixPrinter(find_value(printer_config, PRINTER_TYPE_MATRIX)), None
+    try:  # Validar reglas de negocio del documento
+        with VALIDATION_SECONDS.time(stage="business", operation_type=operation_type):
+            invoice = Invoice(data)
+            if len(data["items"]) >= BULK_MIN_ITEMS:  # Documento grande: reglas evaluadas por columnas
+                validation_error = validate_invoices([invoice])[0]
+            else:
+                validation_error = invoice.validate()
+        if validation_error:
+            return None, f"Error de validación de negocio: {validation_error}"
+    except Exception as e:
+        return None, f"Error al validar reglas de negocio del documento: {str(e)}"
 
-        if printer_ticket_enabled:
-            from printers.printer_ticket import TicketPrinter
+    logger.info(
+        "Documento validado: %s - Tipo: %s",
+        invoice.document_number,
+        invoice.operation_type,
+    )
+    return invoice, None
 
-            return TicketPrinter(find_value(printer_config, PRINTER_TYPE_TICKET)), None
 
-        return None, {"message": "No hay impresoras configuradas"}
+def validate_batch(documents: list) -> List[Tuple[Optional[Invoice], Optional[str]]]:
+    """
+    Valida un lote de documentos. El formato se valida documento a documento y las
+    reglas de negocio de todos los documentos con formato válido en una sola pasada
+    por columnas. El resultado de cada documento es el mismo de validate_request.
+    Args:
+        documents: Documentos del lote.
+    Returns:
+        List[Tuple[Optional[Invoice], Optional[str]]]: Factura validada y mensaje de error de cada documento.
+    """
+    results: List[Tuple[Optional[Invoice], Optional[str]]] = []
+    invoices: List[Invoice] = []
+    for data in documents:
+        _, schema_error = validate_schema(data)
+        if schema_error:
+            results.append((None, schema_error))
+            continue
+        try:
+            invoice = Invoice(data)
+        except Exception as e:
+            results.append((None, f"Error al validar reglas de negocio del documento: {str(e)}"))
+            continue
+        invoices.append(invoice)
+        results.append((invoice, None))
 
+    try:
+        with VALIDATION_SECONDS.time(stage="business", operation_type="batch"):
+            errors = iter(validate_invoices(invoices))
     except Exception as e:
-        return None, {"message": str(e)}
+        logger.warning("No se pudo validar el lote por columnas, se valida cada documento: %s", str(e))
+        return [validate_request(data) for data in documents]
+
+    for index, (invoice, _) in enumerate(results):
+        if invoice is None:
+            continue
+        validation_error = next(errors)
+        if validation_error:
+            results[index] = (None, f"Error de validación de negocio: {validation_error}")
+        else:
+            logger.info("Documento validado: %s - Tipo: %s", invoice.document_number, invoice.operation_type)
+    return results
+
+
+def process_document(data: InvoiceData, printers_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Imprime un documento ya validado en la impresora configurada.
+    Se ejecuta en el hilo dueño del dispositivo, fuera del contexto de Flask.
+    Args:
+        data: Documento validado (modelo construido en la validación o diccionario del diario).
+        printers_config: Configuración de impresoras.
+    Returns:
+        Dict[str, Any]: Resultado de la impresión con las claves status, message y data.
+    """
+    with ACQUIRE_SECONDS.time(printer=resolve_device(printers_config) or "none"):
+        printer, error_data = printer_instance(printers_config)
+    if not printer:
+        if error_data:
+            if "state" in error_data and "error" in error_data:
+                message = f"Impresora no disponible - Estado: {error_data['state']}, Error: {error_data['error']}"
+            else:
+                message = error_data.get("message", "Error desconocido al obtener la impresora")
+            return {"status": False, "message": message, "data": error_data}
+        return {"status": False, "message": "No hay impresoras habilitadas para procesar el documento", "data": None}
+
+    result = printer.print_document(Invoice.parse(data))  # Procesar el documento
+    logger.debug("Documento result= %s", result)
+    return result
+
+
+def is_async_request() -> bool:
+    """
+    Determina si la solicitud debe procesarse en modo asíncrono.
+    El cliente puede solicitarlo con el parámetro ?async=true o el header
+    'Prefer: respond-async'; en otro caso se usa server_async de la configuración.
+    Returns:
+        bool: True si la solicitud debe encolarse.
+    """
+    if "async" in request.args:
+        return request.args.get("async", "").strip().lower() in ("1", "true", "yes")
+    if "respond-async" in request.headers.get("Prefer", "").lower():
+        return True
+    return bool(current_app.config.get("server", {}).get("server_async", False))
+
+
+def idempotency_key(data: Dict[str, Any], index: Optional[int] = None) -> Optional[str]:
+    """
+    Obtiene la clave de idempotencia de la solicitud.
+    Se usa el header 'Idempotency-Key' si está presente; en otro caso se construye
+    con el tipo de operación, el número de documento y la terminal de origen.
+    Args:
+        data: Documento recibido.
+        index: Posición del documento dentro de un lote.
+    Returns:
+        Optional[str]: Clave de idempotencia o None si no se puede determinar.
+    """
+    header = request.headers.get(IDEMPOTENCY_HEADER, "").strip()
+    if header:
+        return f"key:{header}" if index is None else f"key:{header}#{index}"
+
+    document_number = data.get("document", {}).get("document_number")
+    if not document_number:
+        return None
+    terminal_id = data.get("operation_metadata", {}).get("terminal_id", "")
+    return f"doc:{data.get('operation_type')}|{document_number}|{terminal_id}"
+
+
+def submit_document(
+    invoice: Invoice, printers_config: Dict[str, Any], device: str, key: Optional[str]
+) -> Tuple[PrintJob, bool]:
+    """
+    Encola un documento validado en el hilo de su dispositivo.
+    El diario registra el documento original y la impresora recibe el modelo ya construido.
+    Args:
+        invoice: Documento validado.
+        printers_config: Configuración de impresoras.
+        device: Dispositivo que imprimirá el documento.
+        key: Clave de idempotencia o None.
+    Returns:
+        Tuple[PrintJob, bool]: Trabajo y True si es un trabajo existente (solicitud repetida).
+    Raises:
+        QueueFullError: Si la cola del dispositivo está llena.
+    """
+    if key:  # Un reintento del cliente se une al trabajo original en lugar de reimprimir
+        return JobManager.submit_once(invoice.data, printers_config, device, key, document=invoice)
+    return JobManager.submit(invoice.data, printers_config, device, document=invoice), False
+
+
+def wait_timeout() -> float:
+    """
+    Tiempo máximo que una solicitud síncrona espera la impresión.
+    Returns:
+        float: Segundos de espera ('server_wait_timeout').
+    """
+    return current_app.config.get("server", {}).get("server_wait_timeout", DEFAULT_WAIT_TIMEOUT)
+
+
+def job_response(job: PrintJob, status_code: int = HTTP_OK) -> Tuple[Response, int]:
+    """
+    Crea la respuesta estandarizada con el estado de un trabajo.
+    Args:
+        job: Trabajo de impresión.
+        status_code: Código HTTP de la respuesta.
+    Returns:
+        Tuple[Response, int]: Respuesta JSON y código de estado.
+    """
+    messages = {
+        JOB_QUEUED: "Documento encolado para impresión",
+        JOB_PROCESSING: "Documento en proceso de impresión",
+    }
+    job_data = job.to_dict()
+    response = jsonify(
+        {
+            "status": not job.failed,
+            "message": job_data["message"] or messages.get(job.state, ""),
+            "data": job_data,
+        }
+    )
+    response.headers["Location"] = url_for("api.get_job", job_id=job.job_id)
+    return response, status_code
 
 
 def handle_documents(proxy_handler: Optional[Any] = None) -> Tuple[Response, int]:
@@ -126,6 +309,8 @@ def handle_documents(proxy_handler: Optional[Any] = None) -> Tuple[Response, int
     Maneja la solicitud de impresión de documentos.
     Esta función procesa la solicitud de impresión, valida los datos recibidos,
     selecciona la impresora apropiada y ejecuta la impresión del documento.
+    En modo asíncrono el documento se encola y se responde 202 con el id del trabajo; en modo
+    síncrono también se responde 202 si la impresión no termina dentro de 'server_wait_timeout'.
     Args:
         proxy_handler: Manejador de proxy opcional para reenviar la solicitud.
     Returns:
@@ -139,63 +324,200 @@ def handle_documents(proxy_handler: Optional[Any] = None) -> Tuple[Response, int
         logger.info("Recibida solicitud de impresión")
         logger.debug("Datos recibidos en handle_print_document: %s", data)
 
-        if not data:
-            return error_response("No se recibieron datos en la solicitud")
+        invoice, validation_error = validate_request(data)
+        if validation_error:
+            return error_response(validation_error)
 
-        try:
-            validate_document(data)
-        except ValidationError as e:
-            return error_response(f"Error de validación en el formato del documento: {str(e)}")
+        printers_config = current_app.config.get("printers", {})  # Obtener configuración de impresoras
+        device = resolve_device(printers_config)
+        if not device:
+            return error_response("No hay impresoras configuradas")
 
-        try:  # Validar reglas de negocio del documento
-            invoice = Invoice(data)
-            if validation_error := invoice.validate():
-                return error_response(f"Error de validación de negocio: {validation_error}")
+        try:  # El hilo del dispositivo es el único que usa la impresora
+            job, replayed = submit_document(invoice, printers_config, device, idempotency_key(data))
+        except QueueFullError as e:
+            return error_response(str(e), HTTP_SERVICE_UNAVAILABLE)
 
-            logger.info(
-                "Documento validado: %s - Tipo: %s",
-                invoice.document_number,
-                invoice.operation_type,
-            )
-        except Exception as e:
-            return error_response(f"Error al validar reglas de negocio del documento: {str(e)}")
+        result = None
+        if not is_async_request():
+            try:
+                result = job.wait(wait_timeout())
+            except FutureTimeoutError:  # El cliente consulta el trabajo en /api/jobs/<id>
+                logger.warning("Trabajo %s sin finalizar tras la espera, se responde 202", job.job_id)
+
+        if result is None:
+            response, status_code = job_response(job, HTTP_OK if job.finished else HTTP_ACCEPTED)
+        else:
+            if result.get("status", False):
+                logger.info("Documento %s impreso correctamente", invoice.document_number)
+                response, status_code = (
+                    jsonify(
+                        {
+                            "status": True,
+                            "message": result.get("message", "Documento procesado correctamente"),
+                            "data": result.get("data", {}),
+                        }
+                    ),
+                    HTTP_OK,
+                )
+            else:
+                response, status_code = error_response(
+                    result.get("message", "Error desconocido al imprimir"),
+                    data=result.get("data"),
+                )
 
-        printers_config = current_app.config.get("printers", {})  # Obtener configuración de impresoras
-        printer, error_data = printer_instance(printers_config)
-        if not printer:
-            if error_data:
-                if "state" in error_data and "error" in error_data:
-                    message = f"Impresora no disponible - Estado: {error_data['state']}, Error: {error_data['error']}"
-                else:
-                    message = error_data.get("message", "Error desconocido al obtener la impresora")
-                return error_response(message, data=error_data)
-            return error_response("No hay impresoras habilitadas para procesar el documento")
+        if replayed:
+            response.headers[REPLAYED_HEADER] = "true"
+        return response, status_code
 
-        result = printer.print_document(data)  # Procesar el documento
-        logger.debug("Documento result= %s", result)
+    except Exception as e:
+        return error_response(f"Error interno del servidor: {str(e)}", HTTP_INTERNAL_ERROR)
 
-        if result.get("status", False):
-            logger.info("Documento %s impreso correctamente", invoice.document_number)
-            return jsonify(
+
+def batch_documents(payload: Any) -> Tuple[Optional[list], Optional[str]]:
+    """
+    Obtiene la lista de documentos de una solicitud de lote.
+    Args:
+        payload: Cuerpo de la solicitud: una lista o un objeto con la clave 'documents'.
+    Returns:
+        Tuple[Optional[list], Optional[str]]: Documentos y mensaje de error, None si no hay error.
+    """
+    documents = payload.get("documents") if isinstance(payload, dict) else payload
+    if not isinstance(documents, list) or not documents:
+        return None, "Se esperaba una lista de documentos no vacía"
+    if len(documents) > MAX_BATCH_SIZE:
+        return None, f"El lote excede el máximo de {MAX_BATCH_SIZE} documentos"
+    return documents, None
+
+
+def handle_batch(proxy_handler: Optional[Any] = None) -> Tuple[Response, int]:
+    """
+    Maneja la solicitud de impresión de un lote de documentos.
+    Todos los documentos se validan en una sola pasada, los válidos se encolan en
+    orden en el dispositivo configurado y se responde con el resultado de cada uno
+    (o el id de su trabajo en modo asíncrono o si no termina dentro de 'server_wait_timeout').
+    Un documento inválido no impide imprimir los demás.
+    Args:
+        proxy_handler: Manejador de proxy opcional para reenviar la solicitud.
+    Returns:
+        Tuple[Response, int]: Respuesta JSON y código de estado HTTP.
+    """
+    if proxy_handler:
+        return proxy_handler.handle_request("/batch")
+
+    try:
+        documents, batch_error = batch_documents(request.get_json())
+        if batch_error:
+            return error_response(batch_error)
+        logger.info("Recibido lote de %s documentos", len(documents))
+
+        printers_config = current_app.config.get("printers", {})  # Resuelto una vez para todo el lote
+        device = resolve_device(printers_config)
+        if not device:
+            return error_response("No hay impresoras configuradas")
+
+        results: list = []
+        jobs: list = []
+        validations = validate_batch(documents)  # Reglas de negocio de todo el lote en una sola pasada
+        for index, (data, (invoice, validation_error)) in enumerate(zip(documents, validations)):
+            if validation_error:
+                results.append(
+                    {"index": index, "status": False, "message": validation_error, "data": None, "replayed": False}
+                )
+                continue
+
+            try:
+                job, replayed = submit_document(invoice, printers_config, device, idempotency_key(data, index))
+            except QueueFullError as e:
+                results.append({"index": index, "status": False, "message": str(e), "data": None, "replayed": False})
+                continue
+            results.append({"index": index, "status": None, "message": None, "data": None, "replayed": replayed})
+            jobs.append((results[-1], job))
+
+        asynchronous = is_async_request()
+        deadline = time.monotonic() + wait_timeout()  # Un único plazo de espera para todo el lote
+        for item, job in jobs:
+            if not asynchronous:
+                try:
+                    result = job.wait(max(0.0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    logger.warning("Trabajo %s del lote sin finalizar tras la espera", job.job_id)
+                    asynchronous = True  # Los trabajos restantes se informan sin esperar
+                else:
+                    item.update(
+                        status=result.get("status", False),
+                        message=result.get("message"),
+                        data=result.get("data"),
+                    )
+                    continue
+            job_data = job.to_dict()
+            item.update(status=not job.failed, message=job_data["message"], data=job_data)
+
+        succeeded = sum(1 for item in results if item["status"])
+        logger.info("Lote procesado: %s de %s documentos correctos", succeeded, len(results))
+        return (
+            jsonify(
                 {
-                    "status": True,
-                    "message": result.get("message", "Documento procesado correctamente"),
-                    "data": result.get("data", {}),
+                    "status": succeeded == len(results),
+                    "message": f"Lote procesado: {succeeded} de {len(results)} documentos correctos",
+                    "data": results,
                 }
-            )
-
-        return error_response(
-            result.get("message", "Error desconocido al imprimir"),
-            data=result.get("data"),
+            ),
+            HTTP_ACCEPTED if asynchronous else HTTP_OK,
         )
 
     except Exception as e:
         return error_response(f"Error interno del servidor: {str(e)}", HTTP_INTERNAL_ERROR)
 
 
+def handle_job_status(job_id: str) -> Tuple[Response, int]:
+    """
+    Consulta el estado de un trabajo de impresión asíncrono.
+    Args:
+        job_id: Identificador del trabajo.
+    Returns:
+        Tuple[Response, int]: Respuesta JSON con el estado y los datos fiscales del trabajo.
+    """
+    job = JobManager.get_job(job_id)
+    if not job:
+        return error_response(f"Trabajo no encontrado: {job_id}", HTTP_NOT_FOUND)
+    return job_response(job)
+
+
+def print_report(report_type: str, printers_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Imprime un reporte fiscal. Se ejecuta en el hilo dueño de la impresora fiscal.
+    Args:
+        report_type: Tipo de reporte ('X' o 'Z')
+        printers_config: Configuración de impresoras.
+    Returns:
+        Dict[str, Any]: Resultado con las claves status, message y data.
+    """
+    printer, error_data = printer_instance(printers_config)
+
+    if not printer:
+        if error_data:
+            return {"status": False, "message": error_data["message"], "data": error_data}
+        return {"status": False, "message": "No se pudo obtener la impresora fiscal", "data": None}
+
+    if not printer.check_status():  # Verificar que la impresora está lista
+        return {"status": False, "message": "La impresora fiscal no está lista", "data": None}
+
+    method = f"report_{report_type.lower()}"  # Imprimir reporte
+    if not hasattr(printer, method):
+        return {"status": False, "message": f"Esta impresora no soporta reportes {report_type}", "data": None}
+
+    logger.info("Imprimiendo reporte %s", report_type)
+    if getattr(printer, method)():
+        return {"status": True, "message": f"Reporte {report_type} impreso correctamente", "data": None}
+    return {"status": False, "message": f"Error al imprimir reporte {report_type}", "data": None}
+
+
 def handle_reports(report_type: str) -> Tuple[Response, int]:
     """
     Maneja la solicitud de impresión de reportes fiscales.
+    Si el reporte no termina dentro del plazo se responde 504; el hilo de la impresora
+    lo sigue procesando y el resultado debe verificarse en la impresora.
     Args:
         report_type: Tipo de reporte ('X' o 'Z')
     Returns:
@@ -210,36 +532,22 @@ def handle_reports(report_type: str) -> Tuple[Response, int]:
         if not fiscal_config or not fiscal_config.get("fiscal_enabled", False):
             return error_response("Impresora fiscal no está habilitada")
 
-        # Obtener instancia de la impresora usando PrinterManager
-        # printer_name = fiscal_config.get("fiscal_name", "").lower()  # pylint: disable=W0612
-        printer, error_data = printer_instance(printers_config)
+        try:  # El reporte se ejecuta en el hilo de la impresora fiscal
+            future = PrinterManager.submit(PRINTER_TYPE_FISCAL, lambda: print_report(report_type, printers_config))
+        except QueueFullError as e:
+            return error_response(str(e), HTTP_SERVICE_UNAVAILABLE)
 
-        if not printer:
-            if error_data:
-                return error_response(error_data["message"], data=error_data)
-            return error_response("No se pudo obtener la impresora fiscal")
-
-        if not printer.check_status():  # Verificar que la impresora está lista
-            return error_response("La impresora fiscal no está lista")
-
-        method = f"report_{report_type.lower()}"  # Imprimir reporte
-        if not hasattr(printer, method):
-            return error_response(f"Esta impresora no soporta reportes {report_type}")
-
-        logger.info("Imprimiendo reporte %s", report_type)
-        result = getattr(printer, method)()
-
-        if result:
-            return (
-                jsonify(
-                    {
-                        "status": True,
-                        "message": f"Reporte {report_type} impreso correctamente",
-                    }
-                ),
-                200,
+        try:
+            result = future.result(timeout=max(wait_timeout(), REPORT_WAIT_TIMEOUT))
+        except FutureTimeoutError:
+            logger.warning("Reporte %s sin finalizar tras la espera, se responde 504", report_type)
+            return error_response(
+                f"El reporte {report_type} sigue en proceso; verificar el resultado en la impresora",
+                HTTP_GATEWAY_TIMEOUT,
             )
-        return error_response(f"Error al imprimir reporte {report_type}")
+        if result["status"]:
+            return jsonify({"status": True, "message": result["message"]}), 200
+        return error_response(result["message"], data=result["data"])
 
     except Exception as e:
         return error_response(f"Error al imprimir reporte {report_type}: {str(e)}", HTTP_INTERNAL_ERROR)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Flujo de eventos del servidor (Server-Sent Events).
+"""
+
+import logging
+from typing import Iterator, Optional, Tuple
+
+from flask import Response, jsonify, request
+
+from utils.events import EVENTS, TooManySubscribersError, Subscription, format_sse
+from .job_manager import JobManager, PrintJob
+
+HTTP_NOT_FOUND = 404
+HTTP_SERVICE_UNAVAILABLE = 503
+KEEPALIVE_INTERVAL = 15  # Segundos entre comentarios de keep-alive
+RETRY_INTERVAL = 5000  # Milisegundos que espera el navegador antes de reconectar
+
+logger = logging.getLogger(__name__)
+
+
+def stream_events(subscription: Subscription, job: Optional[PrintJob] = None) -> Iterator[str]:
+    """
+    Genera el flujo SSE de una suscripción.
+    Si se sigue un trabajo, primero se envía su estado actual y el flujo termina
+    cuando el trabajo finaliza.
+    Args:
+        subscription: Suscripción a los eventos.
+        job: Trabajo seguido por el cliente (opcional).
+    Yields:
+        str: Mensajes SSE.
+    """
+    try:
+        yield f"retry: {RETRY_INTERVAL}\n\n"
+        if job is not None:
+            yield format_sse({"id": 0, "event": "job", "data": job.to_dict()})
+            if job.finished:
+                return
+
+        while True:
+            event = subscription.get(KEEPALIVE_INTERVAL)
+            if event is None:
+                yield ": keepalive\n\n"  # Mantiene la conexión y detecta clientes desconectados
+                continue
+            yield format_sse(event)
+            if job is not None and event["data"].get("state") in ("completed", "failed"):
+                return
+    finally:
+        subscription.close()
+
+
+def handle_events() -> Tuple[Response, int]:
+    """
+    Maneja la suscripción al flujo de eventos.
+    Con ?job_id=<id> solo se envían los eventos de ese trabajo y el flujo se cierra al
+    finalizar, de modo que un cliente puede esperar su impresión sin consultar.
+    Returns:
+        Tuple[Response, int]: Flujo text/event-stream y código de estado HTTP.
+    """
+    job_id = request.args.get("job_id")
+    event_filter = (lambda event: event["event"] == "job" and event["data"].get("job_id") == job_id) if job_id else None
+    try:  # Suscribir antes de leer el estado del trabajo para no perder su finalización
+        subscription = EVENTS.subscribe(event_filter)
+    except TooManySubscribersError as e:
+        logger.warning("%s", str(e))
+        return jsonify({"status": False, "message": str(e), "data": None}), HTTP_SERVICE_UNAVAILABLE
+
+    job = None
+    if job_id:
+        job = JobManager.get_job(job_id)
+        if job is None:
+            subscription.close()
+            message = f"Trabajo {job_id} no encontrado"
+            return jsonify({"status": False, "message": message, "data": None}), HTTP_NOT_FOUND
+
+    response = Response(stream_events(subscription, job), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response, 200
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Caché de claves de idempotencia para solicitudes de impresión.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_IDEMPOTENCY_TTL = 600  # Segundos que una clave apunta a su trabajo
+DEFAULT_IDEMPOTENCY_SIZE = 10000  # Claves que se conservan como máximo
+
+
+class IdempotencyCache:
+    """
+    Caché acotada con expiración que asocia una clave de idempotencia al trabajo
+    que la atendió. Al superar el tamaño máximo se descartan las claves más antiguas.
+    """
+
+    def __init__(self, ttl: int = DEFAULT_IDEMPOTENCY_TTL, max_size: int = DEFAULT_IDEMPOTENCY_SIZE) -> None:
+        """
+        Inicializa la caché.
+        Args:
+            ttl: Segundos de vigencia de cada clave.
+            max_size: Cantidad máxima de claves.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Obtiene el trabajo asociado a una clave vigente.
+        Args:
+            key: Clave de idempotencia.
+        Returns:
+            Optional[str]: Id del trabajo o None si la clave no existe o expiró.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            job_id, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return job_id
+
+    def put(self, key: str, job_id: str, age: float = 0) -> None:
+        """
+        Asocia una clave a un trabajo.
+        Args:
+            key: Clave de idempotencia.
+            job_id: Id del trabajo.
+            age: Segundos transcurridos desde que se recibió la clave (al recuperar del diario).
+        """
+        expires_at = time.monotonic() + self.ttl - age
+        with self._lock:
+            self._entries[key] = (job_id, expires_at)
+            self._entries.move_to_end(key)
+            self._purge()
+
+    def _purge(self) -> None:
+        """Elimina las claves expiradas al inicio y las que exceden el tamaño máximo"""
+        now = time.monotonic()
+        while self._entries:
+            key, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_size:
+                break
+            del self._entries[key]
@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Cola de trabajos de impresión.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.events import EVENTS
+from utils.metrics import JOBS_TOTAL, PRINT_SECONDS, QUEUE_WAIT_SECONDS
+from .idempotency import IdempotencyCache
+from .job_store import JobStore
+from .printer_manager import PrinterManager
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_PROCESSING = "processing"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted"  # Cortado durante la impresión; requiere verificar la impresora
+
+MAX_FINISHED_JOBS = 1000  # Trabajos finalizados que se conservan en memoria para consulta
+DEFAULT_JOB_RETENTION = 86400  # Segundos que se conservan en el diario los trabajos finalizados
+DEFAULT_MAX_ATTEMPTS = 3  # Intentos de impresión de un trabajo, contando los reinicios
+INTERRUPTED_MESSAGE = (
+    "Trabajo interrumpido durante la impresión. Verificar en la impresora si el documento "
+    "se imprimió antes de reenviarlo"
+)
+
+
+class PrintJob:  # pylint: disable=R0902
+    """Trabajo de impresión encolado con su estado y resultado."""
+
+    def __init__(
+        self, data: Dict[str, Any], printers_config: Dict[str, Any], device: str, document: Optional[Any] = None
+    ) -> None:
+        """
+        Inicializa el trabajo de impresión.
+        Args:
+            data: Documento validado a imprimir.
+            printers_config: Configuración de impresoras vigente al momento de encolar.
+            device: Dispositivo que imprimirá el documento.
+            document: Modelo ya construido del documento (Invoice), para no volver a interpretarlo.
+        """
+        self.job_id: str = uuid.uuid4().hex
+        self.data: Dict[str, Any] = data
+        self.document: Optional[Any] = document
+        self.printers_config: Dict[str, Any] = printers_config
+        self.device: str = device
+        self.future: Optional[Future] = None
+        self.state: str = JOB_QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at: datetime = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.attempts: int = 0
+        self.idempotency_key: Optional[str] = None
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any], printers_config: Dict[str, Any]) -> "PrintJob":
+        """
+        Reconstruye un trabajo desde su registro en el diario.
+        Args:
+            record: Registro del trabajo (JobStore).
+            printers_config: Configuración de impresoras vigente.
+        Returns:
+            PrintJob: Trabajo con el estado registrado.
+        """
+        job = cls(record["data"], printers_config, record["device"])
+        job.job_id = record["job_id"]
+        job.state = record["state"]
+        job.result = record["result"]
+        job.attempts = record["attempts"]
+        job.created_at = record["created_at"]
+        job.started_at = record["started_at"]
+        job.finished_at = record["finished_at"]
+        job.idempotency_key = record.get("idempotency_key")
+        return job
+
+    @property
+    def finished(self) -> bool:
+        """Indica si el trabajo terminó, con éxito o con error"""
+        return self.state in (JOB_COMPLETED, JOB_FAILED, JOB_INTERRUPTED)
+
+    @property
+    def failed(self) -> bool:
+        """Indica si el trabajo terminó con error o fue interrumpido"""
+        return self.state in (JOB_FAILED, JOB_INTERRUPTED)
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Espera a que el trabajo termine.
+        Args:
+            timeout: Tiempo máximo de espera en segundos.
+        Returns:
+            Dict[str, Any]: Resultado de la impresión.
+        """
+        if self.future is None:  # Trabajo finalizado recuperado del diario
+            return self.result or {}
+        return self.future.result(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Representación pública del trabajo.
+        Returns:
+            Dict[str, Any]: Estado del trabajo y datos fiscales si ya fue impreso.
+        """
+        result = self.result or {}
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "device": self.device,
+            "operation_type": self.data.get("operation_type"),
+            "document_number": self.data.get("document", {}).get("document_number"),
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "message": result.get("message"),
+            "data": result.get("data"),
+        }
+
+
+class JobManager:
+    """
+    Clase Singleton que administra los trabajos de impresión.
+    Cada trabajo se envía al hilo dueño del dispositivo (PrinterManager.submit) y
+    su estado y resultado quedan disponibles para consulta. Si hay un diario
+    (JobStore) configurado, los trabajos se registran en disco y los pendientes
+    se vuelven a encolar al reiniciar; los interrumpidos durante la impresión solo
+    se reintentan si así se configura.
+    """
+
+    _jobs: "OrderedDict[str, PrintJob]" = OrderedDict()
+    _lock = threading.Lock()
+    _runner: Optional[Callable[[Any, Dict[str, Any]], Dict[str, Any]]] = None
+    _store: Optional[JobStore] = None
+    _retention: int = DEFAULT_JOB_RETENTION
+    _idempotency: Optional[IdempotencyCache] = None
+    _max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    _retry_interrupted: bool = False
+    _submit_lock = threading.Lock()
+
+    @classmethod
+    def start(
+        cls,
+        runner: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]],
+        store: Optional[JobStore] = None,
+        retention: int = DEFAULT_JOB_RETENTION,
+        idempotency: Optional[IdempotencyCache] = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_interrupted: bool = False,
+    ) -> None:
+        """
+        Registra la función que imprime los documentos.
+        Args:
+            runner: Función que imprime un documento y retorna el resultado de la impresora.
+                    Se ejecuta en el hilo del dispositivo.
+            store: Diario persistente de trabajos (opcional).
+            retention: Segundos que se conservan en el diario los trabajos finalizados.
+            idempotency: Caché de claves de idempotencia (opcional).
+            max_attempts: Intentos de impresión de un trabajo al recuperarlo del diario.
+            retry_interrupted: Volver a imprimir los trabajos interrumpidos durante la impresión.
+        """
+        cls._runner = runner
+        cls._store = store
+        cls._retention = retention
+        cls._idempotency = idempotency
+        cls._max_attempts = max(1, max_attempts)
+        cls._retry_interrupted = retry_interrupted
+        logger.info("Cola de trabajos de impresión iniciada%s", " con diario en disco" if store else "")
+
+    @classmethod
+    def stop(cls) -> None:
+        """Cierra el diario de trabajos; los pendientes se recuperan en el próximo inicio"""
+        store, cls._store = cls._store, None
+        if store is not None:
+            store.close()
+            logger.info("Diario de trabajos cerrado")
+
+    @classmethod
+    def recover(cls, printers_config: Dict[str, Any]) -> int:
+        """
+        Vuelve a encolar los trabajos que quedaron pendientes en el diario.
+        Un trabajo interrumpido durante la impresión pudo haberse impreso (o dejado un documento
+        abierto), por lo que se marca 'interrupted' para su conciliación manual; solo se reintenta
+        con 'retry_interrupted' y mientras no supere 'max_attempts' (p. ej. si hace caer el proceso).
+        Los finalizados más antiguos que la retención se compactan.
+        Args:
+            printers_config: Configuración de impresoras vigente.
+        Returns:
+            int: Cantidad de trabajos recuperados.
+        """
+        if cls._store is None:
+            return 0
+
+        cls.compact()
+        if cls._idempotency is not None:  # Los reintentos posteriores al reinicio no deben reimprimir
+            now = datetime.now()
+            for key, job_id, created_at in cls._store.idempotency_keys(
+                now - timedelta(seconds=cls._idempotency.ttl), (JOB_FAILED,)
+            ):
+                cls._idempotency.put(key, job_id, age=(now - created_at).total_seconds())
+
+        recovered = 0
+        for record in cls._store.pending((JOB_QUEUED, JOB_PROCESSING)):
+            job = PrintJob.from_record(record, printers_config)
+            if job.state == JOB_PROCESSING:
+                if not cls._retry_interrupted or job.attempts >= cls._max_attempts:
+                    cls._interrupt(job)
+                    continue
+                logger.warning(
+                    "Trabajo %s interrumpido durante la impresión, se reintenta (intento %s de %s)",
+                    job.job_id,
+                    job.attempts + 1,
+                    cls._max_attempts,
+                )
+                job.state = JOB_QUEUED
+                job.started_at = None
+            try:
+                cls._enqueue(job)
+            except Exception as e:
+                logger.error("No se pudo recuperar el trabajo %s: %s", job.job_id, str(e))
+                continue
+            recovered += 1
+
+        if recovered:
+            logger.info("Trabajos recuperados del diario: %s", recovered)
+        return recovered
+
+    @classmethod
+    def _interrupt(cls, job: PrintJob) -> None:
+        """
+        Marca un trabajo recuperado como interrumpido y lo registra para su conciliación manual.
+        Args:
+            job: Trabajo recuperado del diario.
+        """
+        job.state = JOB_INTERRUPTED
+        job.finished_at = datetime.now()
+        job.result = {"status": False, "message": INTERRUPTED_MESSAGE, "data": None}
+        cls._journal(job)
+        with cls._lock:
+            cls._jobs[job.job_id] = job
+        JOBS_TOTAL.inc(printer=job.device, operation_type=job.data.get("operation_type", ""), state=job.state)
+        logger.error(
+            "Trabajo %s interrumpido tras %s intentos, no se reimprime (dispositivo %s, documento %s, clave %s). "
+            "Verificar en la impresora",
+            job.job_id,
+            job.attempts,
+            job.device,
+            job.to_dict()["document_number"],
+            job.idempotency_key,
+        )
+
+    @classmethod
+    def compact(cls) -> int:
+        """
+        Elimina del diario los trabajos finalizados más antiguos que la retención.
+        Returns:
+            int: Cantidad de trabajos eliminados.
+        """
+        if cls._store is None:
+            return 0
+        try:
+            return cls._store.compact((JOB_COMPLETED, JOB_FAILED, JOB_INTERRUPTED), cls._retention)
+        except Exception as e:
+            logger.error("Error compactando el diario de trabajos: %s", str(e))
+            return 0
+
+    @classmethod
+    def submit(
+        cls,
+        data: Dict[str, Any],
+        printers_config: Dict[str, Any],
+        device: str,
+        idempotency_key: Optional[str] = None,
+        document: Optional[Any] = None,
+    ) -> PrintJob:
+        """
+        Encola un documento para su impresión.
+        Args:
+            data: Documento validado a imprimir.
+            printers_config: Configuración de impresoras.
+            device: Dispositivo que imprimirá el documento.
+            idempotency_key: Clave de idempotencia registrada con el trabajo.
+            document: Modelo ya construido del documento, entregado tal cual a la impresora.
+        Returns:
+            PrintJob: Trabajo creado en estado 'queued'.
+        Raises:
+            QueueFullError: Si la cola del dispositivo está llena.
+        """
+        if cls._runner is None:
+            raise RuntimeError("La cola de trabajos de impresión no ha sido iniciada")
+
+        job = PrintJob(data, printers_config, device, document)
+        job.idempotency_key = idempotency_key
+        if cls._store is not None:
+            cls._store.add(job)
+        cls._enqueue(job)
+        logger.info("Trabajo %s encolado en %s - Documento: %s", job.job_id, device, job.to_dict()["document_number"])
+        return job
+
+    @classmethod
+    def submit_once(
+        cls,
+        data: Dict[str, Any],
+        printers_config: Dict[str, Any],
+        device: str,
+        idempotency_key: str,
+        document: Optional[Any] = None,
+    ) -> Tuple[PrintJob, bool]:
+        """
+        Encola un documento salvo que su clave de idempotencia ya tenga un trabajo.
+        Si el trabajo existente está pendiente, terminó con éxito o fue interrumpido se retorna
+        ese mismo trabajo; si falló, el documento se vuelve a encolar.
+        Args:
+            data: Documento validado a imprimir.
+            printers_config: Configuración de impresoras.
+            device: Dispositivo que imprimirá el documento.
+            idempotency_key: Clave de idempotencia de la solicitud.
+            document: Modelo ya construido del documento.
+        Returns:
+            Tuple[PrintJob, bool]: Trabajo y True si es un trabajo existente.
+        Raises:
+            QueueFullError: Si la cola del dispositivo está llena.
+        """
+        if cls._idempotency is None:
+            return cls.submit(data, printers_config, device, document=document), False
+
+        with cls._submit_lock:  # Dos reintentos simultáneos no deben crear dos trabajos
+            job_id = cls._idempotency.get(idempotency_key)
+            job = cls.get_job(job_id) if job_id else None
+            if job is not None and job.state != JOB_FAILED:
+                logger.info("Solicitud repetida (clave %s), se reutiliza el trabajo %s", idempotency_key, job.job_id)
+                return job, True
+
+            job = cls.submit(data, printers_config, device, idempotency_key, document)
+            cls._idempotency.put(idempotency_key, job.job_id)
+            return job, False
+
+    @classmethod
+    def _enqueue(cls, job: PrintJob) -> None:
+        """
+        Envía un trabajo al hilo de su dispositivo.
+        Args:
+            job: Trabajo a encolar.
+        Raises:
+            QueueFullError: Si la cola del dispositivo está llena.
+        """
+        try:
+            job.future = PrinterManager.submit(job.device, lambda: cls._run_job(job))
+        except Exception:
+            if cls._store is not None:
+                cls._store.remove(job.job_id)  # Rechazado: no debe reimprimirse al reiniciar
+            raise
+        with cls._lock:
+            cls._jobs[job.job_id] = job
+            cls._evict_finished()
+        EVENTS.publish("job", job.to_dict())
+
+    @classmethod
+    def get_job(cls, job_id: str) -> Optional[PrintJob]:
+        """
+        Obtiene un trabajo por su identificador.
+        Args:
+            job_id: Identificador del trabajo.
+        Returns:
+            Optional[PrintJob]: Trabajo encontrado o None si no existe.
+        """
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+        if job is None and cls._store is not None:
+            record = cls._store.get(job_id)  # Trabajo descartado de memoria o de una ejecución anterior
+            if record is not None:
+                job = PrintJob.from_record(record, {})
+        return job
+
+    @classmethod
+    def _evict_finished(cls) -> None:
+        """Descarta los trabajos finalizados más antiguos cuando se supera el límite"""
+        finished = [job_id for job_id, job in cls._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del cls._jobs[job_id]
+
+    @classmethod
+    def _run_job(cls, job: PrintJob) -> Dict[str, Any]:
+        """
+        Ejecuta un trabajo en el hilo del dispositivo y registra su resultado.
+        Args:
+            job: Trabajo a ejecutar.
+        Returns:
+            Dict[str, Any]: Resultado de la impresión.
+        """
+        job.state = JOB_PROCESSING
+        job.started_at = datetime.now()
+        job.attempts += 1
+        cls._journal(job)
+        EVENTS.publish("job", job.to_dict())
+        operation_type = job.data.get("operation_type", "")
+        QUEUE_WAIT_SECONDS.observe(
+            (job.started_at - job.created_at).total_seconds(), printer=job.device, operation_type=operation_type
+        )
+        logger.info("Procesando trabajo %s", job.job_id)
+
+        start = time.perf_counter()
+        try:
+            result = cls._runner(job.document or job.data, job.printers_config)
+        except Exception as e:
+            logger.error("Error procesando trabajo %s: %s", job.job_id, str(e), exc_info=True)
+            result = {"status": False, "message": f"Error interno del servidor: {str(e)}", "data": None}
+        finally:
+            job.document = None  # El modelo solo se necesita para imprimir; un reintento usa job.data
+
+        job.result = result
+        job.finished_at = datetime.now()
+        job.state = JOB_COMPLETED if result.get("status", False) else JOB_FAILED
+        PRINT_SECONDS.observe(
+            time.perf_counter() - start, printer=job.device, operation_type=operation_type, status=job.state
+        )
+        JOBS_TOTAL.inc(printer=job.device, operation_type=operation_type, state=job.state)
+        cls._journal(job)
+        EVENTS.publish("job", job.to_dict())
+        logger.info("Trabajo %s finalizado con estado %s", job.job_id, job.state)
+        return result
+
+    @classmethod
+    def _journal(cls, job: PrintJob) -> None:
+        """Registra en el diario el estado actual del trabajo"""
+        if cls._store is None:
+            return
+        try:
+            cls._store.update(job)
+        except Exception as e:
+            logger.error("Error registrando el trabajo %s en el diario: %s", job.job_id, str(e))
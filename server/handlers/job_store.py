@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Diario persistente de trabajos de impresión (SQLite en modo WAL).
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from utils.spool_db import open_spool_db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_FILE = os.path.join("spool", "jobs.db")
+JOB_COLUMNS = (  # Columnas leídas por _to_record, en su orden
+    "job_id, state, device, payload, result, attempts, created_at, started_at, finished_at, idempotency_key"
+)
+
+
+class JobStore:
+    """
+    Diario de trabajos aceptados.
+    Cada trabajo se registra al encolarse y se actualiza al cambiar de estado, de modo
+    que al reiniciar el servicio se pueden volver a encolar los trabajos pendientes.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Abre (o crea) el diario de trabajos.
+        Args:
+            path: Ruta del archivo de base de datos.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_spool_db(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                device TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                idempotency_key TEXT
+            )
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "idempotency_key" not in columns:  # Diario creado por una versión anterior
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN idempotency_key TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state)")
+        logger.info("Diario de trabajos abierto: %s", path)
+
+    def add(self, job: Any) -> None:
+        """
+        Registra un trabajo recién aceptado.
+        Args:
+            job: Trabajo de impresión (PrintJob).
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, state, device, payload, attempts, created_at, idempotency_key) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.job_id,
+                    job.state,
+                    job.device,
+                    json.dumps(job.data, ensure_ascii=False),
+                    job.attempts,
+                    job.created_at.isoformat(),
+                    job.idempotency_key,
+                ),
+            )
+
+    def update(self, job: Any) -> None:
+        """
+        Actualiza el estado y resultado de un trabajo.
+        Args:
+            job: Trabajo de impresión (PrintJob).
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, attempts = ?, started_at = ?, finished_at = ? WHERE job_id = ?",
+                (
+                    job.state,
+                    json.dumps(job.result, ensure_ascii=False) if job.result is not None else None,
+                    job.attempts,
+                    job.started_at.isoformat() if job.started_at else None,
+                    job.finished_at.isoformat() if job.finished_at else None,
+                    job.job_id,
+                ),
+            )
+
+    def remove(self, job_id: str) -> None:
+        """
+        Elimina un trabajo del diario.
+        Args:
+            job_id: Identificador del trabajo.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene un trabajo registrado.
+        Args:
+            job_id: Identificador del trabajo.
+        Returns:
+            Optional[Dict[str, Any]]: Registro del trabajo o None si no existe.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        return self._to_record(row) if row else None
+
+    def pending(self, states: tuple) -> List[Dict[str, Any]]:
+        """
+        Obtiene los trabajos no finalizados en orden de llegada.
+        Args:
+            states: Estados considerados pendientes.
+        Returns:
+            List[Dict[str, Any]]: Registros de los trabajos.
+        """
+        placeholders = ", ".join("?" for _ in states)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM jobs WHERE state IN ({placeholders}) ORDER BY rowid",
+                states,
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def idempotency_keys(self, since: datetime, skip_states: tuple) -> List[tuple]:
+        """
+        Obtiene las claves de idempotencia recibidas desde una fecha.
+        Args:
+            since: Fecha mínima de creación del trabajo.
+            skip_states: Estados cuyos trabajos no se consideran (p. ej. fallidos).
+        Returns:
+            List[tuple]: Tuplas (clave, job_id, created_at) en orden de llegada.
+        """
+        placeholders = ", ".join("?" for _ in skip_states)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, job_id, created_at FROM jobs "
+                f"WHERE idempotency_key IS NOT NULL AND created_at >= ? AND state NOT IN ({placeholders}) "
+                "ORDER BY rowid",
+                (since.isoformat(), *skip_states),
+            ).fetchall()
+        return [(key, job_id, datetime.fromisoformat(created_at)) for key, job_id, created_at in rows]
+
+    def compact(self, finished_states: tuple, retention: int) -> int:
+        """
+        Elimina los trabajos finalizados más antiguos que la retención y trunca el WAL.
+        Args:
+            finished_states: Estados considerados finalizados.
+            retention: Segundos que se conservan los trabajos finalizados.
+        Returns:
+            int: Cantidad de trabajos eliminados.
+        """
+        cutoff = (datetime.now() - timedelta(seconds=retention)).isoformat()
+        placeholders = ", ".join("?" for _ in finished_states)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE state IN ({placeholders}) AND finished_at < ?",
+                (*finished_states, cutoff),
+            )
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if cursor.rowcount:
+            logger.info("Diario de trabajos compactado: %s trabajos eliminados", cursor.rowcount)
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Cierra el diario haciendo un checkpoint final"""
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._conn.close()
+
+    @staticmethod
+    def _to_record(row: tuple) -> Dict[str, Any]:
+        """Convierte una fila de la tabla jobs en diccionario"""
+        job_id, state, device, payload, result, attempts, created_at, started_at, finished_at, key = row
+        return {
+            "job_id": job_id,
+            "state": state,
+            "device": device,
+            "data": json.loads(payload),
+            "result": json.loads(result) if result else None,
+            "attempts": attempts,
+            "created_at": datetime.fromisoformat(created_at),
+            "started_at": datetime.fromisoformat(started_at) if started_at else None,
+            "finished_at": datetime.fromisoformat(finished_at) if finished_at else None,
+            "idempotency_key": key,
+        }
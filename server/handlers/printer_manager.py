@@ -8,7 +8,11 @@ Clase Singleton para manejar las instancias de impresoras.
 """
 
 import logging
-from typing import Dict, Any, Optional
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional
+
+from .printer_worker import PrinterWorker, DEFAULT_QUEUE_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -16,16 +20,85 @@ logger = logging.getLogger(__name__)
 class PrinterManager:
     """
     Clase Singleton para manejar las instancias de impresoras.
-    Asegura que solo exista una instancia de cada tipo de impresora.
+    Asegura que solo exista una instancia de cada tipo de impresora y que cada
+    dispositivo sea usado por un único hilo de trabajo (ver PrinterWorker).
     """
 
     _instances: Dict[str, Any] = {}
     _FISCAL_PRINTERS = {"tfhka", "pnp"}  # Tipos de impresoras fiscales
+    _PRINTER_CLASSES = {  # (tipo, driver) -> clase; el driver se elige con 'fiscal_driver'
+        ("tfhka", "dll"): "printers.printer_hka.TfhkaPrinter",
+        ("tfhka", "serial"): "printers.printer_hka_serial.TfhkaSerialPrinter",
+        ("pnp", "dll"): "printers.printer_pnp.PnpPrinter",
+        ("pnp", "serial"): "printers.printer_pnp_serial.PnpSerialPrinter",
+    }
+    _workers: Dict[str, PrinterWorker] = {}
+    _workers_lock = threading.Lock()
+    _queue_size: int = DEFAULT_QUEUE_SIZE
+
+    @classmethod
+    def configure_workers(cls, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        """
+        Configura la capacidad de la cola de los hilos de impresora que se creen.
+        Args:
+            queue_size: Trabajos pendientes permitidos por dispositivo.
+        """
+        cls._queue_size = max(1, int(queue_size))
+
+    @classmethod
+    def submit(cls, device: str, task: Callable[[], Any]) -> Future:
+        """
+        Envía una tarea al hilo dueño del dispositivo, creándolo si no existe.
+        Args:
+            device: Identificador del dispositivo ('fiscal', 'matrix', 'ticket').
+            task: Función sin argumentos que usa la impresora.
+        Returns:
+            Future: Resultado de la tarea.
+        Raises:
+            QueueFullError: Si la cola del dispositivo está llena.
+        """
+        with cls._workers_lock:
+            worker = cls._workers.get(device)
+            if worker is None or not worker.is_alive():
+                worker = PrinterWorker(device, cls._queue_size)
+                worker.start()
+                cls._workers[device] = worker
+        return worker.submit(task)
+
+    @classmethod
+    def workers_status(cls) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene el estado de los hilos de impresora.
+        Returns:
+            Dict[str, Dict[str, Any]]: Trabajos pendientes y ocupación por dispositivo.
+        """
+        with cls._workers_lock:
+            return {
+                device: {"pending": worker.pending, "busy": worker.busy, "alive": worker.is_alive()}
+                for device, worker in cls._workers.items()
+            }
+
+    @classmethod
+    def stop_workers(cls, timeout: Optional[float] = None) -> None:
+        """
+        Detiene los hilos de impresora después de vaciar sus colas.
+        Args:
+            timeout: Tiempo máximo de espera por cada hilo en segundos.
+        """
+        with cls._workers_lock:
+            workers = list(cls._workers.values())
+            cls._workers.clear()
+        for worker in workers:
+            try:
+                worker.stop(timeout)
+            except Exception as e:
+                logger.warning("Error al detener hilo de impresora %s: %s", worker.device, str(e))
 
     @classmethod
     def get_printer(cls, printer_type: str, printer_config: Dict[str, Any]) -> Optional[Any]:
         """
         Obtiene una instancia de impresora del tipo especificado.
+        La instancia se recrea si cambia el driver ('fiscal_driver') de la impresora.
         Args:
             printer_type: Tipo de impresora.
             printer_config: Configuración de la impresora.
@@ -34,21 +107,25 @@ class PrinterManager:
         """
         try:
             printer_type = printer_type.lower()
-            printer_types = {
-                "tfhka": "printers.printer_hka.TfhkaPrinter",
-                "pnp": "printers.printer_pnp.PnpPrinter",
-            }
+            driver = str(printer_config.get("fiscal_driver", "dll")).lower()
 
-            if printer_type not in printer_types:
+            if printer_type not in cls._FISCAL_PRINTERS:
                 raise ValueError(f"Tipo de impresora no válido: {printer_type}")
+            if (printer_type, driver) not in cls._PRINTER_CLASSES:
+                raise ValueError(f"Driver {driver} no disponible para la impresora {printer_type}")
+
+            class_path = cls._PRINTER_CLASSES[(printer_type, driver)]
+            printer = cls._instances.get(printer_type)
+            if printer is not None:
+                if f"{type(printer).__module__}.{type(printer).__name__}" == class_path:
+                    logger.debug("Retornando instancia existente de impresora %s", printer_type)
+                    return printer
+                logger.info("Impresora %s cambiada al driver %s, se crea una nueva instancia", printer_type, driver)
+                cls.remove_printer(printer_type)
 
-            if printer_type in cls._instances:
-                logger.debug("Retornando instancia existente de impresora %s", printer_type)
-                return cls._instances[printer_type]
-
-            logger.info("Creando nueva instancia: Impresora %s", printer_type)
+            logger.info("Creando nueva instancia: Impresora %s (driver %s)", printer_type, driver)
 
-            module_path = printer_types[printer_type].split(".")  # Importar dinámicamente la clase de impresora
+            module_path = class_path.split(".")  # Importar dinámicamente la clase de impresora
             module = __import__(".".join(module_path[:-1]), fromlist=[module_path[-1]])
             printer_class = getattr(module, module_path[-1])
 
@@ -77,6 +154,30 @@ class PrinterManager:
                 cls.remove_printer(printer_type)
             raise ValueError(str(e)) from e
 
+    @classmethod
+    def get_local_printer(cls, device: str, printer_class: type, printer_config: Dict[str, Any]) -> Any:
+        """
+        Obtiene la instancia de larga duración de una impresora de ticket o matricial.
+        La instancia se recrea solo si cambia la configuración del dispositivo.
+        Args:
+            device: Dispositivo ('matrix' o 'ticket').
+            printer_class: Clase de la impresora.
+            printer_config: Configuración del dispositivo.
+        Returns:
+            Any: Instancia de la impresora.
+        """
+        printer = cls._instances.get(device)
+        if printer is not None and (printer.config is printer_config or printer.config == printer_config):
+            return printer
+
+        if printer is not None:
+            logger.info("Configuración de la impresora %s modificada, se crea una nueva instancia", device)
+            cls.remove_printer(device)
+        logger.info("Creando nueva instancia: Impresora %s", device)
+        printer = printer_class(printer_config)
+        cls._instances[device] = printer
+        return printer
+
     @classmethod
     def remove_printer(cls, printer_type: str) -> None:
         """
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Tabla de enrutamiento de documentos hacia la impresora configurada.
+Se compila una sola vez por configuración de impresoras y se recompila al recargar la configuración.
+"""
+
+import importlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from .printer_manager import PrinterManager
+
+logger = logging.getLogger(__name__)
+
+PRINTER_TYPE_FISCAL = "fiscal"
+PRINTER_TYPE_MATRIX = "matrix"
+PRINTER_TYPE_TICKET = "ticket"
+DEVICE_PRIORITY = (PRINTER_TYPE_FISCAL, PRINTER_TYPE_MATRIX, PRINTER_TYPE_TICKET)  # Primer dispositivo habilitado
+
+PRINTER_CLASSES = {
+    PRINTER_TYPE_MATRIX: "printers.printer_dotmatrix.MatrixPrinter",
+    PRINTER_TYPE_TICKET: "printers.printer_ticket.TicketPrinter",
+}
+MAX_TABLES = 4  # Tablas compiladas que se conservan (configuración vigente y trabajos aún encolados)
+
+
+class PrinterRoutes:
+    """
+    Tabla de enrutamiento compilada a partir de la sección 'printers' de la configuración.
+    Las tablas se reutilizan mientras se consulte el mismo diccionario de configuración.
+    """
+
+    _tables: "OrderedDict[int, PrinterRoutes]" = OrderedDict()
+    _lock = threading.Lock()
+    _compiled = 0  # Cantidad de tablas compiladas desde el inicio
+    config_version = 0  # Versión de la configuración cargada por ConfigManager
+
+    def __init__(self, printers_config: Dict[str, Any], version: int, config_version: int) -> None:
+        """
+        Compila la tabla.
+        Args:
+            printers_config: Sección 'printers' de la configuración.
+            version: Número de la tabla compilada.
+            config_version: Versión de la configuración de la que proviene.
+        """
+        self.source = printers_config
+        self.version = version
+        self.config_version = config_version
+        self.compiled_at = datetime.now().isoformat()
+        self.sections: Dict[str, Dict[str, Any]] = {
+            device: printers_config.get(device) or {} for device in DEVICE_PRIORITY
+        }
+        self.device: Optional[str] = next(
+            (device for device in DEVICE_PRIORITY if self.sections[device].get(f"{device}_enabled")), None
+        )
+        self.fiscal_name = str(self.sections[PRINTER_TYPE_FISCAL].get("fiscal_name", "")).strip().lower()
+        self._printer_class: Optional[type] = None
+
+    @classmethod
+    def for_config(cls, printers_config: Dict[str, Any]) -> "PrinterRoutes":
+        """
+        Obtiene la tabla de una configuración de impresoras, compilándola solo la primera vez.
+        Args:
+            printers_config: Sección 'printers' de la configuración.
+        Returns:
+            PrinterRoutes: Tabla de enrutamiento.
+        """
+        with cls._lock:
+            table = cls._tables.get(id(printers_config))
+        if table is not None and table.source is printers_config:
+            return table
+        return cls.compile(printers_config)
+
+    @classmethod
+    def compile(cls, printers_config: Dict[str, Any], config_version: Optional[int] = None) -> "PrinterRoutes":
+        """
+        Compila y registra la tabla de una configuración de impresoras.
+        Args:
+            printers_config: Sección 'printers' de la configuración.
+            config_version: Versión de la configuración; por defecto la última cargada.
+        Returns:
+            PrinterRoutes: Tabla de enrutamiento.
+        """
+        with cls._lock:
+            if config_version is not None:
+                cls.config_version = config_version
+            cls._compiled += 1
+            table = cls(printers_config, cls._compiled, cls.config_version)
+            cls._tables[id(printers_config)] = table
+            cls._tables.move_to_end(id(printers_config))
+            while len(cls._tables) > MAX_TABLES:
+                cls._tables.popitem(last=False)
+        logger.info(
+            "Tabla de impresoras %s compilada (configuración %s): dispositivo %s",
+            table.version,
+            table.config_version,
+            table.device,
+        )
+        return table
+
+    def instance(self) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+        """
+        Obtiene la impresora del dispositivo de la tabla.
+        Returns:
+            Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+                - Instancia de la impresora o None si no hay impresora disponible
+                - Diccionario con información del error si ocurrió uno, None si no hay error
+        """
+        if self.device is None:
+            return None, {"message": "No hay impresoras configuradas"}
+
+        if self.device == PRINTER_TYPE_FISCAL:
+            try:
+                return PrinterManager.get_printer(self.fiscal_name, self.sections[PRINTER_TYPE_FISCAL]), None
+            except ValueError as e:
+                error_msg = str(e)
+                if "Estado:" in error_msg and "Error:" in error_msg:
+                    state = error_msg.split("Estado:")[1].split(",")[0].strip()
+                    error = error_msg.split("Error:")[1].strip()
+                    return None, {
+                        "printer_type": self.fiscal_name,
+                        "state": state,
+                        "error": error,
+                        "message": error_msg,
+                    }
+                return None, {"printer_type": self.fiscal_name, "message": error_msg}
+
+        try:
+            if self._printer_class is None:  # La clase se importa una sola vez por tabla
+                module_name, class_name = PRINTER_CLASSES[self.device].rsplit(".", 1)
+                self._printer_class = getattr(importlib.import_module(module_name), class_name)
+            return PrinterManager.get_local_printer(self.device, self._printer_class, self.sections[self.device]), None
+        except Exception as e:
+            return None, {"message": str(e)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumen de la tabla para el estado del servidor"""
+        return {
+            "version": self.version,
+            "config_version": self.config_version,
+            "compiled_at": self.compiled_at,
+            "device": self.device,
+            "fiscal_name": self.fiscal_name if self.device == PRINTER_TYPE_FISCAL else None,
+        }
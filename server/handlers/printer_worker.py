@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Hilo de trabajo dueño de un dispositivo de impresión.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from utils.events import EVENTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 100  # Trabajos pendientes permitidos por dispositivo
+
+
+class QueueFullError(RuntimeError):
+    """La cola del dispositivo alcanzó su capacidad máxima"""
+
+
+class PrinterWorker(threading.Thread):
+    """
+    Hilo que serializa el acceso a un dispositivo físico.
+    Es el único hilo que usa el controlador del dispositivo; los manejadores HTTP
+    envían tareas a su cola acotada y esperan el resultado mediante un Future.
+    """
+
+    def __init__(self, device: str, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        """
+        Inicializa el hilo del dispositivo.
+        Args:
+            device: Identificador del dispositivo ('fiscal', 'matrix', 'ticket').
+            queue_size: Capacidad máxima de la cola de tareas.
+        """
+        super().__init__(name=f"Printer-{device}", daemon=True)
+        self.device = device
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=queue_size)
+        self._busy = False
+
+    @property
+    def pending(self) -> int:
+        """Cantidad de tareas en espera"""
+        return self._queue.qsize()
+
+    @property
+    def busy(self) -> bool:
+        """Indica si el dispositivo está ejecutando una tarea"""
+        return self._busy
+
+    def submit(self, task: Callable[[], Any]) -> Future:
+        """
+        Encola una tarea para ejecutarse en el hilo del dispositivo.
+        Args:
+            task: Función sin argumentos que usa el dispositivo.
+        Returns:
+            Future: Resultado de la tarea.
+        Raises:
+            QueueFullError: Si la cola del dispositivo está llena.
+        """
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((task, future))
+        except queue.Full as e:
+            raise QueueFullError(f"Cola de impresión llena para el dispositivo {self.device}") from e
+        return future
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Detiene el hilo después de procesar las tareas pendientes.
+        Args:
+            timeout: Tiempo máximo de espera en segundos.
+        """
+        self._queue.put(None, timeout=timeout)
+        self.join(timeout)
+
+    def _publish_status(self) -> None:
+        """Publica el estado del dispositivo para los suscriptores de eventos"""
+        EVENTS.publish("printer", {"device": self.device, "busy": self._busy, "pending": self.pending})
+
+    def run(self) -> None:
+        """Bucle del hilo: ejecuta las tareas en orden de llegada"""
+        logger.info("Hilo de impresora %s iniciado", self.device)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            task, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            self._busy = True
+            self._publish_status()
+            try:
+                future.set_result(task())
+            except Exception as e:
+                logger.error("Error en tarea de impresora %s: %s", self.device, str(e), exc_info=True)
+                future.set_exception(e)
+            finally:
+                self._busy = False
+                self._publish_status()
+        logger.info("Hilo de impresora %s detenido", self.device)
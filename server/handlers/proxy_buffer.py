@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Almacenamiento local de solicitudes del modo PROXY mientras el SPOOLER no está disponible.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils.spool_db import open_spool_db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_FILE = os.path.join("spool", "proxy_buffer.db")
+DEFAULT_BUFFER_MAX = 10000  # Solicitudes almacenadas como máximo
+DEFAULT_REPLAY_CONCURRENCY = 1  # Solicitudes reenviadas en paralelo al recuperar el SPOOLER
+DEFAULT_MAX_ATTEMPTS = 5  # Rechazos del SPOOLER antes de apartar una solicitud
+DEAD_LETTER_LIMIT = 100  # Solicitudes apartadas que se muestran en el estado
+RATE_WINDOW = 60  # Segundos considerados para la tasa de reenvío
+
+
+class BufferFullError(RuntimeError):
+    """El almacenamiento local alcanzó su capacidad máxima"""
+
+
+class ProxyBuffer:
+    """
+    Cola durable (SQLite en modo WAL) de solicitudes pendientes de reenviar.
+    Las solicitudes se reenvían en el mismo orden en que fueron recibidas. Una solicitud que el
+    SPOOLER rechaza 'max_attempts' veces pasa a la tabla dead_letters para revisión manual y deja
+    de bloquear a las siguientes.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_BUFFER_MAX, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        """
+        Abre (o crea) el almacenamiento local.
+        Args:
+            path: Ruta del archivo de base de datos.
+            max_size: Cantidad máxima de solicitudes almacenadas.
+            max_attempts: Rechazos del SPOOLER antes de apartar una solicitud.
+        """
+        self.path = path
+        self.max_size = max_size
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._conn = open_spool_db(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                method TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                method TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                failed_at TEXT NOT NULL
+            )
+            """
+        )
+        self.depth = self._conn.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+        self.buffered_total = 0
+        self.replayed_total = 0
+        self.dead_total = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        self.last_replay_at: Optional[str] = None
+        self._replayed_times: deque = deque()
+        if self.depth:
+            logger.warning("Solicitudes pendientes de reenvío al SPOOLER: %s", self.depth)
+        if self.dead_total:
+            logger.warning("Solicitudes apartadas por rechazos del SPOOLER (revisión manual): %s", self.dead_total)
+
+    def add(self, path: str, method: str, headers: Dict[str, str], body: bytes) -> int:
+        """
+        Almacena una solicitud.
+        Args:
+            path: Ruta que se agrega a la URL del SPOOLER ('' o '/batch').
+            method: Método HTTP.
+            headers: Headers a reenviar.
+            body: Cuerpo de la solicitud.
+        Returns:
+            int: Identificador de la solicitud almacenada.
+        Raises:
+            BufferFullError: Si se alcanzó la capacidad máxima.
+        """
+        with self._lock:
+            if self.depth >= self.max_size:
+                raise BufferFullError(f"Almacenamiento local lleno ({self.max_size} solicitudes)")
+            cursor = self._conn.execute(
+                "INSERT INTO requests (path, method, headers, body, created_at) VALUES (?, ?, ?, ?, ?)",
+                (path, method, json.dumps(headers), body, datetime.now().isoformat()),
+            )
+            self.depth += 1
+            self.buffered_total += 1
+            return cursor.lastrowid
+
+    def peek(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Obtiene las solicitudes más antiguas sin retirarlas.
+        Args:
+            limit: Cantidad máxima de solicitudes.
+        Returns:
+            List[Dict[str, Any]]: Solicitudes en orden de llegada.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, path, method, headers, body, attempts FROM requests ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "path": row[1],
+                "method": row[2],
+                "headers": json.loads(row[3]),
+                "body": row[4],
+                "attempts": row[5],
+            }
+            for row in rows
+        ]
+
+    def remove(self, request_id: int) -> None:
+        """
+        Retira una solicitud ya reenviada.
+        Args:
+            request_id: Identificador de la solicitud.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM requests WHERE id = ?", (request_id,))
+            if cursor.rowcount:
+                self.depth -= 1
+                self.replayed_total += 1
+                self.last_replay_at = datetime.now().isoformat()
+                self._replayed_times.append(now)
+
+    def record_failure(self, request_id: int, error: str, counted: bool = True) -> bool:
+        """
+        Registra un intento de reenvío fallido.
+        Al llegar a 'max_attempts' la solicitud pasa a dead_letters y deja de contar en la profundidad.
+        Args:
+            request_id: Identificador de la solicitud.
+            error: Descripción del error.
+            counted: False si la solicitud no llegó al SPOOLER (p. ej. conexión rechazada); no suma intentos.
+        Returns:
+            bool: True si la solicitud fue apartada.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE requests SET attempts = attempts + ?, last_error = ? WHERE id = ?",
+                    (int(counted), error, request_id),
+                )
+                cursor = self._conn.execute(
+                    """
+                    INSERT INTO dead_letters
+                        (id, path, method, headers, body, attempts, last_error, created_at, failed_at)
+                    SELECT id, path, method, headers, body, attempts, last_error, created_at, ?
+                    FROM requests WHERE id = ? AND attempts >= ?
+                    """,
+                    (datetime.now().isoformat(), request_id, self.max_attempts),
+                )
+                dead = cursor.rowcount > 0
+                if dead:
+                    self._conn.execute("DELETE FROM requests WHERE id = ?", (request_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if dead:
+                self.depth -= 1
+                self.dead_total += 1
+        if dead:
+            logger.error(
+                "Solicitud almacenada %s apartada tras %s intentos (%s); requiere revisión manual",
+                request_id,
+                self.max_attempts,
+                error,
+            )
+        return dead
+
+    def dead_letters(self, limit: int = DEAD_LETTER_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Obtiene las solicitudes apartadas más recientes.
+        Args:
+            limit: Cantidad máxima de solicitudes.
+        Returns:
+            List[Dict[str, Any]]: Solicitudes apartadas, sin el cuerpo.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, path, method, headers, attempts, last_error, created_at, failed_at "
+                "FROM dead_letters ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "path": row[1],
+                "method": row[2],
+                "idempotency_key": json.loads(row[3]).get("Idempotency-Key"),
+                "attempts": row[4],
+                "last_error": row[5],
+                "created_at": row[6],
+                "failed_at": row[7],
+            }
+            for row in rows
+        ]
+
+    def replay_rate(self) -> float:
+        """Solicitudes reenviadas por segundo en el último minuto"""
+        cutoff = time.monotonic() - RATE_WINDOW
+        with self._lock:
+            while self._replayed_times and self._replayed_times[0] < cutoff:
+                self._replayed_times.popleft()
+            return round(len(self._replayed_times) / RATE_WINDOW, 3)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Estado del almacenamiento local.
+        Returns:
+            Dict[str, Any]: Profundidad, totales, tasa de reenvío y solicitudes apartadas.
+        """
+        with self._lock:
+            oldest = self._conn.execute("SELECT created_at FROM requests ORDER BY id LIMIT 1").fetchone()
+        return {
+            "depth": self.depth,
+            "max_size": self.max_size,
+            "oldest": oldest[0] if oldest else None,
+            "buffered_total": self.buffered_total,
+            "replayed_total": self.replayed_total,
+            "replay_rate": self.replay_rate(),
+            "last_replay_at": self.last_replay_at,
+            "max_attempts": self.max_attempts,
+            "dead_total": self.dead_total,
+            "dead_letters": self.dead_letters(),
+        }
+
+    def close(self) -> None:
+        """Cierra el almacenamiento haciendo un checkpoint final"""
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._conn.close()
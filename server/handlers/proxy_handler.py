@@ -7,15 +7,74 @@ Licensed under the GNU Affero General Public License, version 3 or later.
 Clase que maneja las solicitudes HTTP y las reenvía al servidor SPOOLER.
 """
 
+import json
 import logging
-from typing import Dict, Any, Tuple
+import math
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Any, Optional, Tuple
 
 import requests
-from flask import request
-from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+from flask import Response, request
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout, Timeout
+from urllib3.exceptions import ConnectTimeoutError
+
+from utils.tools import get_base_path
+from .proxy_buffer import (
+    ProxyBuffer,
+    BufferFullError,
+    DEFAULT_BUFFER_FILE,
+    DEFAULT_BUFFER_MAX,
+    DEFAULT_REPLAY_CONCURRENCY,
+    DEFAULT_MAX_ATTEMPTS,
+)
+from .upstream import (
+    UpstreamPool,
+    Upstream,
+    NoHealthyUpstreamError,
+    CircuitOpenError,
+    BALANCE_ROUND_ROBIN,
+    DEFAULT_HEALTH_INTERVAL,
+    DEFAULT_COOLDOWN,
+    DEFAULT_BREAKER_FAILURES,
+    DEFAULT_BREAKER_RESET,
+    DEFAULT_BREAKER_TRIALS,
+)
 
 
 DEFAULT_TIMEOUT = 30  # segundos
+DEFAULT_CONNECT_TIMEOUT = 5  # segundos
+DEFAULT_POOL_SIZE = 10  # Conexiones persistentes por servidor destino
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+TERMINAL_HEADER = "X-Terminal-Id"
+BRANCH_HEADER = "X-Branch-Code"
+# Búsqueda directa en los bytes del documento para no decodificar el JSON en cada solicitud
+TERMINAL_PATTERN = re.compile(rb'"terminal_id"\s*:\s*"((?:[^"\\]|\\.)*)"')
+BRANCH_PATTERN = re.compile(rb'"branch_code"\s*:\s*"((?:[^"\\]|\\.)*)"')
+# Headers que no se reenvían: hop-by-hop (RFC 7230) y los que recalcula cada extremo
+HOP_HEADERS = frozenset(
+    (
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "trailers",
+        "transfer-encoding",
+        "upgrade",
+        "host",
+        "content-length",
+    )
+)
+RESPONSE_SKIP_HEADERS = HOP_HEADERS | {"content-encoding"}  # requests entrega el cuerpo ya descomprimido
+HTTP_ACCEPTED = 202
 HTTP_BAD_REQUEST = 400
 HTTP_SERVICE_UNAVAILABLE = 503
 HTTP_GATEWAY_TIMEOUT = 504
@@ -24,6 +83,57 @@ HTTP_INTERNAL_ERROR = 500
 logger = logging.getLogger(__name__)
 
 
+def _json_string(match: Optional["re.Match[bytes]"]) -> Optional[str]:
+    """
+    Decodifica el valor de un string JSON encontrado en los bytes del documento.
+    Un escape inválido retorna None y la solicitud se balancea como si no trajera el campo.
+    """
+    if match is None:
+        return None
+    value = match.group(1)
+    if b"\\" in value:  # Solo los valores con escapes pasan por el decodificador JSON
+        try:
+            return json.loads(b'"' + value + b'"')
+        except ValueError:  # JSONDecodeError o UnicodeDecodeError
+            return None
+    return value.decode("utf-8", "replace")
+
+
+def route_keys(headers: Any, body: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Obtiene la terminal y la sucursal de una solicitud.
+    Se usan los headers 'X-Terminal-Id' y 'X-Branch-Code' si el cliente los envía; si no, los
+    campos 'operation_metadata.terminal_id' y 'branch_code' del cuerpo (el primero que aparezca).
+    Args:
+        headers: Headers de la solicitud (sin distinguir mayúsculas).
+        body: Cuerpo de la solicitud.
+    Returns:
+        Tuple[Optional[str], Optional[str]]: Terminal y sucursal, o None si no vienen.
+    """
+    terminal_id = headers.get(TERMINAL_HEADER)
+    branch_code = headers.get(BRANCH_HEADER)
+    if terminal_id is None:
+        terminal_id = _json_string(TERMINAL_PATTERN.search(body))
+    if branch_code is None:
+        branch_code = _json_string(BRANCH_PATTERN.search(body))
+    return terminal_id, branch_code
+
+
+def connection_refused(error: Exception) -> bool:
+    """
+    Indica si la conexión falló antes de enviar la solicitud.
+    Solo en ese caso es seguro reenviarla a otro SPOOLER sin riesgo de imprimir dos veces.
+    Args:
+        error: Excepción de requests.
+    Returns:
+        bool: True si no se llegó a establecer la conexión.
+    """
+    if isinstance(error, ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)  # Incluye NewConnectionError (conexión rechazada)
+
+
 class ProxyHandler:  # pylint: disable=R0903
     """
     Manejador de proxy para reenviar solicitudes al servidor SPOOLER.
@@ -37,18 +147,119 @@ class ProxyHandler:  # pylint: disable=R0903
         Inicializa el manejador de proxy con la configuración proporcionada.
         Args:
             config: Diccionario con la configuración del proxy.
-                   Debe contener 'proxy_target' y 'proxy_enabled'.
+                   Debe contener 'proxy_target' y 'proxy_enabled'. Si contiene
+                   'proxy_targets' las solicitudes se reparten entre esos destinos.
+                   Con 'proxy_routes' o 'proxy_sticky' los documentos de cada terminal
+                   se envían siempre al mismo destino.
+                   Con 'proxy_buffer_enabled' las solicitudes se almacenan localmente
+                   mientras ningún SPOOLER responde y se reenvían al recuperarse.
         """
         self.config: Dict[str, Any] = config
         self.target_url: str = config["proxy"]["proxy_target"]
         self.enabled: bool = config["proxy"]["proxy_enabled"]
+        targets = config["proxy"].get("proxy_targets") or [{"url": self.target_url, "weight": 1}]
+        self.upstreams = UpstreamPool(
+            targets,
+            balance=config["proxy"].get("proxy_balance", BALANCE_ROUND_ROBIN),
+            health_interval=config["proxy"].get("proxy_health_interval", DEFAULT_HEALTH_INTERVAL),
+            cooldown=config["proxy"].get("proxy_cooldown", DEFAULT_COOLDOWN),
+            breaker={
+                "failures": config["proxy"].get("proxy_breaker_failures", DEFAULT_BREAKER_FAILURES),
+                "reset_timeout": config["proxy"].get("proxy_breaker_reset", DEFAULT_BREAKER_RESET),
+                "trials": config["proxy"].get("proxy_breaker_trials", DEFAULT_BREAKER_TRIALS),
+            },
+            routes=config["proxy"].get("proxy_routes"),
+            sticky=config["proxy"].get("proxy_sticky", False),
+        )
+        self.timeout: Tuple[float, float] = (
+            config["proxy"].get("proxy_connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+            config["proxy"].get("proxy_read_timeout", DEFAULT_TIMEOUT),
+        )
+        self.keep_alive: bool = config["proxy"].get("proxy_keep_alive", True)
+
+        pool_size = config["proxy"].get("proxy_pool_size", DEFAULT_POOL_SIZE)
+        self._adapter = HTTPAdapter(pool_connections=len(targets), pool_maxsize=pool_size)
+        self._session = requests.Session()  # Reutiliza las conexiones TCP hacia el SPOOLER
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+        self._session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))  # No compartir cookies entre clientes
+        self._requests_lock = threading.Lock()
+        self.requests_forwarded = 0
 
-    def handle_request(self) -> Tuple[Dict[str, Any], int]:
+        self.buffer: Optional[ProxyBuffer] = None
+        self._replay_stop = threading.Event()
+        self._replay_wake = threading.Event()
+        self._replay_thread: Optional[threading.Thread] = None
+        if self.enabled:
+            self.upstreams.start_health_checks(self._ping)
+            if config["proxy"].get("proxy_buffer_enabled", False):
+                buffer_file = config["proxy"].get("proxy_buffer_file", DEFAULT_BUFFER_FILE)
+                if not os.path.isabs(buffer_file):  # No depende de la carpeta de trabajo (servicio o exe)
+                    buffer_file = os.path.join(get_base_path(), buffer_file)
+                self.buffer = ProxyBuffer(
+                    buffer_file,
+                    config["proxy"].get("proxy_buffer_max", DEFAULT_BUFFER_MAX),
+                    config["proxy"].get("proxy_buffer_max_attempts", DEFAULT_MAX_ATTEMPTS),
+                )
+                concurrency = config["proxy"].get("proxy_buffer_concurrency", DEFAULT_REPLAY_CONCURRENCY)
+                self._replay_thread = threading.Thread(
+                    target=self._replay_loop, args=(concurrency,), name="Proxy-replay", daemon=True
+                )
+                self._replay_thread.start()
+
+    def close(self) -> None:
+        """Detiene la verificación de salud, el reenvío del almacenamiento local y cierra las conexiones"""
+        self.upstreams.stop()
+        if self._replay_thread:
+            self._replay_stop.set()
+            self._replay_wake.set()
+            self._replay_thread.join(timeout=self.timeout[1])
+        if self.buffer:
+            self.buffer.close()
+        self._session.close()
+
+    def _ping(self, url: str) -> bool:
+        """
+        Verifica si un SPOOLER responde.
+        Args:
+            url: URL de /api/ping del SPOOLER.
+        Returns:
+            bool: True si respondió correctamente.
+        """
+        try:
+            return self._session.get(url, timeout=(self.timeout[0], self.timeout[0])).ok
+        except requests.RequestException:
+            return False
+
+    def connection_stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de reutilización de conexiones y estado de los destinos.
+        Returns:
+            Dict[str, Any]: Solicitudes reenviadas, conexiones abiertas, conexiones reutilizadas y destinos.
+        """
+        pools = self._adapter.poolmanager.pools
+        opened = 0
+        for key in pools.keys():
+            try:
+                opened += pools[key].num_connections
+            except KeyError:  # Pool descartado entre la lectura de las claves y el acceso
+                continue
+        return {
+            "requests": self.requests_forwarded,
+            "connections": opened,
+            "reused": max(0, self.requests_forwarded - opened),
+            "targets": self.upstreams.status(),
+        }
+
+    def handle_request(self, path: str = "") -> Tuple[Any, ...]:
         """
         Maneja una solicitud HTTP y la reenvía al servidor SPOOLER.
+        Los cuerpos de la solicitud y de la respuesta se reenvían como bytes, sin decodificar el JSON.
+        Args:
+            path: Ruta que se agrega a 'proxy_target' (p. ej. '/batch').
         Returns:
-            Tuple[Dict[str, Any], int]: Un tuple conteniendo la respuesta en formato JSON
-            y el código de estado HTTP.
+            Tuple[Any, ...]: Un tuple con la respuesta del SPOOLER (o un diccionario de error)
+            y el código de estado HTTP; con el circuito abierto incluye el header 'Retry-After'.
         Raises:
             RequestsConnectionError: Si no se puede establecer conexión con el servidor SPOOLER.
             Timeout: Si la conexión excede el tiempo de espera.
@@ -60,48 +271,284 @@ class ProxyHandler:  # pylint: disable=R0903
                 "message": "Proxy no está habilitado",
             }, HTTP_BAD_REQUEST
 
-        try:
-            self._log_request()
-            response = self._forward_request()
-            self._log_response(response)
-            return response.json(), response.status_code
+        if self.buffer is not None and self.buffer.depth:  # Conserva el orden: hay solicitudes pendientes de reenviar
+            return self._buffer_request(path)
+
+        pinned = self._pinned_upstream(request.headers, request.get_data())
+        tried: Tuple[Upstream, ...] = ()
+        while True:
+            try:
+                upstream = self.upstreams.select(tried, pinned)
+            except NoHealthyUpstreamError as e:
+                if self.buffer is not None:  # Ningún SPOOLER aceptó la conexión: nada llegó a enviarse
+                    return self._buffer_request(path)
+                error_msg = str(e)
+                logger.error(error_msg)
+                error = {"status": "error", "message": error_msg}
+                if isinstance(e, CircuitOpenError):  # Falla de inmediato en lugar de esperar el timeout
+                    retry_after = str(max(1, math.ceil(e.retry_after)))
+                    return error, HTTP_SERVICE_UNAVAILABLE, {"Retry-After": retry_after}
+                return error, HTTP_SERVICE_UNAVAILABLE
+
+            try:
+                self._log_request(upstream.url, path)
+                response = self._forward_request(upstream.url, path)
+                self.upstreams.mark_success(upstream)
+                upstream.breaker.record_success()
+                self._log_response(response)
+                return self._relay_response(response), response.status_code
 
-        except RequestsConnectionError:
-            error_msg = f"No se pudo conectar al servidor SPOOLER: {self.target_url}"
+            except RequestsConnectionError as e:
+                self.upstreams.mark_failure(upstream)
+                upstream.breaker.record_failure()
+                if connection_refused(e):  # No se envió nada: se intenta con otro SPOOLER
+                    logger.warning("No se pudo conectar al servidor SPOOLER %s, probando otro destino", upstream.url)
+                    tried += (upstream,)
+                    continue
+                error_msg = f"No se pudo conectar al servidor SPOOLER: {upstream.url}"
+                logger.error(error_msg)
+                return {"status": "error", "message": error_msg}, HTTP_SERVICE_UNAVAILABLE
+
+            except Timeout:
+                upstream.breaker.record_failure()
+                error_msg = f"Timeout al conectar con el servidor SPOOLER: {upstream.url}"
+                logger.error(error_msg)
+                return {"status": "error", "message": error_msg}, HTTP_GATEWAY_TIMEOUT
+
+            except Exception as e:
+                error_msg = f"Error al procesar solicitud proxy: {str(e)}"
+                logger.error(error_msg, exc_info=True)
+                return {"status": "error", "message": error_msg}, HTTP_INTERNAL_ERROR
+
+            finally:
+                self.upstreams.release(upstream)
+
+    def _pinned_upstream(self, headers: Any, body: bytes) -> Optional[Upstream]:
+        """
+        Destino fijo de la solicitud según las reglas de ruta.
+        Args:
+            headers: Headers de la solicitud.
+            body: Cuerpo de la solicitud.
+        Returns:
+            Optional[Upstream]: Destino asignado o None si se usa el balanceo.
+        """
+        if not self.upstreams.routes:
+            return None
+        return self.upstreams.route(*route_keys(headers, body))
+
+    def _buffer_request(self, path: str = "") -> Tuple[Dict[str, Any], int]:
+        """
+        Almacena la solicitud actual para reenviarla cuando el SPOOLER vuelva a responder.
+        Si el cliente no envió 'Idempotency-Key' se genera una, así un reenvío repetido
+        (p. ej. tras un timeout) no imprime el documento dos veces.
+        Args:
+            path: Ruta que se agrega a la URL (p. ej. '/batch').
+        Returns:
+            Tuple[Dict[str, Any], int]: Respuesta 202 con el identificador almacenado,
+            o 503 si el almacenamiento está lleno.
+        """
+        headers = self._request_headers()
+        headers.setdefault(IDEMPOTENCY_HEADER, f"proxy-{uuid.uuid4().hex}")
+        try:
+            buffer_id = self.buffer.add(path, request.method, headers, request.get_data())
+        except BufferFullError as e:
+            error_msg = str(e)
             logger.error(error_msg)
             return {"status": "error", "message": error_msg}, HTTP_SERVICE_UNAVAILABLE
 
-        except Timeout:
-            error_msg = f"Timeout al conectar con el servidor SPOOLER: {self.target_url}"
-            logger.error(error_msg)
-            return {"status": "error", "message": error_msg}, HTTP_GATEWAY_TIMEOUT
+        self._replay_wake.set()
+        logger.warning("SPOOLER no disponible, solicitud almacenada localmente (%s pendientes)", self.buffer.depth)
+        return {
+            "status": True,
+            "message": "SPOOLER no disponible, documento almacenado para reenvío",
+            "data": {
+                "buffer_id": buffer_id,
+                "pending": self.buffer.depth,
+                "idempotency_key": headers[IDEMPOTENCY_HEADER],
+            },
+        }, HTTP_ACCEPTED
+
+    def _replay_loop(self, concurrency: int) -> None:
+        """
+        Reenvía en orden las solicitudes almacenadas, como máximo 'concurrency' a la vez.
+        Al reanudar el reenvío se verifica primero /api/ping del SPOOLER seleccionado.
+        Args:
+            concurrency: Solicitudes reenviadas en paralelo.
+        """
+        reachable = False
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="Proxy-replay") as executor:
+            while not self._replay_stop.is_set():
+                if not self.buffer.depth:
+                    self._replay_wake.wait(self.upstreams.health_interval)
+                    self._replay_wake.clear()
+                    continue
+                try:
+                    reachable = self._replay_batch(executor, concurrency, verify=not reachable)
+                except Exception as e:
+                    logger.error("Error reenviando solicitudes almacenadas: %s", str(e), exc_info=True)
+                    reachable = False
+                if not reachable:
+                    self._replay_stop.wait(self.upstreams.health_interval)
+
+    def _replay_batch(self, executor: ThreadPoolExecutor, size: int, verify: bool = True) -> bool:
+        """
+        Reenvía un lote de solicitudes almacenadas.
+        Args:
+            executor: Ejecutor con la concurrencia de reenvío.
+            size: Solicitudes del lote.
+            verify: Verificar /api/ping antes de reenviar.
+        Returns:
+            bool: False si el SPOOLER no respondió y conviene esperar antes de reintentar.
+        """
+        try:
+            upstream = self.upstreams.select()
+        except NoHealthyUpstreamError:
+            return False
+        try:
+            if verify:
+                if not self._ping(upstream.ping_url):
+                    self.upstreams.mark_failure(upstream)
+                    return False
+                self.upstreams.mark_success(upstream)
+                logger.info(
+                    "SPOOLER %s disponible, reenviando %s solicitudes almacenadas", upstream.url, self.buffer.depth
+                )
+
+            entries = self.buffer.peek(size)
+            futures = [executor.submit(self._replay_entry, upstream, entry) for entry in entries]
+            return all([future.result() for future in futures])
+        finally:
+            self.upstreams.release(upstream)
 
-        except Exception as e:
-            error_msg = f"Error al procesar solicitud proxy: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            return {"status": "error", "message": error_msg}, HTTP_INTERNAL_ERROR
+    def _replay_entry(self, upstream: Upstream, entry: Dict[str, Any]) -> bool:
+        """
+        Reenvía una solicitud almacenada y la retira si el SPOOLER la procesó.
+        Las respuestas 4xx también la retiran: reenviarla no cambiaría el resultado. Tras
+        'proxy_buffer_max_attempts' rechazos (5xx o timeout) pasa a dead_letters.
+        Args:
+            upstream: SPOOLER destino si la solicitud no tiene ruta fija.
+            entry: Solicitud almacenada.
+        Returns:
+            bool: True si la solicitud fue retirada o apartada.
+        """
+        pinned = self._pinned_upstream(CaseInsensitiveDict(entry["headers"]), entry["body"])
+        rerouted = pinned is not None and pinned is not upstream
+        if rerouted:
+            try:
+                upstream = self.upstreams.select(pinned=pinned)
+            except NoHealthyUpstreamError:
+                return False
+        try:
+            response = self._send(upstream.url, entry["path"], entry["method"], entry["headers"], entry["body"])
+            upstream.breaker.record_success()
+        except requests.RequestException as e:
+            upstream.breaker.record_failure()
+            logger.warning("No se pudo reenviar la solicitud almacenada %s: %s", entry["id"], str(e))
+            # Si la conexión fue rechazada el SPOOLER no recibió la solicitud: no cuenta como intento
+            counted = not (isinstance(e, RequestsConnectionError) and connection_refused(e))
+            self.buffer.record_failure(entry["id"], str(e), counted)
+            return False
+        finally:
+            if rerouted:
+                self.upstreams.release(upstream)
 
-    def _log_request(self) -> None:
+        if response.status_code >= HTTP_INTERNAL_ERROR:
+            logger.warning("El SPOOLER rechazó la solicitud almacenada %s (%s)", entry["id"], response.status_code)
+            return self.buffer.record_failure(entry["id"], f"HTTP {response.status_code}: {response.text[:200]}")
+        if response.status_code >= HTTP_BAD_REQUEST:
+            logger.error(
+                "Solicitud almacenada %s descartada por el SPOOLER (%s): %s",
+                entry["id"],
+                response.status_code,
+                response.text,
+            )
+        else:
+            logger.info("Solicitud almacenada %s reenviada (%s)", entry["id"], response.status_code)
+        self.buffer.remove(entry["id"])
+        return True
+
+    def buffer_status(self) -> Dict[str, Any]:
+        """
+        Estado del almacenamiento local.
+        Returns:
+            Dict[str, Any]: Habilitado, profundidad y tasa de reenvío.
+        """
+        if self.buffer is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.buffer.status()}
+
+    def _log_request(self, target_url: str, path: str = "") -> None:
         """Registra los detalles de la solicitud entrante."""
-        logger.info("Reenviando solicitud a: %s", self.target_url)
-        logger.debug("Método: %s", request.method)
-        logger.debug("Headers: %s", dict(request.headers))
-        logger.debug("Datos: %s", request.get_json() if request.is_json else request.data)
+        logger.info("Reenviando solicitud a: %s%s", target_url, path)
+        if logger.isEnabledFor(logging.DEBUG):  # Evita decodificar el cuerpo si no se va a registrar
+            logger.debug("Método: %s", request.method)
+            logger.debug("Headers: %s", dict(request.headers))
+            logger.debug("Datos: %s", request.get_json(silent=True) if request.is_json else request.data)
+
+    @staticmethod
+    def _request_headers() -> Dict[str, str]:
+        """Headers de la solicitud entrante que se reenvían al SPOOLER"""
+        return {key: value for key, value in request.headers if key.lower() not in HOP_HEADERS}
 
-    def _forward_request(self) -> requests.Response:
+    @staticmethod
+    def _relay_response(response: requests.Response) -> Response:
+        """
+        Construye la respuesta al cliente con los bytes, el tipo de contenido y los headers del SPOOLER.
+        Args:
+            response: La respuesta recibida del servidor SPOOLER.
+        Returns:
+            Response: Respuesta de Flask con el cuerpo sin decodificar.
+        """
+        headers = [(key, value) for key, value in response.headers.items() if key.lower() not in RESPONSE_SKIP_HEADERS]
+        return Response(response.content, status=response.status_code, headers=headers)
+
+    def _forward_request(self, target_url: str, path: str = "") -> requests.Response:
         """
         Reenvía la solicitud al servidor SPOOLER.
+        Args:
+            target_url: URL de impresión del SPOOLER seleccionado.
+            path: Ruta que se agrega a la URL (p. ej. '/batch').
+        Returns:
+            requests.Response: La respuesta del servidor SPOOLER.
+        """
+        return self._send(
+            target_url, path, request.method, self._request_headers(), request.get_data(), request.cookies
+        )
+
+    def _send(
+        self,
+        target_url: str,
+        path: str,
+        method: str,
+        headers: Dict[str, str],
+        body: bytes,
+        cookies: Optional[Dict[str, str]] = None,
+    ) -> requests.Response:
+        """
+        Envía una solicitud al servidor SPOOLER por la sesión persistente.
+        Args:
+            target_url: URL de impresión del SPOOLER seleccionado.
+            path: Ruta que se agrega a la URL (p. ej. '/batch').
+            method: Método HTTP.
+            headers: Headers a enviar (sin headers hop-by-hop).
+            body: Cuerpo de la solicitud.
+            cookies: Cookies del cliente.
         Returns:
             requests.Response: La respuesta del servidor SPOOLER.
         """
-        return requests.request(
-            method=request.method,
-            url=self.target_url,
-            headers={key: value for key, value in request.headers if key != "Host"},
-            data=request.get_data(),
-            cookies=request.cookies,
+        if not self.keep_alive:
+            headers = {**headers, "Connection": "close"}
+
+        with self._requests_lock:
+            self.requests_forwarded += 1
+        return self._session.request(
+            method=method,
+            url=target_url.rstrip("/") + path if path else target_url,
+            headers=headers,
+            data=body,
+            cookies=cookies,
             allow_redirects=False,
-            timeout=DEFAULT_TIMEOUT,
+            timeout=self.timeout,
         )
 
     def _log_response(self, response: requests.Response) -> None:
@@ -111,4 +558,5 @@ class ProxyHandler:  # pylint: disable=R0903
             response: La respuesta recibida del servidor SPOOLER.
         """
         logger.info("Respuesta recibida del SPOOLER: %s", response.status_code)
-        logger.debug("Respuesta: %s", response.text)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Respuesta: %s", response.text)
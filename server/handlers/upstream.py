@@ -0,0 +1,465 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Selección de servidores SPOOLER destino en modo PROXY (balanceo, rutas fijas, verificación de salud y cortocircuito).
+"""
+
+import hashlib
+import itertools
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+BALANCE_ROUND_ROBIN = "round_robin"
+BALANCE_LEAST_OUTSTANDING = "least_outstanding"
+DEFAULT_HEALTH_INTERVAL = 5  # Segundos entre verificaciones de salud
+DEFAULT_COOLDOWN = 30  # Segundos que un destino fallido queda fuera de servicio
+DEFAULT_BREAKER_FAILURES = 5  # Fallos consecutivos que abren el circuito
+DEFAULT_BREAKER_RESET = 30  # Segundos con el circuito abierto antes de probar de nuevo
+DEFAULT_BREAKER_TRIALS = 1  # Solicitudes de prueba permitidas con el circuito semiabierto
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class NoHealthyUpstreamError(RuntimeError):
+    """No hay servidores SPOOLER disponibles"""
+
+
+class CircuitOpenError(NoHealthyUpstreamError):
+    """Todos los destinos disponibles tienen el circuito abierto"""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Cortocircuito de un destino.
+    - Cerrado: las solicitudes pasan; los fallos consecutivos se cuentan.
+    - Abierto: al alcanzar el umbral de fallos las solicitudes se rechazan de inmediato.
+    - Semiabierto: pasado el tiempo de espera se permiten solicitudes de prueba; un éxito
+      cierra el circuito y un fallo lo vuelve a abrir.
+    """
+
+    def __init__(
+        self,
+        failures: int = DEFAULT_BREAKER_FAILURES,
+        reset_timeout: float = DEFAULT_BREAKER_RESET,
+        trials: int = DEFAULT_BREAKER_TRIALS,
+    ) -> None:
+        """
+        Inicializa el cortocircuito cerrado.
+        Args:
+            failures: Fallos consecutivos que abren el circuito.
+            reset_timeout: Segundos con el circuito abierto antes de probar de nuevo.
+            trials: Solicitudes de prueba simultáneas con el circuito semiabierto.
+        """
+        self.failure_threshold = max(1, int(failures))
+        self.reset_timeout = reset_timeout
+        self.trials = max(1, int(trials))
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_total = 0
+        self._changed_at = time.monotonic()
+        self._in_trial = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Indica si se puede enviar una solicitud al destino.
+        Returns:
+            bool: False si el circuito está abierto.
+        """
+        if self.state == BREAKER_CLOSED:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self.state == BREAKER_OPEN:
+                if now < self._changed_at + self.reset_timeout:
+                    return False
+                self._set_state(BREAKER_HALF_OPEN, now)
+            elif self.state == BREAKER_CLOSED:
+                return True
+            if self._in_trial >= self.trials:
+                if now < self._changed_at + self.reset_timeout:
+                    return False
+                self._changed_at = now  # Pruebas sin resultado: se permiten nuevas
+                self._in_trial = 0
+            self._in_trial += 1
+            return True
+
+    def record_success(self) -> None:
+        """Registra una solicitud exitosa: reinicia los fallos y cierra el circuito"""
+        if self.state == BREAKER_CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            if self.state != BREAKER_CLOSED:
+                self._set_state(BREAKER_CLOSED, time.monotonic())
+
+    def record_failure(self) -> None:
+        """Registra una solicitud fallida: abre el circuito al alcanzar el umbral o si fallaba una prueba"""
+        with self._lock:
+            self.failures += 1
+            if self.state == BREAKER_HALF_OPEN or (
+                self.state == BREAKER_CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.opened_total += 1
+                self._set_state(BREAKER_OPEN, time.monotonic())
+
+    def retry_after(self) -> float:
+        """Segundos hasta que el circuito permita una solicitud de prueba"""
+        if self.state != BREAKER_OPEN:
+            return 0.0
+        return max(0.0, self._changed_at + self.reset_timeout - time.monotonic())
+
+    def _set_state(self, state: str, now: float) -> None:
+        """Cambia el estado del circuito (requiere el lock)"""
+        self.state = state
+        self._changed_at = now
+        self._in_trial = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Estado del cortocircuito para /api/status"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_total": self.opened_total,
+            "retry_after": round(self.retry_after(), 1),
+        }
+
+
+class Upstream:
+    """Servidor SPOOLER destino con su peso, estado y solicitudes en curso"""
+
+    def __init__(self, url: str, weight: int = 1, breaker: Optional[CircuitBreaker] = None) -> None:
+        """
+        Inicializa el destino.
+        Args:
+            url: URL de impresión del SPOOLER (p. ej. http://host:5050/api/printers).
+            weight: Peso relativo en el balanceo.
+            breaker: Cortocircuito del destino.
+        """
+        self.url = url
+        self.weight = max(1, int(weight))
+        parts = urlsplit(url)
+        self.ping_url = f"{parts.scheme}://{parts.netloc}/api/ping"
+        self.healthy = True
+        self.outstanding = 0
+        self.ejected_until = 0.0
+        self.breaker = breaker or CircuitBreaker()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Estado del destino para /api/status"""
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "breaker": self.breaker.to_dict(),
+        }
+
+
+def smooth_weighted_schedule(upstreams: List[Upstream]) -> Tuple[Upstream, ...]:
+    """
+    Calcula un ciclo de round robin ponderado suave: cada destino aparece tantas veces
+    como su peso y las apariciones quedan intercaladas (p. ej. pesos 5,1,1 -> a a b a c a a).
+    Args:
+        upstreams: Destinos disponibles.
+    Returns:
+        Tuple[Upstream, ...]: Ciclo de selección.
+    """
+    total = sum(upstream.weight for upstream in upstreams)
+    current = [0] * len(upstreams)
+    schedule = []
+    for _ in range(total):
+        for index, upstream in enumerate(upstreams):
+            current[index] += upstream.weight
+        best = max(range(len(upstreams)), key=lambda i: current[i])
+        current[best] -= total
+        schedule.append(upstreams[best])
+    return tuple(schedule)
+
+
+def rendezvous_score(key: str, upstream: Upstream) -> float:
+    """
+    Puntaje de rendezvous hashing ponderado (HRW) de una clave en un destino.
+    La clave se asigna al destino con mayor puntaje; si se agrega o retira un destino
+    solo cambian de destino las claves que le correspondían.
+    Args:
+        key: Clave de ruta (p. ej. 'terminal:CAJA-01').
+        upstream: Destino candidato.
+    Returns:
+        float: Puntaje de la clave en el destino.
+    """
+    digest = hashlib.blake2b(f"{key}|{upstream.url}".encode("utf-8"), digest_size=8).digest()
+    unit = (int.from_bytes(digest, "big") + 1) / (2**64 + 1)  # Uniforme en (0, 1)
+    return -upstream.weight / math.log(unit)
+
+
+class RouteTable:
+    """
+    Tabla de rutas precompilada: terminal o sucursal -> destino.
+    Las reglas explícitas tienen prioridad (primero terminal, luego sucursal); con 'sticky'
+    las claves sin regla se asignan por rendezvous hashing, de modo que cada terminal llega
+    siempre al mismo SPOOLER sin coordinación entre nodos.
+    """
+
+    def __init__(self, routes: Dict[str, Dict[str, str]], upstreams: List[Upstream], sticky: bool = False) -> None:
+        """
+        Compila las reglas de ruta.
+        Args:
+            routes: Reglas {'terminals': {terminal_id: url}, 'branches': {branch_code: url}}.
+            upstreams: Destinos configurados.
+            sticky: Asignar por rendezvous hashing las terminales sin regla.
+        """
+        by_url = {upstream.url: upstream for upstream in upstreams}
+        self.upstreams = tuple(upstreams)
+        self.sticky = sticky
+        self.terminals = self._compile(routes.get("terminals", {}), by_url)
+        self.branches = self._compile(routes.get("branches", {}), by_url)
+        self._cache: Dict[str, Upstream] = {}
+
+    @staticmethod
+    def _compile(rules: Dict[str, str], by_url: Dict[str, Upstream]) -> Dict[str, Upstream]:
+        """Resuelve las URL de las reglas a sus destinos, descartando las que no están configuradas"""
+        compiled = {}
+        for key, url in rules.items():
+            upstream = by_url.get(url)
+            if upstream is None:
+                logger.warning("Ruta '%s' ignorada: %s no está en proxy_targets", key, url)
+                continue
+            compiled[key] = upstream
+        return compiled
+
+    def __bool__(self) -> bool:
+        return bool(self.terminals or self.branches or self.sticky)
+
+    def lookup(self, terminal_id: Optional[str], branch_code: Optional[str]) -> Optional[Upstream]:
+        """
+        Obtiene el destino asignado a un documento.
+        Args:
+            terminal_id: Terminal del documento.
+            branch_code: Sucursal del documento.
+        Returns:
+            Optional[Upstream]: Destino asignado o None si se usa el balanceo.
+        """
+        if terminal_id and terminal_id in self.terminals:
+            return self.terminals[terminal_id]
+        if branch_code and branch_code in self.branches:
+            return self.branches[branch_code]
+        if not self.sticky or len(self.upstreams) == 1:
+            return None
+
+        key = f"terminal:{terminal_id}" if terminal_id else f"branch:{branch_code}" if branch_code else None
+        if key is None:
+            return None
+        upstream = self._cache.get(key)
+        if upstream is None:
+            upstream = max(self.upstreams, key=lambda u: rendezvous_score(key, u))
+            if len(self._cache) < 10000:
+                self._cache[key] = upstream
+        return upstream
+
+
+class UpstreamPool:
+    """
+    Conjunto de servidores SPOOLER destino.
+    La selección es O(1): con round robin se recorre un ciclo precalculado que solo se
+    reconstruye cuando cambia la salud de un destino; con menor carga se comparan dos
+    destinos al azar (power of two choices). Un hilo verifica /api/ping de cada destino,
+    retira los que fallan y los reincorpora después del periodo de espera. Los destinos
+    con el circuito abierto se saltan sin esperar su timeout. Los documentos con ruta
+    fija se envían siempre a su destino.
+    """
+
+    def __init__(
+        self,
+        targets: List[Dict[str, Any]],
+        balance: str = BALANCE_ROUND_ROBIN,
+        health_interval: float = DEFAULT_HEALTH_INTERVAL,
+        cooldown: float = DEFAULT_COOLDOWN,
+        breaker: Optional[Dict[str, Any]] = None,
+        routes: Optional[Dict[str, Dict[str, str]]] = None,
+        sticky: bool = False,
+    ) -> None:
+        """
+        Inicializa el conjunto de destinos.
+        Args:
+            targets: Lista de destinos {'url': ..., 'weight': ...}.
+            balance: 'round_robin' o 'least_outstanding'.
+            health_interval: Segundos entre verificaciones de salud.
+            cooldown: Segundos que un destino fallido queda fuera de servicio.
+            breaker: Parámetros del cortocircuito de cada destino (failures, reset_timeout, trials).
+            routes: Reglas de ruta fija por terminal o sucursal.
+            sticky: Asignar por rendezvous hashing las terminales sin regla.
+        """
+        if not targets:
+            raise ValueError("Se requiere al menos un servidor SPOOLER destino")
+        self.upstreams = [
+            Upstream(target["url"], target.get("weight", 1), CircuitBreaker(**(breaker or {}))) for target in targets
+        ]
+        self.routes = RouteTable(routes or {}, self.upstreams, sticky)
+        self.balance = balance
+        self.health_interval = health_interval
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._healthy: Tuple[Upstream, ...] = ()
+        self._schedule: Tuple[Upstream, ...] = ()
+        self._cursor = itertools.count()
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Recalcula los destinos disponibles y el ciclo de selección"""
+        healthy = tuple(upstream for upstream in self.upstreams if upstream.healthy)
+        self._healthy = healthy
+        self._schedule = smooth_weighted_schedule(list(healthy)) if healthy else ()
+
+    def route(self, terminal_id: Optional[str], branch_code: Optional[str]) -> Optional[Upstream]:
+        """
+        Destino fijo de un documento según las reglas de ruta.
+        Args:
+            terminal_id: Terminal del documento.
+            branch_code: Sucursal del documento.
+        Returns:
+            Optional[Upstream]: Destino asignado o None si se usa el balanceo.
+        """
+        if not self.routes:
+            return None
+        return self.routes.lookup(terminal_id, branch_code)
+
+    def select(self, exclude: Tuple[Upstream, ...] = (), pinned: Optional[Upstream] = None) -> Upstream:
+        """
+        Selecciona un destino y registra la solicitud en curso.
+        Args:
+            exclude: Destinos ya intentados en esta solicitud.
+            pinned: Destino fijo del documento; no se reemplaza por otro aunque falle,
+                    para que los documentos de una terminal lleguen siempre a la misma impresora.
+        Returns:
+            Upstream: Destino seleccionado.
+        Raises:
+            CircuitOpenError: Si todos los destinos disponibles tienen el circuito abierto.
+            NoHealthyUpstreamError: Si no hay destinos disponibles.
+        """
+        if pinned is not None:
+            if pinned in exclude:
+                raise NoHealthyUpstreamError(f"SPOOLER asignado no disponible: {pinned.url}")
+            if not pinned.breaker.allow():
+                raise CircuitOpenError(
+                    f"Circuito abierto: SPOOLER asignado sin responder: {pinned.url}", pinned.breaker.retry_after()
+                )
+            with self._lock:
+                pinned.outstanding += 1
+            return pinned
+
+        healthy = self._healthy or tuple(self.upstreams)  # Todos fuera de servicio: se intentan igualmente
+        candidates = [u for u in healthy if u not in exclude] if exclude else healthy
+        if not candidates:
+            raise NoHealthyUpstreamError("No hay servidores SPOOLER disponibles")
+
+        if exclude:  # Reintento: cualquier destino disponible no intentado
+            upstream = candidates[0]
+        elif not self._schedule:
+            upstream = candidates[next(self._cursor) % len(candidates)]
+        elif self.balance == BALANCE_LEAST_OUTSTANDING and len(candidates) > 1:
+            first, second = random.sample(candidates, 2)
+            upstream = min((first, second), key=lambda u: (u.outstanding + 1) / u.weight)
+        else:
+            schedule = self._schedule
+            upstream = schedule[next(self._cursor) % len(schedule)]
+
+        if not upstream.breaker.allow():
+            upstream = next((u for u in candidates if u is not upstream and u.breaker.allow()), None)
+            if upstream is None:
+                retry_after = min(u.breaker.retry_after() for u in candidates)
+                raise CircuitOpenError("Circuito abierto: servidores SPOOLER sin responder", retry_after)
+
+        with self._lock:
+            upstream.outstanding += 1
+        return upstream
+
+    def release(self, upstream: Upstream) -> None:
+        """Registra el fin de una solicitud al destino"""
+        with self._lock:
+            upstream.outstanding -= 1
+
+    def mark_failure(self, upstream: Upstream) -> None:
+        """
+        Retira un destino que no responde durante el periodo de espera.
+        Args:
+            upstream: Destino fallido.
+        """
+        with self._lock:
+            upstream.ejected_until = time.monotonic() + self.cooldown
+            if upstream.healthy:
+                upstream.healthy = False
+                self._rebuild()
+                logger.warning("SPOOLER %s fuera de servicio por %s segundos", upstream.url, self.cooldown)
+
+    def mark_success(self, upstream: Upstream) -> None:
+        """
+        Reincorpora un destino que volvió a responder.
+        Args:
+            upstream: Destino recuperado.
+        """
+        if upstream.healthy:
+            return
+        with self._lock:
+            if not upstream.healthy:
+                upstream.healthy = True
+                self._rebuild()
+                logger.info("SPOOLER %s disponible nuevamente", upstream.url)
+
+    def check_health(self, ping: Callable[[str], bool]) -> None:
+        """
+        Verifica una vez la salud de los destinos.
+        Los destinos retirados solo se vuelven a verificar al terminar su periodo de espera.
+        Args:
+            ping: Función que recibe la URL de /api/ping y retorna True si el destino responde.
+        """
+        now = time.monotonic()
+        for upstream in self.upstreams:
+            if not upstream.healthy and now < upstream.ejected_until:
+                continue
+            if ping(upstream.ping_url):
+                self.mark_success(upstream)
+            else:
+                self.mark_failure(upstream)
+
+    def start_health_checks(self, ping: Callable[[str], bool]) -> None:
+        """
+        Inicia el hilo de verificación de salud.
+        Args:
+            ping: Función que recibe la URL de /api/ping y retorna True si el destino responde.
+        """
+
+        def run() -> None:
+            while not self._stop.wait(self.health_interval):
+                try:
+                    self.check_health(ping)
+                except Exception as e:
+                    logger.error("Error verificando servidores SPOOLER: %s", str(e))
+
+        self._thread = threading.Thread(target=run, name="Proxy-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo de verificación de salud"""
+        self._stop.set()
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Estado de los destinos para /api/status"""
+        return [upstream.to_dict() for upstream in self.upstreams]
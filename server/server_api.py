@@ -13,17 +13,36 @@ import time
 import threading
 import os
 
-from flask import Flask, request, jsonify, Blueprint, current_app, render_template, make_response, send_file
+from flask import Flask, request, jsonify, Blueprint, current_app, render_template, make_response, send_file, Response
 from flask_cors import CORS
 
 from utils.tools import get_base_path
+from utils.events import EVENTS, DEFAULT_MAX_SUBSCRIBERS
+from utils.log_queue import LogPipeline
+from utils.metrics import REGISTRY, CONTENT_TYPE, REQUESTS_TOTAL, ERRORS_TOTAL, QUEUE_DEPTH, IN_FLIGHT
 from server.config_loader import ConfigManager
-from .handlers.document_handler import handle_documents, handle_reports
+from .handlers.document_handler import (
+    handle_documents,
+    handle_batch,
+    handle_reports,
+    handle_job_status,
+    process_document,
+)
+from .handlers.event_handler import handle_events
+from .handlers.job_manager import JobManager, DEFAULT_JOB_RETENTION, DEFAULT_MAX_ATTEMPTS
+from .handlers.job_store import JobStore, DEFAULT_SPOOL_FILE
+from .handlers.idempotency import IdempotencyCache, DEFAULT_IDEMPOTENCY_TTL, DEFAULT_IDEMPOTENCY_SIZE
+from .handlers.printer_manager import PrinterManager
+from .handlers.printer_routes import PrinterRoutes
 from .handlers.proxy_handler import ProxyHandler
 from .auth import require_auth, create_session, cleanup_sessions
 
 logger = logging.getLogger(__name__)
 
+UNCOUNTED_ENDPOINTS = frozenset(  # Consultas que no se cuentan como solicitudes atendidas
+    ("api.get_status", "api.get_job", "api.get_metrics", "api.get_events", "api.get_proxy_buffer")
+)
+
 # Blueprint para agrupar las rutas
 api = Blueprint("api", __name__)
 
@@ -38,6 +57,29 @@ class ServerState:  # pylint: disable=R0903
         self.proxy_handler = None
         self.server_start_time = datetime.now()
         self.error_log = []
+        self._lock = threading.Lock()  # Las solicitudes se atienden en varios hilos
+
+    def count_request(self, endpoint):
+        """Registra una solicitud atendida"""
+        with self._lock:
+            self.request_count += 1
+        REQUESTS_TOTAL.inc(endpoint=endpoint or "")
+        self.publish_stats()
+
+    def count_error(self, error_info):
+        """Registra un error no controlado conservando solo los últimos 10"""
+        with self._lock:
+            self.error_count += 1
+            self.last_errors = (self.last_errors + [error_info])[-10:]
+        ERRORS_TOTAL.inc(endpoint=error_info.get("endpoint") or "")
+        self.publish_stats(error_info)
+
+    def publish_stats(self, last_error=None):
+        """Publica los contadores para los suscriptores de eventos"""
+        EVENTS.publish(
+            "stats",
+            {"requests_total": self.request_count, "error_count": self.error_count, "last_error": last_error},
+        )
 
 
 # Crear una instancia global del estado del servidor
@@ -47,25 +89,59 @@ server_state = ServerState()
 @api.before_request
 def before_request():
     """before request"""
-    if request.endpoint != "api.get_status":  # No contar las peticiones de status
-        server_state.request_count += 1
+    if request.endpoint not in UNCOUNTED_ENDPOINTS:
+        server_state.count_request(request.endpoint)
 
 
 @api.errorhandler(Exception)
 def handle_error(error):
     """handle error"""
-    server_state.error_count += 1
     error_info = {
         "timestamp": datetime.now().isoformat(),
         "message": str(error),
         "endpoint": request.endpoint,
     }
-    server_state.last_errors.append(error_info)
-    if len(server_state.last_errors) > 10:  # Mantener solo los últimos 10 errores
-        server_state.last_errors.pop(0)
+    server_state.count_error(error_info)
     return jsonify({"status": "error", "message": str(error)}), 500
 
 
+def create_job_store(server_config):
+    """
+    Abre el diario de trabajos si está habilitado.
+    Args:
+        server_config: Sección 'server' de la configuración.
+    Returns:
+        JobStore o None si el diario está deshabilitado o no se pudo abrir.
+    """
+    if not server_config.get("server_spool_enabled", True):
+        logger.info("Diario de trabajos deshabilitado")
+        return None
+
+    spool_file = server_config.get("server_spool_file", DEFAULT_SPOOL_FILE)
+    if not os.path.isabs(spool_file):
+        spool_file = os.path.join(get_base_path(), spool_file)
+    try:
+        return JobStore(spool_file)
+    except Exception as e:
+        logger.error("No se pudo abrir el diario de trabajos %s: %s", spool_file, str(e))
+        return None
+
+
+def create_idempotency_cache(server_config):
+    """
+    Crea la caché de claves de idempotencia si está habilitada.
+    Args:
+        server_config: Sección 'server' de la configuración.
+    Returns:
+        IdempotencyCache o None si server_idempotency_ttl es 0.
+    """
+    ttl = server_config.get("server_idempotency_ttl", DEFAULT_IDEMPOTENCY_TTL)
+    if not ttl:
+        logger.info("Deduplicación de solicitudes deshabilitada")
+        return None
+    return IdempotencyCache(ttl, server_config.get("server_idempotency_size", DEFAULT_IDEMPOTENCY_SIZE))
+
+
 def create_app(config):
     """Crea y configura la aplicación Flask"""
     template_folder = os.path.join(get_base_path(), "views")
@@ -74,7 +150,9 @@ def create_app(config):
 
     CORS(app)
     app.config.update(config)
+    ConfigManager.add_listener(app.config.update)  # Las recargas del archivo llegan a la aplicación
     app.register_blueprint(api, url_prefix="/api")
+    EVENTS.max_subscribers = config.get("server", {}).get("server_event_clients", DEFAULT_MAX_SUBSCRIBERS)
 
     if config.get("server", {}).get("server_mode") == "PROXY":
         server_state.proxy_handler = ProxyHandler(config)
@@ -84,6 +162,23 @@ def create_app(config):
         )
     else:
         logger.info("Modo SPOOLER configurado")
+        server_config = config.get("server", {})
+        PrinterManager.configure_workers(server_config.get("server_queue_size", 100))
+        JobManager.start(  # Cola de trabajos por dispositivo
+            process_document,
+            store=create_job_store(server_config),
+            retention=server_config.get("server_job_retention", DEFAULT_JOB_RETENTION),
+            idempotency=create_idempotency_cache(server_config),
+            max_attempts=server_config.get("server_job_max_attempts", DEFAULT_MAX_ATTEMPTS),
+            retry_interrupted=server_config.get("server_retry_interrupted", False),
+        )
+        JobManager.recover(config.get("printers", {}))
+        QUEUE_DEPTH.callback = lambda: {
+            (device,): status["pending"] for device, status in PrinterManager.workers_status().items()
+        }
+        IN_FLIGHT.callback = lambda: {
+            (device,): int(status["busy"]) for device, status in PrinterManager.workers_status().items()
+        }
 
     @app.route("/")
     def index():
@@ -118,6 +213,7 @@ def create_app(config):
         while True:
             time.sleep(60)
             cleanup_sessions()
+            JobManager.compact()
 
     cleanup_thread = threading.Thread(target=cleanup_task, daemon=True)
     cleanup_thread.start()
@@ -125,6 +221,22 @@ def create_app(config):
     return app
 
 
+def shutdown_app(timeout=None):
+    """
+    Detiene el procesamiento de documentos de forma ordenada.
+    Los hilos de impresora terminan los trabajos en cola antes de detenerse y luego
+    se cierra el diario; lo que no alcance a imprimirse se recupera al reiniciar.
+    En modo PROXY se cierran las conexiones persistentes con el SPOOLER.
+    Args:
+        timeout: Tiempo máximo de espera por cada hilo de impresora en segundos.
+    """
+    logger.info("Deteniendo hilos de impresora")
+    PrinterManager.stop_workers(timeout)
+    JobManager.stop()
+    if server_state.proxy_handler:
+        server_state.proxy_handler.close()
+
+
 def get_uptime():
     """Calcula el tiempo que lleva corriendo el servidor"""
     uptime = datetime.now() - server_state.server_start_time
@@ -151,6 +263,7 @@ def get_status():
         response = {
             "status": "running",
             "uptime": get_uptime(),
+            "config_version": ConfigManager.get_version(),
             "config": {
                 "server": config.get("server", {}),
                 "proxy": config.get("proxy", {}),
@@ -169,7 +282,11 @@ def get_status():
             "stats": {
                 "requests_total": server_state.request_count,
                 "error_count": server_state.error_count,
-                "last_errors": server_state.last_errors,
+                "last_errors": list(server_state.last_errors),
+                "workers": PrinterManager.workers_status(),
+                "routing": PrinterRoutes.for_config(config.get("printers", {})).to_dict(),
+                "logging": LogPipeline.get_stats(),
+                "proxy": server_state.proxy_handler.connection_stats() if server_state.proxy_handler else None,
             },
         }
 
@@ -189,12 +306,50 @@ def get_status():
         )
 
 
+@api.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Ruta con las métricas del servidor en formato de Prometheus"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@api.route("/events", methods=["GET"])
+def get_events():
+    """Ruta con el flujo de eventos del servidor (Server-Sent Events)"""
+    return handle_events()
+
+
+@api.route("/proxy/buffer", methods=["GET"])
+def get_proxy_buffer():
+    """Ruta con el estado del almacenamiento local del modo PROXY"""
+    if not server_state.proxy_handler:
+        return jsonify({"status": False, "message": "El servidor no está en modo PROXY", "data": None}), 404
+    return jsonify(
+        {
+            "status": True,
+            "message": "Estado del almacenamiento local",
+            "data": server_state.proxy_handler.buffer_status(),
+        }
+    )
+
+
 @api.route("/printers", methods=["POST"])
 def print_document():
     """Ruta principal para imprimir documentos"""
     return handle_documents(server_state.proxy_handler)
 
 
+@api.route("/printers/batch", methods=["POST"])
+def print_batch():
+    """Ruta para imprimir un lote de documentos"""
+    return handle_batch(server_state.proxy_handler)
+
+
+@api.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Ruta para consultar el estado de un trabajo de impresión asíncrono"""
+    return handle_job_status(job_id)
+
+
 @api.route("/report_x", methods=["GET"])
 def print_report_x():
     """Ruta para imprimir reporte X (solo impresoras fiscales)"""
@@ -223,16 +378,18 @@ def save_config():
                 raise ValueError(f"Falta la sección {section} en la configuración")
 
         ConfigManager.save_config(new_config)  # Guardar la configuración
-        ConfigManager.reload_config()  # Recargar la configuración
-        current_app.config.update(new_config)  # Actualizar la configuración
+        ConfigManager.reload_config()  # Recargar la configuración (actualiza current_app.config)
 
         if new_config.get("server", {}).get("server_mode") == "PROXY":
+            if server_state.proxy_handler:
+                server_state.proxy_handler.close()
             server_state.proxy_handler = ProxyHandler(new_config)
             logger.info(
                 "Modo PROXY reconfigurado. Target URL: %s",
                 new_config.get("proxy", {}).get("proxy_target"),
             )
 
+        EVENTS.publish("config", {"server_mode": new_config.get("server", {}).get("server_mode")})
         return jsonify({"status": "success", "message": "Configuración guardada correctamente"})
 
     except Exception as e:
@@ -39,6 +39,7 @@ build_options = {
     "packages": [
         "flask",
         "flask_cors",
+        "waitress",
         "werkzeug",
         "jinja2",
         "win32print",
@@ -48,6 +49,7 @@ build_options = {
         "serial",
         "pythonnet",
         "jsonschema",
+        "fastjsonschema",
         "watchdog",
         "http",
         "http.client",
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Mide el costo por documento de la validación contra DOCUMENT_SCHEMA:
+- jsonschema.validate: comprueba el esquema y crea el validador en cada llamada (forma anterior).
+- Validador precompilado de jsonschema (DOCUMENT_VALIDATOR).
+- Validador generado con fastjsonschema (FAST_VALIDATOR), si está instalado.
+- validate_document: la ruta usada por el servidor.
+"""
+import copy
+import json
+import os
+import timeit
+
+from jsonschema import ValidationError, validate
+
+from server.document_schema import DOCUMENT_SCHEMA, DOCUMENT_VALIDATOR, FAST_VALIDATOR, validate_document
+
+ITERATIONS = 2000
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "resources", "example.json")
+
+
+def load_documents():
+    """Carga el documento de ejemplo y una variante inválida"""
+    with open(EXAMPLE_FILE, "r", encoding="utf-8") as f:
+        valid = json.load(f)
+    invalid = copy.deepcopy(valid)
+    invalid["items"][0]["item_quantity"] = "uno"
+    return valid, invalid
+
+
+def measure(name, func, document):
+    """Ejecuta la validación ITERATIONS veces y muestra los microsegundos por documento"""
+
+    def run():
+        try:
+            func(document)
+        except Exception:  # La variante inválida siempre falla
+            pass
+
+    seconds = timeit.timeit(run, number=ITERATIONS)
+    print(f"  {name:<32} {seconds / ITERATIONS * 1e6:10.1f} us/doc")
+
+
+if __name__ == "__main__":
+    valid_document, invalid_document = load_documents()
+
+    for label, document in (("Documento válido", valid_document), ("Documento inválido", invalid_document)):
+        print(f"{label} ({ITERATIONS} iteraciones)")
+        measure("jsonschema.validate (anterior)", lambda d: validate(d, DOCUMENT_SCHEMA), document)
+        measure("DOCUMENT_VALIDATOR", DOCUMENT_VALIDATOR.validate, document)
+        if FAST_VALIDATOR is not None:
+            measure("FAST_VALIDATOR (fastjsonschema)", FAST_VALIDATOR, document)
+        else:
+            print("  FAST_VALIDATOR                   fastjsonschema no está instalado")
+        measure("validate_document", validate_document, document)
+
+    try:
+        validate_document(invalid_document)
+    except ValidationError as e:
+        print(f"Mensaje de error: {e.message}")
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Configuración de pytest: las pruebas importan los módulos desde la raíz del proyecto y
+comparten un puerto serial simulado para los controladores de las impresoras fiscales.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeSerial:
+    """
+    Puerto serial simulado: cada lectura entrega el siguiente bloque de bytes programado,
+    como llegan los datos de la impresora en varias lecturas. Sin bloques pendientes, la
+    lectura espera el timeout del puerto y retorna vacío.
+    """
+
+    timeout = 0.01
+
+    def __init__(self, *chunks):
+        self.chunks = [bytes(chunk) for chunk in chunks]
+        self.written = bytearray()
+        self.reads = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        self.reads += 1
+        if not self.chunks:
+            time.sleep(self.timeout)
+            return b""
+        chunk = self.chunks.pop(0)
+        if len(chunk) > size:
+            self.chunks.insert(0, chunk[size:])
+        return chunk[:size]
+
+    def write(self, data):
+        self.written.extend(data)
+        return len(data)
+
+    def reset_input_buffer(self):
+        self.chunks.clear()
+
+
+@pytest.fixture
+def fake_serial():
+    """Crea puertos seriales simulados con los bloques de bytes que recibirá el lector"""
+    return FakeSerial
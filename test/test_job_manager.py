@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Pruebas de la cola de trabajos de impresión: deduplicación por clave de idempotencia
+y recuperación del diario al reiniciar.
+"""
+
+import threading
+
+import pytest
+
+from server.handlers.idempotency import IdempotencyCache
+from server.handlers.job_manager import (
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_INTERRUPTED,
+    JOB_PROCESSING,
+    JOB_QUEUED,
+    JobManager,
+    PrintJob,
+)
+from server.handlers.job_store import JobStore
+from server.handlers.printer_manager import PrinterManager
+
+DEVICE = "fiscal"
+WAIT = 5  # Segundos máximos de espera por un trabajo
+
+
+def document(number):
+    return {"operation_type": "printInvoice", "document": {"document_number": number}}
+
+
+class Runner:
+    """Impresora simulada: registra los documentos y responde con los resultados dados"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.printed = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, data, printers_config):
+        self.release.wait(WAIT)
+        self.printed.append(data["document"]["document_number"])
+        status = self.statuses.pop(0) if self.statuses else True
+        return {"status": status, "message": "OK" if status else "Error de impresora", "data": None}
+
+
+@pytest.fixture
+def job_queue(tmp_path, monkeypatch):
+    """Inicia la cola con un diario temporal y restaura el estado de JobManager al terminar"""
+    for name in ("_runner", "_store", "_retention", "_idempotency", "_max_attempts", "_retry_interrupted"):
+        monkeypatch.setattr(JobManager, name, getattr(JobManager, name))
+    monkeypatch.setattr(JobManager, "_jobs", {})
+    path = str(tmp_path / "jobs.db")
+
+    def start(runner, **options):
+        JobManager.stop()
+        JobManager.start(runner, store=JobStore(path), idempotency=IdempotencyCache(ttl=600), **options)
+        return JobManager._store
+
+    yield start
+    PrinterManager.stop_workers(WAIT)
+    JobManager.stop()
+
+
+def journal_interrupted(store, number, attempts=1):
+    """Registra en el diario un trabajo que quedaba en impresión al caer el proceso"""
+    job = PrintJob(document(number), {}, DEVICE)
+    job.idempotency_key = f"key-{number}"
+    store.add(job)
+    job.state = JOB_PROCESSING
+    job.attempts = attempts
+    store.update(job)
+    return job.job_id
+
+
+def test_submit_once_reuses_pending_and_completed_jobs(job_queue):
+    runner = Runner()
+    runner.release.clear()
+    job_queue(runner)
+
+    job, replayed = JobManager.submit_once(document("F-1"), {}, DEVICE, "key-1")
+    retry, retry_replayed = JobManager.submit_once(document("F-1"), {}, DEVICE, "key-1")
+    assert not replayed and retry_replayed
+    assert retry is job
+
+    runner.release.set()
+    job.wait(WAIT)
+    again, again_replayed = JobManager.submit_once(document("F-1"), {}, DEVICE, "key-1")
+    assert again is job and again_replayed
+    assert job.state == JOB_COMPLETED
+    assert runner.printed == ["F-1"]
+
+
+def test_submit_once_reprints_failed_jobs(job_queue):
+    runner = Runner(False)
+    job_queue(runner)
+
+    job, _ = JobManager.submit_once(document("F-2"), {}, DEVICE, "key-2")
+    job.wait(WAIT)
+    assert job.state == JOB_FAILED
+
+    retry, replayed = JobManager.submit_once(document("F-2"), {}, DEVICE, "key-2")
+    retry.wait(WAIT)
+    assert not replayed and retry is not job
+    assert retry.state == JOB_COMPLETED
+    assert runner.printed == ["F-2", "F-2"]
+
+
+def test_submit_once_concurrent_retries_print_once(job_queue):
+    runner = Runner()
+    runner.release.clear()
+    job_queue(runner)
+    jobs = []
+
+    def submit():
+        jobs.append(JobManager.submit_once(document("F-3"), {}, DEVICE, "key-3")[0])
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    runner.release.set()
+    jobs[0].wait(WAIT)
+    assert len({job.job_id for job in jobs}) == 1
+    assert runner.printed == ["F-3"]
+
+
+def test_recover_requeues_pending_jobs_in_order(job_queue):
+    runner = Runner()
+    store = job_queue(runner)
+    job_ids = []
+    for number in ("F-4", "F-5"):  # Trabajos aceptados que no llegaron a imprimirse antes del reinicio
+        job = PrintJob(document(number), {}, DEVICE)
+        store.add(job)
+        job_ids.append(job.job_id)
+
+    assert JobManager.recover({}) == 2
+    for job_id in job_ids:
+        JobManager.get_job(job_id).wait(WAIT)
+    assert runner.printed == ["F-4", "F-5"]
+    assert store.pending((JOB_QUEUED, JOB_PROCESSING)) == []
+
+
+def test_recover_marks_interrupted_jobs_without_reprinting(job_queue):
+    runner = Runner()
+    store = job_queue(runner)
+    job_id = journal_interrupted(store, "F-6")
+
+    assert JobManager.recover({}) == 0
+    job = JobManager.get_job(job_id)
+    assert job.state == JOB_INTERRUPTED and job.failed
+    assert store.get(job_id)["state"] == JOB_INTERRUPTED
+    assert runner.printed == []
+
+    retry, replayed = JobManager.submit_once(document("F-6"), {}, DEVICE, "key-F-6")
+    assert retry.job_id == job_id and replayed  # Un reintento del cliente no reimprime
+
+
+def test_recover_retries_interrupted_jobs_up_to_max_attempts(job_queue):
+    runner = Runner()
+    store = job_queue(runner, retry_interrupted=True, max_attempts=2)
+    retried = journal_interrupted(store, "F-7", attempts=1)
+    exhausted = journal_interrupted(store, "F-8", attempts=2)
+
+    assert JobManager.recover({}) == 1
+    JobManager.get_job(retried).wait(WAIT)
+    assert JobManager.get_job(retried).state == JOB_COMPLETED
+    assert JobManager.get_job(exhausted).state == JOB_INTERRUPTED
+    assert runner.printed == ["F-7"]
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Pruebas de la validación por columnas: validate_invoices debe retornar exactamente
+lo mismo que Invoice.validate en cada documento, con y sin NumPy.
+"""
+
+import copy
+import json
+import os
+import random
+
+import pytest
+
+from models import model_columns
+from models.model_columns import validate_invoices
+from models.model_invoice import Invoice
+
+EXAMPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "resources", "example.json")
+DISCOUNT_TYPES = ("discount_percentage", "surcharge_percentage", "discount_amount", "surcharge_amount", "")
+
+
+@pytest.fixture(params=["numpy", "array"])
+def scan_backend(request, monkeypatch):
+    """Ejecuta cada prueba con la implementación NumPy (si está instalada) y con el módulo array"""
+    if request.param == "numpy" and model_columns.np is None:
+        pytest.skip("NumPy no está instalado")
+    if request.param == "array":
+        monkeypatch.setattr(model_columns, "np", None)
+    return request.param
+
+
+def load_example():
+    with open(EXAMPLE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def random_document(rng, example, items):
+    """Documento con items, descuentos y pagos aleatorios; la mitad paga el total exacto"""
+    document = copy.deepcopy(example)
+    document["items"] = [
+        {
+            "item_ref": f"REF-{n}",
+            "item_name": f"ITEM {n}",
+            "item_quantity": rng.choice((1, 2, 3, 0.5, 1.25, 7)),
+            "item_price": round(rng.uniform(0.5, 500), rng.choice((2, 3))),
+            "item_tax": rng.choice((0, 8, 16, 31)),
+            "item_discount": rng.choice((0, 0, 5, 12.5, 50, 99.99, 100, 250)),
+            "item_discount_type": rng.choice(DISCOUNT_TYPES),
+        }
+        for n in range(items)
+    ]
+    total = float(Invoice(document).totals.total)
+    paid = total if rng.random() < 0.5 else round(total + rng.choice((-1, 0.01, 0.02, 5)), 2)
+    document["payments"] = [{"payment_method": "01", "payment_name": "EFECTIVO", "payment_amount": paid}]
+    return document
+
+
+def test_random_documents_match_invoice_validate(scan_backend):
+    rng = random.Random(20241)
+    example = load_example()
+    documents = [random_document(rng, example, rng.choice((1, 3, 20, 150))) for _ in range(300)]
+    invoices = [Invoice(document) for document in documents]
+
+    expected = [Invoice(document).validate() for document in documents]
+    assert validate_invoices(invoices) == expected
+    assert any(error is None for error in expected) and any(error for error in expected)
+
+
+def test_rule_errors_match_invoice_validate(scan_backend):
+    example = load_example()
+    cases = []
+
+    percentage = copy.deepcopy(example)  # Descuento porcentual mayor a 99.99%
+    percentage["items"].append(dict(percentage["items"][0], item_discount=100))
+    cases.append(percentage)
+
+    amount = copy.deepcopy(example)  # Descuento por monto mayor al precio
+    amount["items"][0].update(item_discount=155.5, item_discount_type="discount_amount")
+    cases.append(amount)
+
+    unpaid = copy.deepcopy(example)  # Pagos que no cubren el total
+    unpaid["payments"][0]["payment_amount"] = 100
+    cases.append(unpaid)
+
+    credit = copy.deepcopy(example)  # Nota de crédito sin documento afectado
+    credit["operation_type"] = "credit"
+    credit["affected_document"] = {}
+    cases.append(credit)
+
+    half_cent = copy.deepcopy(example)  # Redondeo en el límite del medio céntimo
+    half_cent["items"] = [dict(example["items"][0], item_price=0.125, item_quantity=1, item_tax=0)]
+    half_cent["payments"][0]["payment_amount"] = 0.13
+    cases.append(half_cent)
+
+    invoices = [Invoice(document) for document in cases]
+    expected = [Invoice(document).validate() for document in cases]
+    assert validate_invoices(invoices) == expected
+    assert expected[0].startswith("Error en item 2:")
+    assert expected[-1] is None
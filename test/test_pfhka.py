@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Pruebas del lector de tramas del controlador serial TFHKA contra un puerto simulado.
+"""
+
+import time
+
+import pytest
+
+from controllers.pfhka import ACK, ERROR_LRC, ERROR_NO_RESPONSE, NAK, FrameReader, ProtocolError, build_frame
+
+
+def deadline(seconds=1.0):
+    return time.monotonic() + seconds
+
+
+def test_read_frame_joins_chunks(fake_serial):
+    frame = build_frame("S1\n0001")
+    port = fake_serial(frame[:3], frame[3:-1], frame[-1:])
+    assert FrameReader(port).read_frame(deadline()) == b"S1\n0001"
+
+
+def test_read_frame_discards_noise_and_keeps_next_frame(fake_serial):
+    port = fake_serial(b"\x00\xff" + build_frame("SV\nA") + build_frame("S2\nB")[:4])
+    reader = FrameReader(port)
+    assert reader.read_frame(deadline()) == b"SV\nA"
+    assert reader.buffer == build_frame("S2\nB")[:4]  # Lo recibido junto con la trama no se pierde
+
+    port.chunks.append(build_frame("S2\nB")[4:])
+    assert reader.read_frame(deadline()) == b"S2\nB"
+    assert not reader.buffer
+
+
+def test_read_frame_rejects_bad_lrc(fake_serial):
+    frame = bytearray(build_frame("S1\n0001"))
+    frame[-1] ^= 0xFF
+    with pytest.raises(ProtocolError) as error:
+        FrameReader(fake_serial(frame)).read_frame(deadline())
+    assert error.value.code == ERROR_LRC[0]
+
+
+def test_read_frame_times_out_without_response(fake_serial):
+    start = time.monotonic()
+    with pytest.raises(ProtocolError) as error:
+        FrameReader(fake_serial(build_frame("S1")[:-2])).read_frame(deadline(0.1))
+    assert error.value.code == ERROR_NO_RESPONSE[0]
+    assert time.monotonic() - start < 1
+
+
+def test_read_control_skips_noise(fake_serial):
+    reader = FrameReader(fake_serial(b"\x11\x13", bytes([NAK, ACK])))
+    assert reader.read_control(deadline()) == NAK
+    assert reader.read_control(deadline()) == ACK
+    assert reader.read_control(deadline(0.05)) is None
+
+
+def test_clear_discards_pending_input(fake_serial):
+    port = fake_serial(build_frame("S1"))
+    reader = FrameReader(port)
+    reader.buffer.extend(b"\x02old")
+    reader.clear()
+    assert not reader.buffer and not port.chunks
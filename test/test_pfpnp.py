@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Pruebas de la lectura de respuestas del controlador serial PNP contra un puerto simulado.
+"""
+
+import time
+
+import pytest
+
+from controllers.pfpnp import FiscalPrinter
+
+STATUS_COMMAND = b"\x02 8\x1cN\x03"
+REPORT_COMMAND = b"\x02 9\x1cX\x1cT\x03"
+
+
+def frame(*fields):
+    """Trama de respuesta STX + campos separados por FS + ETX + BCC"""
+    data = FiscalPrinter.STX + FiscalPrinter.SEP.join(fields) + FiscalPrinter.ETX
+    return data + FiscalPrinter._calculate_bcc(data).encode("iso-8859-1")
+
+
+def printer_on(port):
+    printer = FiscalPrinter("COM1")
+    printer.serial_connection = port
+    printer.RESPONSE_TIMEOUT = 1
+    printer.REPORT_TIMEOUT = 1
+    return printer
+
+
+def test_read_response_returns_as_soon_as_frame_is_complete(fake_serial):
+    response = frame(b" 8", b"0080", b"0600")
+    port = fake_serial(b"\x00" + response[:5], response[5:-2], response[-2:])
+    start = time.monotonic()
+    assert printer_on(port)._read_response(STATUS_COMMAND) == response  # Sin el byte suelto anterior
+    assert time.monotonic() - start < 0.5
+    assert port.reads == 3
+
+
+def test_read_response_waits_for_bcc_of_last_etx(fake_serial):
+    response = frame(b" \x80", b"0080", b"0600" + FiscalPrinter.ETX, b"Z1A0000001")
+    port = fake_serial(response[:20], response[20:])
+    assert printer_on(port)._read_response(b"\x02\x45\x80\x03") == response
+
+
+def test_read_response_report_waits_for_second_frame(fake_serial):
+    accepted = frame(b" 9", b"0080", b"0600")
+    finished = frame(b" 9", b"0080", b"0600", b"0012")
+    port = fake_serial(accepted, finished[:6], finished[6:])
+    assert printer_on(port)._read_response(REPORT_COMMAND) == accepted + finished
+
+
+def test_read_response_rejected_report_returns_first_frame(fake_serial):
+    rejected = frame(b" 9", b"0080", b"0001")  # Estado fiscal con error: no habrá segunda trama
+    port = fake_serial(rejected)
+    start = time.monotonic()
+    assert printer_on(port)._read_response(REPORT_COMMAND) == rejected
+    assert time.monotonic() - start < 0.5
+
+
+def test_read_response_times_out_on_incomplete_frame(fake_serial):
+    printer = printer_on(fake_serial(frame(b" 8", b"0080", b"0600")[:-1]))
+    printer.RESPONSE_TIMEOUT = 0.1
+    with pytest.raises(TimeoutError, match="incompleta"):
+        printer._read_response(STATUS_COMMAND)
+
+
+def test_read_response_times_out_without_response(fake_serial):
+    printer = printer_on(fake_serial())
+    printer.RESPONSE_TIMEOUT = 0.1
+    with pytest.raises(TimeoutError, match="No se recibió"):
+        printer._read_response(STATUS_COMMAND)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Pruebas de los contadores de documentos de las impresoras de ticket y matriciales.
+"""
+
+import threading
+
+import pytest
+
+from printers.printer_counter import CounterStore
+
+SCOPE = "template_ticket_simple.json"
+SEED = {"machine_serial": "Z1A0000001", "machine_report": "0007", "document_invoice": "00000100"}
+TODAY = "2024-06-01"
+
+
+@pytest.fixture
+def counter_path(tmp_path):
+    return str(tmp_path / "counters.db")
+
+
+def increment_in_threads(stores, count, document_type="invoice"):
+    """Incrementa el contador desde varios hilos por cada tabla y retorna los números entregados"""
+    numbers = []
+    numbers_lock = threading.Lock()
+
+    def run(store):
+        for _ in range(count):
+            number = store.increment(SCOPE, document_type, TODAY, SEED)["document_number"]
+            with numbers_lock:
+                numbers.append(number)
+
+    threads = [threading.Thread(target=run, args=(store,)) for store in stores for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return numbers
+
+
+def test_increment_starts_from_template_seed(counter_path):
+    store = CounterStore(counter_path)
+    result = store.increment(SCOPE, "invoice", TODAY, SEED)
+    assert result == {
+        "document_date": TODAY,
+        "document_number": "00000101",
+        "machine_serial": "Z1A0000001",
+        "machine_report": "0007",
+    }
+    assert store.increment(SCOPE, "credit", TODAY, SEED)["document_number"] == "00000001"
+    store.close()
+
+
+def test_increment_never_repeats_numbers_under_threads(counter_path):
+    store = CounterStore(counter_path)
+    numbers = increment_in_threads([store], 50)
+    assert sorted(numbers) == [str(n).zfill(8) for n in range(101, 301)]
+    store.close()
+
+
+def test_increment_is_atomic_across_connections(counter_path):
+    stores = [CounterStore(counter_path), CounterStore(counter_path)]  # Como dos procesos con el mismo archivo
+    numbers = increment_in_threads(stores, 25)
+    assert len(set(numbers)) == len(numbers) == 200
+    assert max(numbers) == "00000300"
+    for store in stores:
+        store.close()
+
+
+def test_new_day_increments_report_once(counter_path):
+    store = CounterStore(counter_path)
+    store.increment(SCOPE, "invoice", TODAY, SEED)
+    first = store.increment(SCOPE, "invoice", "2024-06-02", SEED)
+    second = store.increment(SCOPE, "note", "2024-06-02", SEED)
+    assert first["machine_report"] == second["machine_report"] == "0008"
+    store.close()
+
+
+def test_counters_survive_reopen(counter_path):
+    store = CounterStore(counter_path)
+    store.increment(SCOPE, "invoice", TODAY, SEED)
+    store.close()
+
+    reopened = CounterStore(counter_path)
+    assert reopened.increment(SCOPE, "invoice", TODAY, SEED)["document_number"] == "00000102"
+    reopened.close()
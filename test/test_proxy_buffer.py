@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Pruebas del almacenamiento local del modo PROXY y del reenvío de sus solicitudes.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from server.handlers.proxy_buffer import BufferFullError, ProxyBuffer
+from server.handlers.proxy_handler import ProxyHandler
+
+TARGET = "http://10.0.0.1:5050/api/printers"
+
+
+@pytest.fixture
+def buffer(tmp_path):
+    store = ProxyBuffer(str(tmp_path / "proxy_buffer.db"), max_size=10, max_attempts=2)
+    yield store
+    store.close()
+
+
+def add_documents(store, count):
+    return [
+        store.add("", "POST", {"Idempotency-Key": f"doc-{n}"}, f'{{"n": {n}}}'.encode()) for n in range(count)
+    ]
+
+
+def test_peek_returns_requests_in_arrival_order(buffer):
+    ids = add_documents(buffer, 3)
+    entries = buffer.peek(10)
+    assert [entry["id"] for entry in entries] == ids
+    assert entries[0]["headers"] == {"Idempotency-Key": "doc-0"}
+    assert entries[0]["body"] == b'{"n": 0}'
+
+    buffer.remove(ids[0])
+    assert [entry["id"] for entry in buffer.peek(10)] == ids[1:]
+    assert buffer.depth == 2 and buffer.replayed_total == 1
+
+
+def test_requests_survive_reopen(tmp_path):
+    path = str(tmp_path / "proxy_buffer.db")
+    store = ProxyBuffer(path)
+    ids = add_documents(store, 2)
+    store.close()
+
+    reopened = ProxyBuffer(path)
+    assert reopened.depth == 2
+    assert [entry["id"] for entry in reopened.peek(10)] == ids
+    reopened.close()
+
+
+def test_add_rejects_when_full(tmp_path):
+    store = ProxyBuffer(str(tmp_path / "proxy_buffer.db"), max_size=2)
+    add_documents(store, 2)
+    with pytest.raises(BufferFullError):
+        store.add("", "POST", {}, b"{}")
+    store.close()
+
+
+def test_rejected_request_is_dead_lettered(buffer):
+    first, second = add_documents(buffer, 2)
+    assert not buffer.record_failure(first, "conexión rechazada", counted=False)
+    assert buffer.peek(1)[0]["attempts"] == 0
+
+    assert not buffer.record_failure(first, "HTTP 500")
+    assert buffer.record_failure(first, "HTTP 500")
+    assert buffer.depth == 1 and buffer.dead_total == 1
+    assert buffer.peek(1)[0]["id"] == second  # Deja de bloquear a las siguientes
+
+    status = buffer.status()
+    assert status["dead_letters"][0]["id"] == first
+    assert status["dead_letters"][0]["idempotency_key"] == "doc-0"
+    assert status["dead_letters"][0]["last_error"] == "HTTP 500"
+
+
+def replay_handler(store, responses):
+    """ProxyHandler sin hilos cuyo envío al SPOOLER retorna las respuestas dadas en orden"""
+    config = {"proxy": {"proxy_target": TARGET, "proxy_enabled": False}}
+    handler = ProxyHandler(config)
+    handler.buffer = store
+    sent = []
+
+    def send(url, path, method, headers, body, cookies=None):
+        sent.append(body)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return SimpleNamespace(status_code=response, text="")
+
+    handler._send = send
+    return handler, sent
+
+
+def test_replay_forwards_in_order_and_removes(buffer):
+    add_documents(buffer, 3)
+    handler, sent = replay_handler(buffer, [200, 400, 200])
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert handler._replay_batch(executor, 10, verify=False)
+    assert sent == [b'{"n": 0}', b'{"n": 1}', b'{"n": 2}']
+    assert buffer.depth == 0  # Un 4xx también se retira: reenviarlo no cambiaría el resultado
+
+
+def test_replay_keeps_requests_the_spooler_rejects(buffer):
+    ids = add_documents(buffer, 2)
+    handler, _ = replay_handler(buffer, [503, requests.Timeout("sin respuesta"), 200, 200])
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert not handler._replay_batch(executor, 10, verify=False)
+        assert [entry["attempts"] for entry in buffer.peek(10)] == [1, 1]
+        assert handler._replay_batch(executor, 10, verify=False)
+    assert buffer.depth == 0 and buffer.replayed_total == len(ids)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Pruebas del cortocircuito, la selección de destinos y la tabla de rutas del modo PROXY.
+"""
+
+import time
+
+import pytest
+
+from server.handlers.upstream import (
+    BALANCE_LEAST_OUTSTANDING,
+    BREAKER_CLOSED,
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    NoHealthyUpstreamError,
+    RouteTable,
+    Upstream,
+    UpstreamPool,
+)
+
+URL_A = "http://10.0.0.1:5050/api/printers"
+URL_B = "http://10.0.0.2:5050/api/printers"
+URL_C = "http://10.0.0.3:5050/api/printers"
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert not breaker.allow()
+    assert 0 < breaker.retry_after() <= 60
+    assert breaker.opened_total == 1
+
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker(failures=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED
+
+
+def test_breaker_half_open_trial_closes_on_success():
+    breaker = CircuitBreaker(failures=1, reset_timeout=0.05, trials=1)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # Solicitud de prueba
+    assert breaker.state == BREAKER_HALF_OPEN
+    assert not breaker.allow()  # Solo una prueba simultánea
+
+    breaker.record_success()
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_half_open_trial_reopens_on_failure():
+    breaker = CircuitBreaker(failures=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.opened_total == 2
+    assert not breaker.allow()
+
+
+def test_select_follows_weighted_round_robin():
+    pool = UpstreamPool([{"url": URL_A, "weight": 2}, {"url": URL_B}])
+    selected = []
+    for _ in range(6):
+        upstream = pool.select()
+        pool.release(upstream)
+        selected.append(upstream.url)
+    assert selected.count(URL_A) == 4
+    assert selected.count(URL_B) == 2
+    assert all(upstream.outstanding == 0 for upstream in pool.upstreams)
+
+
+def test_select_skips_ejected_and_excluded_upstreams():
+    pool = UpstreamPool([{"url": URL_A}, {"url": URL_B}], cooldown=60)
+    first, second = pool.upstreams
+    pool.mark_failure(first)
+    assert {pool.select().url for _ in range(4)} == {URL_B}
+
+    pool.mark_success(first)
+    assert pool.select(exclude=(second,)) is first
+    with pytest.raises(NoHealthyUpstreamError):
+        pool.select(exclude=(first, second))
+
+
+def test_select_skips_open_circuits():
+    pool = UpstreamPool([{"url": URL_A}, {"url": URL_B}], breaker={"failures": 1, "reset_timeout": 60})
+    first, second = pool.upstreams
+    first.breaker.record_failure()
+    assert {pool.select().url for _ in range(4)} == {URL_B}
+
+    second.breaker.record_failure()
+    with pytest.raises(CircuitOpenError) as error:
+        pool.select()
+    assert error.value.retry_after > 0
+
+
+def test_select_least_outstanding_prefers_idle_upstream():
+    pool = UpstreamPool([{"url": URL_A}, {"url": URL_B}], balance=BALANCE_LEAST_OUTSTANDING)
+    busy = pool.select()
+    assert pool.select() is not busy
+
+
+def test_select_pinned_upstream_is_not_replaced():
+    pool = UpstreamPool([{"url": URL_A}, {"url": URL_B}], breaker={"failures": 1, "reset_timeout": 60})
+    pinned = pool.upstreams[1]
+    assert pool.select(pinned=pinned) is pinned
+    with pytest.raises(NoHealthyUpstreamError):
+        pool.select(exclude=(pinned,), pinned=pinned)
+
+    pinned.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        pool.select(pinned=pinned)
+
+
+def test_route_table_explicit_rules_take_priority():
+    upstreams = [Upstream(URL_A), Upstream(URL_B)]
+    routes = {"terminals": {"CAJA-01": URL_B}, "branches": {"SUC-1": URL_A, "SUC-2": "http://otro/api/printers"}}
+    table = RouteTable(routes, upstreams)
+
+    assert table.lookup("CAJA-01", "SUC-1") is upstreams[1]
+    assert table.lookup("CAJA-02", "SUC-1") is upstreams[0]
+    assert table.lookup("CAJA-02", "SUC-2") is None  # Regla hacia un destino no configurado
+    assert table.lookup(None, None) is None
+
+
+def test_route_table_sticky_keys_are_stable():
+    upstreams = [Upstream(URL_A), Upstream(URL_B), Upstream(URL_C)]
+    table = RouteTable({}, upstreams, sticky=True)
+    assignments = {f"CAJA-{n}": table.lookup(f"CAJA-{n}", None) for n in range(50)}
+
+    assert len({upstream.url for upstream in assignments.values()}) == 3
+    fresh = RouteTable({}, list(upstreams), sticky=True)
+    assert all(fresh.lookup(terminal, None) is upstream for terminal, upstream in assignments.items())
+
+    reduced = RouteTable({}, upstreams[:2], sticky=True)  # Solo cambian las terminales del destino retirado
+    for terminal, upstream in assignments.items():
+        if upstream is not upstreams[2]:
+            assert reduced.lookup(terminal, None) is upstream
+
+
+def test_route_table_without_rules_uses_balancing():
+    table = RouteTable({}, [Upstream(URL_A), Upstream(URL_B)])
+    assert not table
+    assert table.lookup("CAJA-01", "SUC-1") is None
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Bus de eventos del servidor para su difusión por Server-Sent Events
+"""
+
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SUBSCRIBERS = 4  # Cada suscriptor SSE ocupa un hilo del servidor HTTP
+SUBSCRIBER_QUEUE_SIZE = 256  # Eventos pendientes por suscriptor antes de descartar
+
+
+class TooManySubscribersError(RuntimeError):
+    """Se alcanzó el máximo de suscriptores simultáneos"""
+
+
+class Subscription:
+    """Suscripción a los eventos publicados, con una cola propia acotada"""
+
+    def __init__(self, bus: "EventBus", event_filter: Optional[Callable[[Dict[str, Any]], bool]]) -> None:
+        self._bus = bus
+        self._filter = event_filter
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """Entrega un evento sin bloquear; si el cliente es lento se descarta el más antiguo"""
+        if self._filter is not None and not self._filter(event):
+            return
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Espera el siguiente evento.
+        Args:
+            timeout: Tiempo máximo de espera en segundos.
+        Returns:
+            Optional[Dict[str, Any]]: Evento o None si no llegó ninguno.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        """Cancela la suscripción"""
+        self._bus.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class EventBus:
+    """
+    Difunde eventos (trabajos, impresoras, contadores) a los suscriptores.
+    Publicar nunca bloquea: sin suscriptores el costo es mínimo y un suscriptor
+    lento solo pierde sus eventos más antiguos.
+    """
+
+    def __init__(self, max_subscribers: int = DEFAULT_MAX_SUBSCRIBERS) -> None:
+        self.max_subscribers = max_subscribers
+        self._subscribers: list = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @property
+    def subscribers(self) -> int:
+        """Cantidad de suscriptores activos"""
+        return len(self._subscribers)
+
+    def subscribe(self, event_filter: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Subscription:
+        """
+        Crea una suscripción.
+        Args:
+            event_filter: Función que indica si un evento se entrega al suscriptor.
+        Returns:
+            Subscription: Suscripción creada.
+        Raises:
+            TooManySubscribersError: Si se alcanzó el máximo de suscriptores.
+        """
+        subscription = Subscription(self, event_filter)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribersError(
+                    f"Se alcanzó el máximo de {self.max_subscribers} suscriptores de eventos"
+                )
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Elimina una suscripción"""
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not subscription]
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        """
+        Publica un evento.
+        Args:
+            event_type: Tipo de evento (p. ej. 'job', 'printer', 'counter', 'stats').
+            data: Datos del evento, serializables a JSON.
+        """
+        subscribers = self._subscribers  # Copia inmutable: se reemplaza al suscribir o cancelar
+        if not subscribers:
+            return
+        event = {"id": next(self._ids), "event": event_type, "time": time.time(), "data": data}
+        for subscription in subscribers:
+            subscription.offer(event)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """
+    Formatea un evento para un flujo text/event-stream.
+    Args:
+        event: Evento publicado.
+    Returns:
+        str: Mensaje SSE.
+    """
+    payload = json.dumps(event["data"], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {payload}\n\n"
+
+
+EVENTS = EventBus()
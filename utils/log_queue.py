@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Logging asíncrono: los hilos solo encolan el registro y un hilo de fondo (QueueListener)
+lo escribe en el archivo y en la consola. Así una escritura lenta en disco o la limpieza
+de logs durante la rotación no detienen el envío de comandos a la impresora.
+"""
+
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
+DEFAULT_QUEUE_SIZE = 10000  # Registros en espera antes de aplicar la política de desborde
+OVERFLOW_DROP = "drop"  # Descarta el registro (los WARNING o superiores esperan un instante)
+OVERFLOW_BLOCK = "block"  # El hilo espera a que haya espacio en la cola
+OVERFLOW_POLICIES = (OVERFLOW_DROP, OVERFLOW_BLOCK)
+PRIORITY_TIMEOUT = 0.5  # Segundos que espera un WARNING o superior con la política 'drop'
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler con cola acotada y política de desborde.
+    Los registros descartados se cuentan y se informan con un WARNING en cuanto la cola tiene espacio.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = OVERFLOW_DROP) -> None:
+        """
+        Inicializa el handler.
+        Args:
+            log_queue: Cola compartida con el QueueListener.
+            overflow: Política cuando la cola está llena ('drop' o 'block').
+        """
+        super().__init__(log_queue)
+        self.overflow = overflow if overflow in OVERFLOW_POLICIES else OVERFLOW_DROP
+        self.dropped = 0  # Registros descartados desde el último aviso
+        self.dropped_total = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Encola el registro aplicando la política de desborde"""
+        try:
+            if self.overflow == OVERFLOW_BLOCK:
+                self.queue.put(record)
+            elif record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=PRIORITY_TIMEOUT)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+                self.dropped_total += 1
+            return
+
+        if self.dropped:
+            self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        """Encola un aviso con la cantidad de registros descartados"""
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if not dropped:
+            return
+        notice = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0, "Cola de logging llena: %s registros descartados", (dropped,), None
+        )
+        try:
+            self.queue.put_nowait(self.prepare(notice))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += dropped
+
+
+class _LogListener(QueueListener):
+    """QueueListener que espera espacio en la cola para la marca de fin, aunque la cola esté llena"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """
+    Cola de logging del proceso: un BoundedQueueHandler en el logger raíz y un
+    QueueListener que atiende los handlers de archivo y consola.
+    """
+
+    _handler: Optional[BoundedQueueHandler] = None
+    _listener: Optional[_LogListener] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def start(
+        cls, handlers: List[logging.Handler], queue_size: int = DEFAULT_QUEUE_SIZE, overflow: str = OVERFLOW_DROP
+    ) -> BoundedQueueHandler:
+        """
+        Inicia el hilo de logging, deteniendo el anterior si lo había.
+        Args:
+            handlers: Handlers que escriben los registros (archivo, consola).
+            queue_size: Capacidad de la cola.
+            overflow: Política cuando la cola está llena ('drop' o 'block').
+        Returns:
+            BoundedQueueHandler: Handler que se agrega a los loggers.
+        """
+        cls.stop()
+        with cls._lock:
+            log_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+            cls._handler = BoundedQueueHandler(log_queue, overflow)
+            cls._listener = _LogListener(log_queue, *handlers, respect_handler_level=True)
+            cls._listener.start()
+            return cls._handler
+
+    @classmethod
+    def stop(cls) -> None:
+        """Escribe los registros pendientes y detiene el hilo de logging"""
+        with cls._lock:
+            listener, cls._listener = cls._listener, None
+            if listener is None:
+                return
+            # Los registros posteriores no quedan en una cola sin lector
+            logging.getLogger().removeHandler(cls._handler)
+            listener.stop()  # Procesa todo lo que queda en la cola antes de terminar
+            for handler in listener.handlers:
+                handler.close()
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """Estado de la cola de logging"""
+        handler = cls._handler
+        if handler is None:
+            return {"enabled": False}
+        return {
+            "enabled": cls._listener is not None,
+            "queued": handler.queue.qsize(),
+            "capacity": handler.queue.maxsize,
+            "overflow": handler.overflow,
+            "dropped": handler.dropped_total,
+        }
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Métricas del servidor en formato de exposición de Prometheus (texto 0.0.4)
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Límites en segundos: desde validaciones de milisegundos hasta impresiones completas
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INF_BUCKET = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    """Escapa el valor de una etiqueta"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Formatea las etiquetas de una muestra: {a="1",b="2"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Formatea un valor numérico"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base de las métricas: nombre, descripción y etiquetas"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        """
+        Inicializa la métrica.
+        Args:
+            name: Nombre de la métrica.
+            documentation: Descripción mostrada en '# HELP'.
+            labels: Nombres de las etiquetas.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Valores de las etiquetas en el orden declarado"""
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        """Líneas de muestras de la métrica"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Líneas de la métrica en formato de exposición"""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    """Contador monótono"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Incrementa el contador"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Valor actual del contador"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Metric):
+    """
+    Valor que sube y baja. Puede obtenerse de una función al momento de exponer
+    las métricas (p. ej. la profundidad de las colas).
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+    ) -> None:
+        """
+        Inicializa el indicador.
+        Args:
+            name: Nombre de la métrica.
+            documentation: Descripción mostrada en '# HELP'.
+            labels: Nombres de las etiquetas.
+            callback: Función que retorna {valores de etiquetas: valor} al exponer.
+        """
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        """Asigna el valor"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Incrementa el valor"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """Disminuye el valor"""
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            values.update(self.callback())
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    """Distribución de duraciones en intervalos acumulativos"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # [conteo por intervalo..., suma, total]
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Registra una observación"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Mide la duración del bloque"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += values[index]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, INF_BUCKET)} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registro de las métricas expuestas por el servidor"""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Registra una métrica; si ya existe una con el mismo nombre se retorna esa.
+        Args:
+            metric: Métrica a registrar.
+        Returns:
+            Metric: Métrica registrada.
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def get(self, name: str) -> Optional[Metric]:
+        """Obtiene una métrica registrada por su nombre"""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Exporta todas las métricas.
+        Returns:
+            str: Texto en formato de exposición de Prometheus.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Solicitudes HTTP
+REQUESTS_TOTAL = REGISTRY.register(
+    Counter("spooler_http_requests_total", "Solicitudes HTTP atendidas.", ("endpoint",))
+)
+ERRORS_TOTAL = REGISTRY.register(
+    Counter("spooler_http_errors_total", "Errores no controlados en las solicitudes HTTP.", ("endpoint",))
+)
+
+# Etapas del procesamiento de un documento
+VALIDATION_SECONDS = REGISTRY.register(
+    Histogram(
+        "spooler_validation_seconds",
+        "Duración de la validación del documento (schema: esquema JSON, business: Invoice.validate).",
+        ("stage", "operation_type"),
+    )
+)
+QUEUE_WAIT_SECONDS = REGISTRY.register(
+    Histogram(
+        "spooler_queue_wait_seconds",
+        "Tiempo que el trabajo espera en la cola del dispositivo.",
+        ("printer", "operation_type"),
+    )
+)
+ACQUIRE_SECONDS = REGISTRY.register(
+    Histogram("spooler_printer_acquire_seconds", "Duración de la obtención de la impresora.", ("printer",))
+)
+COMMAND_SECONDS = REGISTRY.register(
+    Histogram(
+        "spooler_printer_command_seconds",
+        "Duración de cada comando enviado a la impresora fiscal (send_command).",
+        ("driver",),
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    )
+)
+PRINT_SECONDS = REGISTRY.register(
+    Histogram(
+        "spooler_print_seconds",
+        "Duración total de la impresión del documento en el hilo del dispositivo.",
+        ("printer", "operation_type", "status"),
+    )
+)
+JOBS_TOTAL = REGISTRY.register(
+    Counter("spooler_jobs_total", "Trabajos de impresión finalizados.", ("printer", "operation_type", "state"))
+)
+
+# Estado de las colas; los valores se obtienen del PrinterManager al exponer las métricas
+QUEUE_DEPTH = REGISTRY.register(
+    Gauge("spooler_queue_depth", "Trabajos en espera en la cola de cada dispositivo.", ("printer",))
+)
+IN_FLIGHT = REGISTRY.register(
+    Gauge("spooler_jobs_in_flight", "Trabajos en impresión en cada dispositivo.", ("printer",))
+)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024, Iron Graterol
+Licensed under the GNU Affero General Public License, version 3 or later.
+
+Bases de datos SQLite locales del servicio (diario de trabajos, solicitudes en espera y contadores).
+"""
+
+import os
+import sqlite3
+
+
+def open_spool_db(path: str) -> sqlite3.Connection:
+    """
+    Abre una base de datos SQLite para uso como diario.
+    En modo WAL con synchronous=NORMAL cada commit solo se agrega al WAL sin fsync;
+    el fsync se hace por lotes en cada checkpoint. El diario sobrevive a la caída
+    del proceso y solo las últimas transacciones pueden perderse ante un corte de energía.
+    Args:
+        path: Ruta del archivo de base de datos.
+    Returns:
+        sqlite3.Connection: Conexión en modo autocommit compartible entre hilos.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
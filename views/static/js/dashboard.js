@@ -14,12 +14,20 @@ let requestData = {
 let securityModal = null;
 let pendingAction = null;
 
+// Variables globales para el flujo de eventos
+let eventSource = null;
+let pollTimer = null;
+let requestsTotal = 0;
+let uptimeSeconds = 0;
+let uptimeReceivedAt = Date.now();
+
 // Inicialización
 document.addEventListener('DOMContentLoaded', function() {
     initializeChart();
     updateDashboard();
-    // Actualizar cada 5 segundos
-    setInterval(updateDashboard, 5000);
+    subscribeEvents();
+    // Actualizar gráfico y tiempo activo cada 5 segundos con los últimos datos recibidos
+    setInterval(tickDashboard, 5000);
     
     // Inicializar modal de seguridad
     securityModal = new bootstrap.Modal(document.getElementById('securityCodeModal'));
@@ -143,6 +151,9 @@ async function updateDashboard() {
         updateElement('requestCount', data.stats?.requests_total);
         updateElement('uptime', formatUptime(data.uptime));
         updateElement('errorCount', data.stats?.error_count);
+        requestsTotal = data.stats?.requests_total || 0;
+        uptimeSeconds = data.uptime || 0;
+        uptimeReceivedAt = Date.now();
         
         // Actualizar últimos errores si hay alguno
         if (data.stats?.last_errors && data.stats.last_errors.length > 0) {
@@ -150,15 +161,97 @@ async function updateDashboard() {
             showNotification('Error', lastError.message, 'error');
         }
         
-        // Actualizar gráfico
-        updateChart(data.stats?.requests_total || 0);
-        
     } catch (error) {
         console.error('Error completo:', error);
         showNotification('Error', `Error actualizando dashboard: ${error.message}`, 'error');
     }
 }
 
+// Suscribirse al flujo de eventos del servidor
+function subscribeEvents() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    eventSource = new EventSource('/api/events');
+
+    eventSource.onopen = () => {
+        if (pollTimer) {  // Reconectado después de una caída: refrescar todo una vez
+            stopPolling();
+            updateDashboard();
+        }
+        updateServerStatus(true);
+    };
+
+    eventSource.onerror = () => {
+        updateServerStatus(false);
+        if (eventSource.readyState === EventSource.CLOSED) {
+            // El servidor rechazó la suscripción (p. ej. máximo de clientes): volver a consultar
+            startPolling();
+        }
+    };
+
+    eventSource.addEventListener('stats', (event) => {
+        const stats = JSON.parse(event.data);
+        requestsTotal = stats.requests_total;
+        document.getElementById('requestCount').textContent = stats.requests_total;
+        document.getElementById('errorCount').textContent = stats.error_count;
+        if (stats.last_error) {
+            showNotification('Error', stats.last_error.message, 'error');
+        }
+        markUpdated();
+    });
+
+    eventSource.addEventListener('job', (event) => {
+        const job = JSON.parse(event.data);
+        if (job.state === 'failed') {
+            showNotification('Error', `Documento ${job.document_number}: ${job.message}`, 'error');
+        }
+        markUpdated();
+    });
+
+    eventSource.addEventListener('printer', (event) => {
+        updatePrinterActivity(JSON.parse(event.data));
+        markUpdated();
+    });
+
+    eventSource.addEventListener('counter', markUpdated);
+    eventSource.addEventListener('config', updateDashboard);
+}
+
+// Consultar el estado cada 5 segundos cuando no hay flujo de eventos
+function startPolling() {
+    if (!pollTimer) {
+        pollTimer = setInterval(updateDashboard, 5000);
+    }
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+// Actualizar gráfico y tiempo activo sin consultar al servidor
+function tickDashboard() {
+    const uptime = uptimeSeconds + Math.floor((Date.now() - uptimeReceivedAt) / 1000);
+    document.getElementById('uptime').textContent = formatUptime(uptime);
+    updateChart(requestsTotal);
+}
+
+// Registrar la hora del último dato recibido
+function markUpdated() {
+    document.getElementById('lastUpdate').textContent = new Date().toLocaleString();
+}
+
+// Mostrar actividad de una impresora
+function updatePrinterActivity(printer) {
+    const element = document.getElementById(`${printer.device}Status`);
+    if (element) {
+        element.title = printer.busy ? `Imprimiendo (${printer.pending} en cola)` : 'Disponible';
+    }
+}
+
 // Actualizar estado de impresora
 function updatePrinterStatus(elementId, isEnabled) {
     const element = document.getElementById(elementId);